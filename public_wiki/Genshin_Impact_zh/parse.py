@@ -1,63 +1,68 @@
-import json
 import os
 import re
-import time
+import sys
 import traceback
 
 from tqdm import tqdm
-import requests
-from bs4 import BeautifulSoup, element
-import urllib.parse
+from bs4 import element
+
+# the shared biligame package lives next to this game's folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from biligame import browser, frontier, nodes, normalize, pages, parallel, querygrid, results, runner, snapshots, stream, tables
+from biligame import soup as soup_memo
+from biligame.cache import open_cache
 
 
 cache_dir = "D:/data/biligame/genshin"
+# "sqlite": one compressed pages.sqlite file, "file": one html file per page (see biligame/cache.py)
+cache_backend = "sqlite"
+# "page": download detail pages one by one, "api": render them in batches through api.php (see biligame/mediawiki.py)
+fetch_mode = "page"
+# "html.parser", "lxml" (faster, pip install lxml) or "html5lib", check with biligame/compare_backends.py first
+parser_backend = "html.parser"
+# processes parsing detail pages, 1 parses them one by one in this process (see biligame/parallel.py)
+parse_workers = 1
+# reuse the stored result of a detail page whose html and parser code did not change (see biligame/results.py)
+incremental = True
+# build only the part of a page a parser reads (scope=...), False builds whole pages (see biligame/soup.py)
+scoped_parsing = True
 chromedriver_path = "D:/tools/chromedriver-win64/chromedriver.exe"
+# Chrome sessions the browser-driven parsers use at once (see biligame/browser.py)
+browser_sessions = 3
+# "browser": read the query grids of 任务道具 / 摆设一览 with chromedriver, "http": from the page source (see biligame/querygrid.py)
+grid_mode = "browser"
+# True: read the grids from the DOM snapshots stored by the last browser run, without Chrome (see biligame/snapshots.py)
+browser_replay = False
 
 
 def load_html_by_route(route, force_update=False):
-    try:
-        assert not force_update
-        filename = "wiki.biligame.com" + route.replace("/", "_") + ".html"
-        with open(os.path.join(cache_dir, filename), "r", encoding="utf-8") as f:
-            html = f.read()
-    except (FileNotFoundError, AssertionError):
-        print("filename not found", route)
-        if route.startswith("/"):
-            route = route[1:]
-        url = f"https://wiki.biligame.com/{route}"
-        html = requests.get(url).text
-        save_html(url, html, force_update)
-    return html
-
+    return pages.load_html(open_cache(cache_dir, cache_backend), route, force_update)
 
 
 def save_html(page_url, html_content, force_update=False):
-    # convert URL into a valid filename
-    filename = page_url.replace("http://", "").replace("https://", "").replace("/", "_") + ".html"
-    filepath = os.path.join(cache_dir, filename)
-    directory = os.path.dirname(filepath)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-    if not os.path.exists(filepath) or force_update:
-        try:
-            with open(filepath, 'w', encoding="utf-8") as f:
-                f.write(html_content)
-            print(filename, " saved.")
-        except OSError:
-            filename = urllib.parse.unquote(filename)
-            filepath = os.path.join(cache_dir, filename)
-            if not os.path.exists(filepath):
-                with open(filepath, 'w', encoding="utf-8") as f:
-                    f.write(html_content)
-                print(filename, " saved.")
-        except:
-            print(traceback.format_exc())
+    pages.save_html(open_cache(cache_dir, cache_backend), page_url, html_content, force_update)
+
+
+def load_soup(route, force_update=False, mutable=False, scope=None):
+    """parsed page, shared with every other parse function of this run unless mutable=True (see biligame/soup.py)"""
+    html = load_html_by_route(route, force_update)
+    return soup_memo.parse_document(route, html, mutable, parser_backend, scope if scoped_parsing else None)
+
+
+def prefetch_routes(routes):
+    """download the uncached child pages of a list page concurrently (see biligame/fetch.py for rate limits)"""
+    pages.prefetch(open_cache(cache_dir, cache_backend), routes, fetch_mode)
 
 
+def dispatch_details(func, calls):
+    """prefetch and start func(*args) for all calls on the parse pool, read results back with .get(*args)"""
+    calls = [tuple(args) for args in calls]
+    prefetch_routes([args[0] for args in calls])
+    return parallel.dispatch(func, calls, parse_workers)
+
 
 def parse_main_page(route="/ys/%E9%A6%96%E9%A1%B5"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route)
     menu_wrap = soup.find('div', class_='menu-wrap wiki-menu-ul-1 clearfix')
     menu_items = menu_wrap.find_all('div', class_='wiki-menu-li-1')
 
@@ -83,110 +88,31 @@ def parse_main_page(route="/ys/%E9%A6%96%E9%A1%B5"):
 def parse_table(table, keys_to_delete=None, values_to_delete=None):
     if values_to_delete is None:
         values_to_delete = {"[[]]"}
-    rows = table.find_all('tr')
-    if len(rows[0].find_all("th")) > 1 and not rows[0].find_all("td"):
-        table_type = "header_top"
-    elif len(table.find_all("th")) == len(table.find_all("td")):
-        table_type = "header_cell_equal"
-    elif rows[-1].find_all("th") and rows[-1].find_all("td"):
-        table_type = "header_left"
-    elif not table.find_all("th") and table.find_all("td"):
-        table_type = "no_header"
-    else:
-        table_type = "free"
-
-    if table_type == "header_top":
-        headers = [header.text.strip() for header in rows[0].find_all('th')]
-        info = []
-        for row in rows[1:]:
-            row_info = {}
-            for header, cell in zip(headers, row.find_all('td')):
-                if not header:
-                    continue
-                if header == "稀有度":
-                    row_info[header] = cell.find('img')["alt"].split(".")[0]
-                else:
-                    row_info[header] = re.sub(r"(^图)*\s+", " ", cell.text).strip()
-            row_info = {k: v for k, v in row_info.items() if k and v}
-            info.append(row_info)
-    elif table_type == "header_cell_equal":
-        info = {}
-        for header, cell in zip(table.find_all("th"), table.find_all("td")):
-            header = header.text.strip()
-            if header == "稀有度":
-                info[header] = cell.find('img')["alt"].split(".")[0]
-            else:
-                info[header] = re.sub(r"(^图)*\s+", " ", cell.text).strip()
-    elif table_type == "header_left":
-        info = {}
-        for tr in table.find_all('tr'):
-            if not tr.find("td"):
-                continue
-            headers = []
-            for h in tr.find_all('th'):
-                if h.has_attr("style") and "display:none" in h["style"]:
-                    continue
-                header = h.text.split("Media")[0].strip()
-                headers.append(header)
-            if not headers:
-                continue
-            header = " - ".join([h for h in headers if h])
-
-            if header == "稀有度":
-                content = tr.find('img')["alt"].split(".")[0]
-            else:
-                content = tr.find("td").text.strip().replace("\xa0", " ")
-            if not content or "文件:" in content or content == "'":
-                continue
-            info[header] = content
-    elif table_type == "no_header":
-        info = [td.text.strip() for td in table.find_all("td")]
-    else:  # freeform
-        info = []
-        for row in rows:
-            line = ""
-            nodes = row.find_all(["th", "td"])
-            for k, n in enumerate(nodes):
-                if k and n.name == "td" and nodes[k-1].name == "th":
-                    line += ": "
-                content = n.text.replace('\xa0', '')
-                content = re.sub("文件:.+\.(jpg|gif|png)", "", content)
-                line += f"{content.strip()} "
-            info.append(line.strip())
-
-    if isinstance(info, dict):
-        info = {k: v for k, v in info.items() if k and v}
-        if keys_to_delete:
-            info = {k: v for k, v in info.items() if k not in keys_to_delete}
-        if values_to_delete:
-            info = {k: v for k, v in info.items() if v not in values_to_delete}
-    elif isinstance(info, list):
-        info = [l for l in info if l]
-    return info
+    return tables.parse_table(table, keys_to_delete, values_to_delete)
 
 
 def parse_character_list(route="/ys/%E8%A7%92%E8%89%B2"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route)
     tab_contents = soup.find(class_="resp-tab-case")
     tabs = tab_contents.find_all(class_="divsort g C5星")
     tabs += tab_contents.find_all(class_="divsort g C4星")
+    details = dispatch_details(parse_character_info, [(tab.find_all("a")[-1]["href"],) for tab in tabs])
+    seen = set()
     for tab in tabs:
         title = tab.find(class_="L").text
         link = tab.find_all("a")[-1]["href"]
-        if title in results:
+        if title in seen:
             continue
+        seen.add(title)
         # parse each character page
-        results[title] = parse_character_info(link)
-        print(f"{title} {results[title]}")
-    return results
+        info = details.get(link)
+        print(f"{title} {info}")
+        yield title, info
 
 
 def parse_character_info(route):
     info = {}
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
 
     for h2 in soup.find_all("h2"):
         section = h2.find('span', class_="mw-headline")
@@ -229,34 +155,38 @@ def parse_character_info(route):
 
 
 def parse_character_voices(route="/ys/%E8%A7%92%E8%89%B2%E8%AF%AD%E9%9F%B3"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route)
     tab_content = soup.find(class_="resp-tab-content")
     tabs = tab_content.find_all(class_="home-box-tag-1")
-
-    # additional two
-    for title, link in [
+    travelers = [
         ["旅行者语音/荧", "/ys/%E6%97%85%E8%A1%8C%E8%80%85%E8%AF%AD%E9%9F%B3/%E8%8D%A7"],
         ["旅行者语音/空", "/ys/%E6%97%85%E8%A1%8C%E8%80%85%E8%AF%AD%E9%9F%B3/%E7%A9%BA"],
-    ]:
-        results[title] = parse_voice_page(link)
-        print(f"{title} {results[title]}")
+    ]
+    details = dispatch_details(
+        parse_voice_page,
+        [(link,) for _, link in travelers] + [(tab.find("a")["href"],) for tab in tabs if "语音" in tab.find("a")["title"]]
+    )
+
+    # additional two
+    for title, link in travelers:
+        info = details.get(link)
+        print(f"{title} {info}")
+        yield title, info
 
     for tab in tabs:
         tab = tab.find("a")
         title, link = tab['title'], tab["href"]
         if "语音" in title:
-            results[title] = parse_voice_page(link)
-            print(f"{title} {results[title]}")
-    return results
+            info = details.get(link)
+            print(f"{title} {info}")
+            yield title, info
 
 
 def parse_voice_page(route):
-    html = load_html_by_route(route)
-    if not html:
+    # the tables skipped below are counted on the whole page, it is not scoped
+    soup = load_soup(route)
+    if not soup.contents:
         return {}
-    soup = BeautifulSoup(html, 'html.parser')
     info = {}
     for table in soup.find_all("tbody")[2:]:
         rows = table.find_all('tr')
@@ -266,40 +196,46 @@ def parse_voice_page(route):
         for row in rows[2:]:
             cells = row.find_all('div')
             for s_key, cell in zip(subkeys, cells):
-                text = re.sub("\s*</*(div|font).*>\s*", "", cell.prettify())
-                text = re.sub(" <br/>", "", text)
+                # plain text cells are read from the tree, the others from their markup
+                text = nodes.line_text(cell)
+                if text is None:
+                    text = re.sub("\s*</*(div|font).*>\s*", "", cell.prettify())
+                    text = re.sub(" <br/>", "", text)
                 info[key][s_key] = text
     return info
 
 
 def parse_character_outfits(route="/ys/%E8%A3%85%E6%89%AE"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route)
     table = soup.find("table")
+    calls = []
+    for row in table.find_all("tr"):
+        info = row.find("a")
+        if info and info.has_attr("href") and row.has_attr("data-param3"):
+            calls.append((info["href"], row["data-param3"]))
+    details = dispatch_details(parse_outfit, calls)
 
-    results = {}
     for row in table.find_all("tr"):
         try:
             info = row.find("a")
             title, link = info['title'], info["href"]
             get, rarity, sort = row["data-param1"], row["data-param2"], row["data-param3"]
-            results[title] = parse_outfit(link, sort)
+            outfit = details.get(link, sort)
             addition_map = {
                 "来源": get, "稀有度": f"{rarity}星", "类型": sort,
             }
             for key, item in addition_map.items():
-                if key not in results[title]:
-                    results[title][key] = item
-            print(f"{title} {results[title]}")
+                if key not in outfit:
+                    outfit[key] = item
+            print(f"{title} {outfit}")
         except:
             continue
-    return results
+        yield title, outfit
 
 
 def parse_outfit(route, sort):
     info = {}
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     if sort != "衣装":
         wikitable = soup.find('table', class_='wikitable')
         for th in wikitable.find_all('th'):
@@ -308,7 +244,7 @@ def parse_outfit(route, sort):
                 info[th.text.strip()] = td.find('img')["alt"].split(".")[0]
             else:
                 if td and "请上传文件" not in td.text:
-                    info[th.text.strip()] = re.sub(r"(^图)*\s+", " ", td.text).strip()
+                    info[th.text.strip()] = normalize.clean_cell(td.text)
     else:
         element = soup.find("span", {"id": "故事"})
         info["故事"] = element.find_next("tbody").text.strip()
@@ -320,20 +256,18 @@ def parse_outfit(route, sort):
 
 
 def parse_weapon_list(route="/ys/%E6%AD%A6%E5%99%A8%E4%B8%80%E8%A7%88"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route)
+    details = dispatch_details(parse_weapon, [(s.find_all('a')[-1]["href"],) for s in soup.find_all("div", class_="g")])
     for s in soup.find_all("div", class_="g"):
         info = s.find_all('a')[-1]
         title, link = info['title'], info["href"]
-        results[title] = parse_weapon(link)
-        print(f"{title} {results[title]}")
-    return results
+        info = details.get(link)
+        print(f"{title} {info}")
+        yield title, info
 
 
 def parse_weapon(route):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     info = {}
 
     brief = soup.find("div", class_="YS-WeaponBrief")
@@ -356,20 +290,18 @@ def parse_weapon(route):
 
 
 def parse_relic_list(route="/ys/%E5%9C%A3%E9%81%97%E7%89%A9%E4%B8%80%E8%A7%88"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route)
+    details = dispatch_details(parse_relic, [(s.find_all('a')[-1]["href"],) for s in soup.find_all("div", class_="g")])
     for s in soup.find_all("div", class_="g"):
         info = s.find_all('a')[-1]
         title, link = info['title'], info["href"]
-        results[title] = parse_relic(link)
-        print(f"{title} {results[title]}")
-    return results
+        info = details.get(link)
+        print(f"{title} {info}")
+        yield title, info
 
 
 def parse_relic(route):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     info = {}
 
     brief = soup.find("div", class_="attribute")
@@ -404,20 +336,18 @@ def parse_relic(route):
 
 
 def parse_npc_list(route="/ys/NPC%E5%9B%BE%E9%89%B4"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, force_update=True)
     npcs = list(soup.find_all("div", class_="giconCard"))
+    details = dispatch_details(parse_npc, [(s.find_all("a")[-1]["href"],) for s in npcs])
     for s in tqdm(npcs):
         npc = s.find_all("a")[-1]
-        results[npc.text.strip()] = parse_npc(npc["href"])
-        print(results[npc.text.strip()])
-    return results
+        info = details.get(npc["href"])
+        print(info)
+        yield npc.text.strip(), info
 
 
 def parse_npc(route):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     info = {}
 
     e = soup.find("div", class_="npcMainRight")
@@ -503,40 +433,46 @@ def parse_conversation(soup):
 
 
 def parse_food_list(route="/ys/%E9%A3%9F%E7%89%A9%E4%B8%80%E8%A7%88"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, scope="CardSelectTr")
     table = soup.find("table", {"id": "CardSelectTr"})
     rows = table.find_all('tr')
     header_row = rows[0]
     headers = [header.text.strip() for header in header_row.find_all('th')][1:]
+    details = dispatch_details(parse_food, [(row.find("a")["href"],) for row in rows[1:] if row.find("a")])
     rarity = headers.index("稀有度")
-    for row in tqdm(rows[1:]):
+    row_cells = []
+    for row in rows[1:]:
         cells = []
         for j, cell in enumerate(row.find_all('td')[1:]):
             if rarity == j:
                 cell = cell.find('img')["alt"].split(".")[0]
             else:
-                cell = re.sub(r"(^图)*\s+", " ", cell.get_text()).strip()
+                cell = normalize.clean_cell(cell.get_text())
             cells.append(cell)
+        row_cells.append(cells)
+    # rows of the same name are merged into one entry, kept until the last row of the name;
+    # the last yield of a name is the complete entry
+    merged = {}
+    last_rows = stream.last_rows([cells[0] for cells in row_cells])
+    for row, cells, last in zip(tqdm(rows[1:]), row_cells, last_rows):
         name = cells[0]
-        if name not in results:
-            results[name] = {"basic": {}, "detail": {}}
+        entry = merged.setdefault(name, {"basic": {}, "detail": {}})
+        if last:
+            del merged[name]
         for header, cell in zip(headers, cells):
-            results[name]["basic"][header] = cell
+            entry["basic"][header] = cell
         link = row.find("a")
         if link:
-            detail = parse_food(link["href"])
-            results[name]["detail"] = detail
-        print(name, results[name])
-    return results
+            detail = details.get(link["href"])
+            entry["detail"] = detail
+        print(name, entry)
+        yield name, entry
 
 
 def parse_food(route):
     if "index.php" in route:
         return {}
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     info = {}
     for headline in soup.find_all("span", class_="mw-headline"):
         headline_str = headline.text.strip()
@@ -573,94 +509,105 @@ def parse_food(route):
 
 
 def parse_material_list(route="/ys/%E6%9D%90%E6%96%99%E5%9B%BE%E9%89%B4"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route)
     materials = soup.find_all('div', class_="ys-iconLarge")
+    details = dispatch_details(parse_food, [(m.find("a")["href"],) for m in materials if m.find("a") and m.find("a").has_attr("href")])
     for material in tqdm(materials):
         try:
             link = material.find("a")
-            data = parse_food(link["href"])
+            data = details.get(link["href"])
             if data:
-                results[link["title"]] = data
                 print(link["title"], data)
         except:
             print(traceback.format_exc())
-    return results
+            continue
+        if data:
+            yield link["title"], data
 
 
 def parse_item_list(route="/ys/%E9%81%93%E5%85%B7%E4%B8%80%E8%A7%88"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, scope="CardSelectTr")
     table = soup.find("table", {"id": "CardSelectTr"})
     rows = table.find_all('tr')
     header_row = rows[0]
     headers = [header.text.strip() for header in header_row.find_all('th')][1:]
+    details = dispatch_details(parse_food, [(row.find("a")["href"],) for row in rows[1:] if row.find("a")])
     rarity = headers.index("稀有度")
-    for row in tqdm(rows[1:]):
+    row_cells = []
+    for row in rows[1:]:
         cells = []
         for j, cell in enumerate(row.find_all('td')[1:]):
             if rarity == j:
                 cell = cell.find('img')["alt"].split(".")[0]
             else:
-                cell = re.sub(r"(^图)*\s+", " ", cell.get_text()).strip()
+                cell = normalize.clean_cell(cell.get_text())
             cells.append(cell)
+        row_cells.append(cells)
+    # rows of the same name are merged into one entry, kept until the last row of the name
+    merged = {}
+    last_rows = stream.last_rows([cells[0] for cells in row_cells])
+    for row, cells, last in zip(tqdm(rows[1:]), row_cells, last_rows):
         name = cells[0]
-        if name not in results:
-            results[name] = {"basic": {}, "detail": {}}
+        entry = merged.setdefault(name, {"basic": {}, "detail": {}})
+        if last:
+            del merged[name]
         for header, cell in zip(headers, cells):
-            results[name]["basic"][header] = cell
+            entry["basic"][header] = cell
         link = row.find("a")
         if link:
-            detail = parse_food(link["href"])
+            detail = details.get(link["href"])
             if detail:
-                results[name]["detail"] = detail
-        print(results[name])
-    return results
+                entry["detail"] = detail
+        print(entry)
+        yield name, entry
 
 
 def parse_furniture_suite_list(route="/ys/摆设套装一览"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, scope="CardSelectTr")
     table = soup.find("table", {"id": "CardSelectTr"})
     rows = table.find_all('tr')
     header_row = rows[0]
     headers = [header.text.strip() for header in header_row.find_all('th')][1:]
-    for row in tqdm(rows[1:]):
+    details = dispatch_details(parse_food, [(row.find("a")["href"],) for row in rows[1:] if row.find("a")])
+    row_cells = []
+    for row in rows[1:]:
         cells = []
         for j, cell in enumerate(row.find_all('td')[1:]):
-            cell = re.sub(r"(^图)*\s+", " ", cell.get_text()).strip()
+            cell = normalize.clean_cell(cell.get_text())
             cells.append(cell)
+        row_cells.append(cells)
+    # rows of the same name are merged into one entry, kept until the last row of the name
+    merged = {}
+    last_rows = stream.last_rows([cells[0] for cells in row_cells])
+    for row, cells, last in zip(tqdm(rows[1:]), row_cells, last_rows):
         name = cells[0]
-        if name not in results:
-            results[name] = {"basic": {}, "detail": {}}
+        entry = merged.setdefault(name, {"basic": {}, "detail": {}})
+        if last:
+            del merged[name]
         for header, cell in zip(headers, cells):
-            results[name]["basic"][header] = cell
+            entry["basic"][header] = cell
         link = row.find("a")
         if link:
-            detail = parse_food(link["href"])
+            detail = details.get(link["href"])
             if detail:
-                results[name]["detail"] = detail
-        print(results[name])
-    return results
+                entry["detail"] = detail
+        print(entry)
+        yield name, entry
 
 
 def parse_geography_list(route="/ys/%E5%9C%B0%E7%90%86%E5%BF%97"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
-    for area in soup.find('span', class_="mw-headline").find_next("div").find_all('a'):
+    soup = load_soup(route, force_update=True)
+    areas = soup.find('span', class_="mw-headline").find_next("div").find_all('a')
+    details = dispatch_details(parse_geography, [(area["href"],) for area in areas])
+    for area in areas:
         title, href = area["title"], area["href"]
-        results[title] = parse_geography(href)
-        print(results[title])
-    return results
+        info = details.get(href)
+        print(info)
+        yield title, info
 
 
 def parse_geography(route):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     info = {}
     for box in soup.find_all("div", class_="showOnBox"):
         name = box.find("div", class_="showOn").text.strip()
@@ -670,15 +617,14 @@ def parse_geography(route):
 
 
 def parse_archon_quest_list(route="/ys/%E9%AD%94%E7%A5%9E%E4%BB%BB%E5%8A%A1"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, force_update=True)
+    details = dispatch_details(parse_common_quest, [(task.find("a")["href"],) for task in soup.find_all("div", class_="taskIcon")])
     for task in soup.find_all("div", class_="taskIcon"):
         info = task.find("a")
         title, href = info["title"], info["href"]
-        results[title] = parse_common_quest(href)
-        print(results[title])
-    return results
+        quest = details.get(href)
+        print(quest)
+        yield title, quest
 
 
 def parse_plot(sibling):
@@ -696,9 +642,23 @@ def parse_plot(sibling):
     return text
 
 
+# cleanup of a quest section, the deletions in one pass (see biligame/normalize.py)
+clean_quest_markers = normalize.Normalizer(
+    # a run of newlines, also when only removed markers are between them
+    (r"\n(?:\n|分支对话|动画剧情)+", "\n"),
+    ("分支对话|动画剧情", ""),
+    ("\xa0", ""),
+)
+# upload placeholders up to the end of the line, matched once markers and nbsp inside them are gone
+clean_upload_placeholders = normalize.Normalizer(("请上传文件.+", ""))
+
+
+def clean_quest_text(text):
+    return clean_upload_placeholders(clean_quest_markers(text))
+
+
 def parse_common_quest(route, level="h2", add_asterisk=True):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     quest = {}
 
     for head in soup.find('div', id="mw-content-text").find_all(level):
@@ -714,12 +674,7 @@ def parse_common_quest(route, level="h2", add_asterisk=True):
             if content:
                 quest[title].append(content)
 
-        quest[title] = "\n".join(quest[title])
-        quest[title] = re.sub("(分支对话|动画剧情)", "", quest[title])
-        quest[title] = re.sub("\n+", "\n", quest[title])
-        quest[title] = re.sub(" ", "", quest[title])
-        quest[title] = quest[title].replace("\xa0", "")
-        quest[title] = re.sub("请上传文件.+", "", quest[title])
+        quest[title] = clean_quest_text("\n".join(quest[title]))
     return quest
 
 
@@ -731,7 +686,7 @@ def parse_node(node, add_asterisk=False):
     elif node.name == "div" and "tabbertab" in node["class"]:
         print()
 
-    elif node.name == "div" and re.search("(plotFrame|plotBox|foldFrame)", str(node["class"])):
+    elif node.name == "div" and nodes.class_contains(node, "plotFrame", "plotBox", "foldFrame"):
         if len(node.find_all("div", "plotBox")) <= 1:
             text = parse_plot(node)
         else:
@@ -742,7 +697,7 @@ def parse_node(node, add_asterisk=False):
         return ""
     elif node.name == "h2":
         return f"\n={node.text.strip()}="
-    elif node.name == "h3" or node.name == "blockquote" or "color:#b18300" in node.prettify():
+    elif node.name == "h3" or node.name == "blockquote" or nodes.markup_contains(node, "color:#b18300"):
         text = ""
         for line in node.text.split("\n"):
             if line.strip():
@@ -762,28 +717,29 @@ def parse_node(node, add_asterisk=False):
 
 
 def parse_legend_quest_list(route="/ys/%E4%BC%A0%E8%AF%B4%E4%BB%BB%E5%8A%A1"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, force_update=True)
+    found = set()
+    details = dispatch_details(parse_legend_quest, [(task.find("a")["href"],) for task in soup.find_all("div", class_="taskIcon")])
     for task in soup.find_all("div", class_="taskIcon"):
         info = task.find("a")
         title, href = info["title"], info["href"]
-        if title not in results:
+        if title not in found:
             try:
-                data = parse_legend_quest(href)
+                data = details.get(href)
                 if data:
-                    results[title] = data
-                    print(results[title])
+                    print(data)
             except:
                 print(traceback.format_exc())
                 continue
-    return results
+            if data:
+                found.add(title)
+                yield title, data
 
 
 def parse_legend_quest(route):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     info = {}
+    prefetch_routes([hint.find("a")["href"] for hint in soup.find_all("div", class_="tishi") if hint.find("a") and hint.find("a").has_attr("href")])
     for hint in soup.find_all("div", class_="tishi"):
         try:
             hint = hint.find("a")
@@ -799,23 +755,20 @@ def parse_legend_quest(route):
 
 
 def parse_world_quest_list(route="/ys/%E4%B8%96%E7%95%8C%E4%BB%BB%E5%8A%A1"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, force_update=True)
     tasks = list(soup.find_all("span", class_="home-an1"))
+    details = dispatch_details(parse_world_quest, [(task.find("a")["href"],) for task in tasks])
     for task in tqdm(tasks):
         info = task.find("a")
         title, href = info["title"], info["href"]
-        data = parse_world_quest(href)
+        data = details.get(href)
         if data:
-            results[title] = data
-            print(results[title])
-    return results
+            print(data)
+            yield title, data
 
 
 def parse_world_quest(route):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     info = {}
     table = soup.find("table", class_="wikitable")
     if table:
@@ -827,36 +780,39 @@ def parse_world_quest(route):
     return info
 
 
+@stream.list_output
 def parse_commission_quest_list(route="/ys/%E5%A7%94%E6%89%98%E4%BB%BB%E5%8A%A1"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
-    output = []
+    soup = load_soup(route, force_update=True)
     tasks = list(soup.find_all("div", class_="tishi"))
+    details = dispatch_details(parse_common_quest, [
+        (task.find("a")["href"],) for task in tasks
+        if task.find("a") and task.find("a").has_attr("href") and not re.search("[a-zA-Z]", task.find("a").get("title", ""))
+    ])
     for task in tqdm(tasks):
         try:
             info = task.find("a")
             title, href = info["title"], info["href"]
             if re.search("[a-zA-Z]", title):
                 continue
-            data = parse_common_quest(href)
+            data = details.get(href)
             if data:
-                output.append({"title": title, "content": data})
                 print({"title": title, "content": data})
         except:
             print(traceback.format_exc())
-    return output
+            continue
+        if data:
+            yield None, {"title": title, "content": data}
 
 
 def parse_birthday_email_list(route="/ys/邮件"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, force_update=True, scope="CardSelectTr")
     results = []
     table = soup.find("table", {"id": "CardSelectTr"})
     rows = table.find_all('tr')
     header_row = rows[0]
     headers = [header.text.strip() for header in header_row.find_all('th')]
     for row in tqdm(rows[1:]):
-        cells = [re.sub(r"(^图)*\s+", " ", cell.get_text()).strip() for cell in row.find_all('td')]
+        cells = [normalize.clean_cell(cell.get_text()) for cell in row.find_all('td')]
         info = {}
         for header, cell in zip(headers, cells):
             if cell:
@@ -872,23 +828,20 @@ def parse_birthday_email_list(route="/ys/邮件"):
 
 
 def parse_monster_list(route="/ys/怪物图鉴"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, force_update=True)
     entities = soup.find("div", class_="resp-tabs-container").find_all("div", class_="gicon m")
+    details = dispatch_details(parse_monster, [(entity.find_all("a")[-1]["href"],) for entity in entities])
     for entity in tqdm(entities):
         entity = entity.find_all("a")[-1]
         name = entity["title"]
-        data = parse_monster(entity["href"])
+        data = details.get(entity["href"])
+        print(name, data)
         if data:
-            results[name] = data
-        print(name, results[name])
-    return results
+            yield name, data
 
 
 def parse_monster(route):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     info = {}
     for h2 in soup.find_all('h2', {"id": False, "class": False}):
         title = h2.text.strip()
@@ -930,8 +883,7 @@ def parse_monster(route):
 
 
 def parse_animal_list(route="/ys/%E9%87%8E%E7%94%9F%E7%94%9F%E7%89%A9%E4%B8%80%E8%A7%88"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, force_update=True, scope="CardSelectTr")
     results = {}
     table = soup.find("table", {"id": "CardSelectTr"})
     rows = table.find_all('tr')
@@ -940,7 +892,7 @@ def parse_animal_list(route="/ys/%E9%87%8E%E7%94%9F%E7%94%9F%E7%89%A9%E4%B8%80%E
     for row in tqdm(rows[1:]):
         cells = []
         for j, cell in enumerate(row.find_all('td')[1:]):
-            cell = re.sub(r"(^图)*\s+", " ", cell.get_text()).strip()
+            cell = normalize.clean_cell(cell.get_text())
             cells.append(cell)
 
         name = cells[0]
@@ -959,49 +911,57 @@ def parse_tcg(route="/ys/%E4%B8%83%E5%9C%A3%E5%8F%AC%E5%94%A4"):
 
 
 def parse_tcg_card_list(route="/ys/%E5%8D%A1%E7%89%8C%E5%9B%BE%E9%89%B4"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, scope="CardSelectTr")
     table = soup.find("table", {"id": "CardSelectTr"})
     rows = table.find_all('tr')
     header_row = rows[0]
     headers = [header.text.strip() for header in header_row.find_all('th')][1:]
-    for row in tqdm(rows[1:]):
+    details = dispatch_details(parse_tcg_card, [
+        (row.find("a")["href"],) for row in rows[1:] if row.find("a") and "index.php" not in row.find("a")["href"]
+    ])
+    card_rows = []
+    for row in rows[1:]:
         cells = []
         for j, cell in enumerate(row.find_all('td')[1:]):
-            cell = re.sub(r"(^图)*\s+", " ", cell.get_text()).strip()
+            cell = normalize.clean_cell(cell.get_text())
             cells.append(cell)
 
         link = row.find("a")
         if "index.php" in link["href"]:
             continue
+        card_rows.append((link, cells))
 
+    # rows of the same name are merged into one entry, kept until the last row of the name
+    merged = {}
+    last_rows = stream.last_rows([cells[0] for _, cells in card_rows])
+    for (link, cells), last in zip(tqdm(card_rows), last_rows):
         name = cells[0]
-        if name not in results:
-            results[name] = {"basic": {}, "detail": {}}
+        entry = merged.setdefault(name, {"basic": {}, "detail": {}})
+        if last:
+            del merged[name]
         for header, cell in zip(headers, cells):
             if cell:
-                results[name]["basic"][header] = cell
+                entry["basic"][header] = cell
 
-        data = parse_tcg_card(link["href"])
+        data = details.get(link["href"])
         if data:
-            results[name]["detail"] = data
-        print(results[name])
-    return results
+            entry["detail"] = data
+        print(entry)
+        yield name, entry
 
 
 def parse_tcg_card(route):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     info = {}
     data = []
+    # the cost tags of the skill rows are left out of their text and of the rows read after them
+    costs = []
     for row in soup.find_all("div", class_="flex-row"):
         if "cost-box" in row["class"]:
             continue
         if "jiNeng" in row["class"]:
-            for tag in row.find_all(class_='cost'):
-                tag.decompose()
-        data.append(row.text.strip())
+            costs.extend(row.find_all(class_='cost'))
+        data.append(nodes.text_without(row, costs).strip())
     info["详细信息"] = data
     return info
 
@@ -1012,49 +972,50 @@ def parse_argot(route="/ys/%E9%BB%91%E8%AF%9D"):
 
 
 def parse_tips(route="/ys/%E8%BF%87%E5%9C%BA%E6%8F%90%E7%A4%BA"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route)
     for table in tqdm(soup.find_all("table", class_="wikitable")):
         title = table.find_previous("span", class_="mw-headline").text.strip()
-        results[title] = []
+        tips = []
         rows = table.find_all('tr')
         for row in rows[1:]:
             cells = []
             for j, cell in enumerate(row.find_all('td')):
-                cell = re.sub(r"(^图)*\s+", " ", cell.get_text()).strip()
+                cell = normalize.clean_cell(cell.get_text())
                 cells.append(cell)
             if len(cells) > 3:
                 cells = [cells[0], cells[-2]]
-            results[title].append("：".join(cells))
-    return results
+            tips.append("：".join(cells))
+        # a title met again replaces the tips of the earlier table
+        yield title, tips
 
 
 def parse_book_list(route="/ys/%E4%B9%A6%E7%B1%8D%E4%B8%80%E8%A7%88"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
-    info = {}
+    soup = load_soup(route, force_update=True)
+    details = dispatch_details(parse_common_quest, [
+        (a["href"],) for a in soup.find("div", class_="tishi").find_all_next("a")[1:] if a.has_attr("href")
+    ])
+    seen = set()
     for a in soup.find("div", class_="tishi").find_all_next("a")[1:]:
         try:
             href, title = a["href"], a["title"]
-            if title in info:
+            if title in seen:
                 continue
-            info[title] = parse_common_quest(href)
-            print(info[title])
+            book = details.get(href)
+            print(book)
         except:
-            pass
-    return info
+            continue
+        seen.add(title)
+        yield title, book
 
 
 def parse_achievement_list(route="/ys/%E6%88%90%E5%B0%B1%E7%B3%BB%E7%BB%9F"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    info = {}
+    soup = load_soup(route)
+    details = dispatch_details(parse_achievement, [(a.find("a")["href"],) for a in soup.find_all("div", class_="acBox")])
     for a in soup.find_all("div", class_="acBox"):
         a = a.find("a")
-        info[a["title"]] = parse_achievement(a["href"])
-        print(info[a["title"]])
-    return info
+        info = details.get(a["href"])
+        print(info)
+        yield a["title"], info
 
 
 def parse_achievement(route):
@@ -1065,207 +1026,177 @@ def parse_achievement(route):
 
 
 def parse_library(route="/ys/%E5%8C%97%E9%99%86%E5%9B%BE%E4%B9%A6%E9%A6%86"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, force_update=True)
+    prefetch_routes([menu.find("a")["href"] for menu in soup.find_all("div", class_="menu")[1:]])
     for i, menu in enumerate(soup.find_all("div", class_="menu")):
         menu_str = menu.text.strip()
-        results[menu_str] = {}
+        menu_results = {}
         # parse menu
         if i:
-            menu_html = load_html_by_route(menu.find("a")["href"])
-            menu_soup = BeautifulSoup(menu_html, 'html.parser')
+            menu_soup = load_soup(menu.find("a")["href"])
         else:
             menu_soup = soup
+        details = dispatch_details(parse_common_quest, [
+            (sub_menu.find("a")["href"], "h2", False) for sub_menu in menu_soup.find_all("div", class_="ct")
+            if "index.php" not in sub_menu.find("a")["href"]
+        ])
         for sub_menu in menu_soup.find_all("div", class_="ct"):
             sub_menu_str = sub_menu.text.strip()
             href = sub_menu.find("a")["href"]
             if "index.php" in href:
                 continue
-            data = parse_common_quest(href, add_asterisk=False)
+            data = details.get(href, "h2", False)
             if not data:
                 data = parse_common_quest(sub_menu.find("a")["href"], level="h3", add_asterisk=False)
             if data:
-                results[menu_str][sub_menu_str] = data
-                print(results[menu_str][sub_menu_str])
-    return results
-
-
-def parse_quest_item(url="https://wiki.biligame.com/ys/%E4%BB%BB%E5%8A%A1%E9%81%93%E5%85%B7%E4%B8%80%E8%A7%88"):
-    try:
-        from selenium import webdriver
-        from selenium.webdriver.chrome.service import Service
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.common.action_chains import ActionChains
-
-        options = webdriver.ChromeOptions()
-        options.headless = True
-        service = Service(executable_path=chromedriver_path)
-        driver = webdriver.Chrome(service=service, options=options)
-        actions = ActionChains(driver)
-    except:
-        print(traceback.format_exc())
-        return {}
-
-    driver.get(url)
-    time.sleep(5)
-    pages = driver.find_element(By.CSS_SELECTOR, "ul.pagination")
-    results = {}
+                menu_results[sub_menu_str] = data
+                print(menu_results[sub_menu_str])
+        yield menu_str, menu_results
+
+
+def query_grid_rows(url, query_button=False):
+    """rows of every page of the query grid of url, None when chromedriver cannot start"""
+    if grid_mode == "http":
+        return querygrid.collect_rows(pages.url_to_route(url), load_soup)
+    cache = open_cache(cache_dir, cache_backend)
+    if browser_replay:
+        grid_pages = snapshots.load_pages(cache, url, "grid")
+    else:
+        try:
+            grid_pages = querygrid.browser_pages(browser.get_pool(chromedriver_path, browser_sessions), url, query_button)
+        except browser.BrowserUnavailable as e:
+            print(e)
+            return None
+        snapshots.save_pages(cache, url, "grid", grid_pages)
     rows = []
-    page_buttons = pages.find_elements(By.CSS_SELECTOR, "li")[1:-1]
-    for i, c in enumerate(page_buttons):
-        pages = driver.find_element(By.CSS_SELECTOR, "ul.pagination")
-        c = pages.find_elements(By.CSS_SELECTOR, "li")[1:-1][i]
-        page_button = c.find_element(By.CSS_SELECTOR, "a")
-        actions.move_to_element(page_button).perform()
-        page_button.click()
-        time.sleep(2)
-        html = driver.find_element(By.CSS_SELECTOR, "div#queryDataGrid").get_attribute("outerHTML")
-        soup = BeautifulSoup(html, 'html.parser')
-        found_rows = soup.find("table").find_all("tr")[1:]
+    for html in grid_pages:
+        found_rows = querygrid.grid_rows(soup_memo.make_soup(html, parser_backend))
         print(f"found {len(found_rows)} items")
         rows.extend(found_rows)
+    return rows
+
+
+def parse_quest_item(url="https://wiki.biligame.com/ys/%E4%BB%BB%E5%8A%A1%E9%81%93%E5%85%B7%E4%B8%80%E8%A7%88"):
+    rows = query_grid_rows(url)
+    if rows is None:
+        return
+    details = dispatch_details(parse_quest_item_page, [
+        (tr.find_all("td")[1].find("a")["href"],) for tr in rows if "index.php" not in tr.find_all("td")[1].find("a")["href"]
+    ])
     for tr in tqdm(rows):
         a = tr.find_all("td")[1].find("a")
         title, href = a["title"], a["href"]
         if "index.php" in href:
             continue
-        html = load_html_by_route(href)
-        soup = BeautifulSoup(html, 'html.parser')
-        table = soup.find("table")
-        if table:
-            info = parse_table(table, keys_to_delete="同类素材")
-            if info:
-                results[title] = info
-                print(title, results[title])
-    return results
+        info = details.get(href)
+        if info:
+            print(title, info)
+            yield title, info
 
 
-def parse_furniture(url="https://wiki.biligame.com/ys/%E6%91%86%E8%AE%BE%E4%B8%80%E8%A7%88"):
-    try:
-        from selenium import webdriver
-        from selenium.webdriver.chrome.service import Service
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.common.action_chains import ActionChains
-
-        options = webdriver.ChromeOptions()
-        options.headless = True
-        service = Service(executable_path=chromedriver_path)
-        driver = webdriver.Chrome(service=service, options=options)
-        actions = ActionChains(driver)
-    except:
-        print(traceback.format_exc())
-        return {}
+def parse_quest_item_page(route):
+    soup = load_soup(route, scope=soup_memo.CONTENT)
+    table = soup.find("table")
+    if table:
+        return parse_table(table, keys_to_delete="同类素材")
+    return {}
 
-    driver.get(url)
-    time.sleep(3)
-    query = driver.find_element(By.CSS_SELECTOR, "span#queryDataBtn")
-    actions.move_to_element(query).perform()
-    query.click()
-    time.sleep(5)
 
-    pages = driver.find_element(By.CSS_SELECTOR, "ul.pagination")
-    results = {}
-    rows = []
-    page_buttons = pages.find_elements(By.CSS_SELECTOR, "li")[1:-1]
-    for i, c in enumerate(page_buttons):
-        pages = driver.find_element(By.CSS_SELECTOR, "ul.pagination")
-        c = pages.find_elements(By.CSS_SELECTOR, "li")[1:-1][i]
-        page_button = c.find_element(By.CSS_SELECTOR, "a")
-        actions.move_to_element(page_button).perform()
-        page_button.click()
-        time.sleep(3)
-        html = driver.find_element(By.CSS_SELECTOR, "div#queryDataGrid").get_attribute("outerHTML")
-        soup = BeautifulSoup(html, 'html.parser')
-        found_rows = soup.find("table").find_all("tr")[1:]
-        print(f"found {len(found_rows)} items")
-        rows.extend(found_rows)
+def parse_furniture(url="https://wiki.biligame.com/ys/%E6%91%86%E8%AE%BE%E4%B8%80%E8%A7%88"):
+    rows = query_grid_rows(url, query_button=True)
+    if rows is None:
+        return
+    details = dispatch_details(parse_furniture_page, [
+        (tr.find_all("td")[1].find("a")["href"],) for tr in rows if "index.php" not in tr.find_all("td")[1].find("a")["href"]
+    ])
     for tr in tqdm(rows):
         a = tr.find_all("td")[1].find("a")
         title, href = a["title"], a["href"]
         if "index.php" in href:
             continue
-        results[title] = {}
-        html = load_html_by_route(href)
-        soup = BeautifulSoup(html, 'html.parser')
-        for h2 in soup.find_all("h2")[1:]:
-            subtitle = h2.text.strip()
-            if not subtitle.strip():
-                continue
-            table = h2.find_next("table")
-            if table:
-                info = parse_table(table, keys_to_delete="同类素材")
-                if info:
-                    results[title][subtitle] = info
-        print(title, results[title])
-    return results
+        info = details.get(href)
+        print(title, info)
+        yield title, info
+
+
+def parse_furniture_page(route):
+    # the heading skipped below is counted on the whole page, it is not scoped
+    soup = load_soup(route)
+    info = {}
+    for h2 in soup.find_all("h2")[1:]:
+        subtitle = h2.text.strip()
+        if not subtitle.strip():
+            continue
+        table = h2.find_next("table")
+        if table:
+            table_info = parse_table(table, keys_to_delete="同类素材")
+            if table_info:
+                info[subtitle] = table_info
+    return info
+
+
+output_config = {
+    "角色图鉴": {
+        "角色一览.json": parse_character_list,
+        "角色语音.json": parse_character_voices,
+        "角色装扮.json": parse_character_outfits,
+    },
+    "装备图鉴": {
+        "武器一览.json": parse_weapon_list,
+        "圣遗物一览.json": parse_relic_list,
+    },
+    "物品一览": {
+        "食物一览.json": parse_food_list,
+        "材料一览.json": parse_material_list,
+        "道具一览.json": parse_item_list,
+        "摆设一览.json": parse_furniture,
+        "摆设套装一览.json": parse_furniture_suite_list,
+    },
+    "七圣召唤": {
+        "七圣召唤.json": parse_tcg,
+        "卡牌一览.json": parse_tcg_card_list,
+    },
+    "生物志": {
+        "怪物一览.json": parse_monster_list,
+        "野生生物一览.json": parse_animal_list,
+        "地理志一览.json": parse_geography_list,
+        "NPC图鉴.json": parse_npc_list,
+    },
+    "书籍一览": {
+        "书籍一览.json": parse_book_list,
+    },
+    "成就一览": {
+        "成就一览.json": parse_achievement_list,
+    },
+    "任务": {
+        "魔神任务.json": parse_archon_quest_list,
+        "传说任务.json": parse_legend_quest_list,
+        "世界任务.json": parse_world_quest_list,
+        "委托任务.json": parse_commission_quest_list,
+    },
+    "邮件": {
+        "生日邮件.json": parse_birthday_email_list,
+    },
+    "扩展阅读": {
+        "北陆图书馆.json": parse_library,
+        "过场提示.json": parse_tips,
+        "黑话.json": parse_argot,
+    },
+    "任务道具": {
+        "任务道具.json": parse_quest_item
+    }
+}
 
 
 if __name__ == '__main__':
     # parse main page
     # parse_main_page()
 
-    output_dir = "data"
-    os.makedirs(output_dir, exist_ok=True)
-
-    output_config = {
-        "角色图鉴": {
-            "角色一览.json": parse_character_list,
-            "角色语音.json": parse_character_voices,
-            "角色装扮.json": parse_character_outfits,
-        },
-        "装备图鉴": {
-            "武器一览.json": parse_weapon_list,
-            "圣遗物一览.json": parse_relic_list,
-        },
-        "物品一览": {
-            "食物一览.json": parse_food_list,
-            "材料一览.json": parse_material_list,
-            "道具一览.json": parse_item_list,
-            "摆设一览.json": parse_furniture,
-            "摆设套装一览.json": parse_furniture_suite_list,
-        },
-        "七圣召唤": {
-            "七圣召唤.json": parse_tcg,
-            "卡牌一览.json": parse_tcg_card_list,
-        },
-        "生物志": {
-            "怪物一览.json": parse_monster_list,
-            "野生生物一览.json": parse_animal_list,
-            "地理志一览.json": parse_geography_list,
-            "NPC图鉴.json": parse_npc_list,
-        },
-        "书籍一览": {
-            "书籍一览.json": parse_book_list,
-        },
-        "成就一览": {
-            "成就一览.json": parse_achievement_list,
-        },
-        "任务": {
-            "魔神任务.json": parse_archon_quest_list,
-            "传说任务.json": parse_legend_quest_list,
-            "世界任务.json": parse_world_quest_list,
-            "委托任务.json": parse_commission_quest_list,
-        },
-        "邮件": {
-            "生日邮件.json": parse_birthday_email_list,
-        },
-        "扩展阅读": {
-            "北陆图书馆.json": parse_library,
-            "过场提示.json": parse_tips,
-            "黑话.json": parse_argot,
-        },
-        "任务道具": {
-            "任务道具.json": parse_quest_item
-        }
-    }
-
-    for dirname, parser_funcs in output_config.items():
-        dirpath = os.path.join(output_dir, dirname)
-        os.makedirs(dirpath, exist_ok=True)
+    # python parse.py --help for selecting outputs, see biligame/runner.py
+    exit_code = runner.main(sys.modules[__name__])
 
-        for filename, parser_func in parser_funcs.items():
-            output = parser_func()
-            filepath = os.path.join(dirpath, filename)
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(output, f, ensure_ascii=False, indent=4)
+    pages.print_summary()
+    soup_memo.print_summary()
+    results.print_summary()
+    frontier.print_summary()
+    sys.exit(exit_code)
@@ -1,144 +1,77 @@
-import json
 import os
-import re
-import time
-import traceback
+import sys
 
 from tqdm import tqdm
-import requests
-from bs4 import BeautifulSoup
-import urllib.parse
+
+# the shared biligame package lives next to this game's folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from biligame import browser, frontier, nodes, normalize, pages, parallel, results, runner, snapshots
+from biligame import soup as soup_memo
+from biligame.cache import open_cache
+from biligame.tables import parse_table
 
 
 cache_dir = "D:/data/biligame/starrail"
+# "sqlite": one compressed pages.sqlite file, "file": one html file per page (see biligame/cache.py)
+cache_backend = "sqlite"
+# "page": download detail pages one by one, "api": render them in batches through api.php (see biligame/mediawiki.py)
+fetch_mode = "page"
+# "html.parser", "lxml" (faster, pip install lxml) or "html5lib", check with biligame/compare_backends.py first
+parser_backend = "html.parser"
+# processes parsing detail pages, 1 parses them one by one in this process (see biligame/parallel.py)
+parse_workers = 1
+# reuse the stored result of a detail page whose html and parser code did not change (see biligame/results.py)
+incremental = True
+# build only the part of a page a parser reads (scope=...), False builds whole pages (see biligame/soup.py)
+scoped_parsing = True
 chromedriver_path="D:/tools/chromedriver-win64/chromedriver.exe"
+# Chrome sessions the browser-driven parsers use at once (see biligame/browser.py)
+browser_sessions = 3
+# True: parse 短信 from the DOM snapshots stored by the last browser run, without Chrome (see biligame/snapshots.py)
+browser_replay = False
 
 
 def load_html_by_route(route, force_update=False):
-    try:
-        assert not force_update
-        filename = "wiki.biligame.com" + route.replace("/", "_") + ".html"
-        with open(os.path.join(cache_dir, filename), "r", encoding="utf-8") as f:
-            html = f.read()
-    except (FileNotFoundError, AssertionError):
-        print("filename not found", route)
-        if route.startswith("/"):
-            route = route[1:]
-        url = f"https://wiki.biligame.com/{route}"
-        html = requests.get(url).text
-        save_html(url, html, force_update)
-    return html
+    return pages.load_html(open_cache(cache_dir, cache_backend), route, force_update)
 
 
 def save_html(page_url, html_content, force_update=False):
-    # convert URL into a valid filename
-    filename = page_url.replace("http://", "").replace("https://", "").replace("/", "_") + ".html"
-    filepath = os.path.join(cache_dir, filename)
-    directory = os.path.dirname(filepath)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-    if not os.path.exists(filepath) or force_update:
-        try:
-            with open(filepath, 'w', encoding="utf-8") as f:
-                f.write(html_content)
-            print(filename, " saved.")
-        except OSError:
-            filename = urllib.parse.unquote(filename)
-            filepath = os.path.join(cache_dir, filename)
-            if not os.path.exists(filepath):
-                with open(filepath, 'w', encoding="utf-8") as f:
-                    f.write(html_content)
-                print(filename, " saved.")
-        except:
-            print(traceback.format_exc())
-
-
-def parse_table(table):
-    rows = table.find_all('tr')
-    if len(rows[0].find_all("th")) > 1 and not rows[0].find_all("td"):
-        table_type = "header_top"
-    elif len(table.find_all("th")) == len(table.find_all("td")):
-        table_type = "header_cell_equal"
-    elif rows[-1].find_all("th") and rows[-1].find_all("td"):
-        table_type = "header_left"
-    elif not table.find_all("th") and table.find_all("td"):
-        table_type = "no_header"
-    else:
-        raise NotImplementedError
+    pages.save_html(open_cache(cache_dir, cache_backend), page_url, html_content, force_update)
 
-    if table_type == "header_top":
-        headers = [header.text.strip() for header in rows[0].find_all('th')]
-        info = []
-        for row in rows[1:]:
-            row_info = {}
-            for header, cell in zip(headers, row.find_all('td')):
-                if not header:
-                    continue
-                if header == "稀有度":
-                    row_info[header] = cell.find('img')["alt"].split(".")[0]
-                else:
-                    row_info[header] = re.sub(r"(^图)*\s+", " ", cell.text).strip()
-            row_info = {k: v for k, v in row_info.items() if k and v}
-            info.append(row_info)
-    elif table_type == "header_cell_equal":
-        info = {}
-        for header, cell in zip(table.find_all("th"), table.find_all("td")):
-            header = header.text.strip()
-            if header == "稀有度":
-                info[header] = cell.find('img')["alt"].split(".")[0]
-            else:
-                info[header] = re.sub(r"(^图)*\s+", " ", cell.text).strip()
-    elif table_type == "header_left":
-        info = {}
-        for tr in table.find_all('tr'):
-            if not tr.find("td"):
-                continue
-            headers = []
-            for h in tr.find_all('th'):
-                if h.has_attr("style") and "display:none" in h["style"]:
-                    continue
-                header = h.text.split("Media")[0].strip()
-                headers.append(header)
-            if not headers:
-                continue
-            header = " - ".join([h for h in headers if h])
-
-            if header == "稀有度":
-                content = tr.find('img')["alt"].split(".")[0]
-            else:
-                content = tr.find("td").text.strip().replace("\xa0", " ")
-            if not content or "文件:" in content or content == "'":
-                continue
-            info[header] = content
-    elif table_type == "no_header":
-        info = [td.text.strip() for td in table.find_all("td")]
-    else:
-        raise NotImplementedError
 
-    if isinstance(info, dict):
-        info = {k: v for k, v in info.items() if k and v}
-    elif isinstance(info, list):
-        info = [l for l in info if l]
-    return info
+def load_soup(route, force_update=False, mutable=False, scope=None):
+    """parsed page, shared with every other parse function of this run unless mutable=True (see biligame/soup.py)"""
+    html = load_html_by_route(route, force_update)
+    return soup_memo.parse_document(route, html, mutable, parser_backend, scope if scoped_parsing else None)
+
+
+def prefetch_routes(routes):
+    """download the uncached child pages of a list page concurrently (see biligame/fetch.py for rate limits)"""
+    pages.prefetch(open_cache(cache_dir, cache_backend), routes, fetch_mode)
+
+
+def dispatch_details(func, calls):
+    """prefetch and start func(*args) for all calls on the parse pool, read results back with .get(*args)"""
+    calls = [tuple(args) for args in calls]
+    prefetch_routes([args[0] for args in calls])
+    return parallel.dispatch(func, calls, parse_workers)
 
 
 def parse_character_list(route="/sr/%E8%A7%92%E8%89%B2%E5%9B%BE%E9%89%B4"):
-    html = load_html_by_route(route, force_update=True)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
-    for character in soup.find("div", {"id": "CardSelectTr"}).find_all("div", class_="visible-xs"):
+    soup = load_soup(route, force_update=True, scope="CardSelectTr")
+    characters = soup.find("div", {"id": "CardSelectTr"}).find_all("div", class_="visible-xs")
+    details = dispatch_details(parse_character_info, [(character.find("a")["href"],) for character in characters])
+    for character in characters:
         node = character.find("a")
-        data = parse_character_info(node["href"])
-        if data:
-            results[node["title"]] = data
+        data = details.get(node["href"])
         print(node["title"], data)
-    return results
+        if data:
+            yield node["title"], data
 
 
 def parse_character_info(route):
     info = {}
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
 
     quote = soup.find("div", {"style": "font-size: 18px;font-weight: bold;"})
     if quote:
@@ -168,24 +101,24 @@ def parse_character_info(route):
 
 
 def parse_character_voice_list(route="/sr/%E8%A7%92%E8%89%B2%E8%AF%AD%E9%9F%B3"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route)
+    found = set()
+    details = dispatch_details(parse_character_voice, [(character.find("a")["href"],) for character in soup.find_all("div", class_="ping0")])
     for character in soup.find_all("div", class_="ping0"):
         node = character.find("a")
-        if node["title"] in results:
+        if node["title"] in found:
             continue
-        data = parse_character_voice(node["href"])
-        if data:
-            results[node["title"]] = data
+        data = details.get(node["href"])
         print(node["title"], data)
-    return results
+        if data:
+            found.add(node["title"])
+            yield node["title"], data
 
 
 def parse_character_voice(route):
     info = {}
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    # the tables skipped below are counted on the whole page, it is not scoped
+    soup = load_soup(route)
     for table in soup.find_all("table", class_="wikitable")[2:]:
         rows = table.find_all("tr")
         title = rows[0].text.strip()
@@ -194,27 +127,26 @@ def parse_character_voice(route):
     return info
 
 
-def parse_lightcone_list(route="sr/%E5%85%89%E9%94%A5%E4%B8%80%E8%A7%88"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+def parse_lightcone_list(route="/sr/%E5%85%89%E9%94%A5%E4%B8%80%E8%A7%88"):
+    soup = load_soup(route, scope="CardSelectTr")
+    found = set()
     table = soup.find("table", {"id": "CardSelectTr"})
     rows = table.find_all("tr")
+    details = dispatch_details(parse_lightcone, [(row.find("a")["href"],) for row in rows[1:]])
     for row in rows[1:]:
         node = row.find("a")
-        if node["title"] in results:
+        if node["title"] in found:
             continue
-        data = parse_lightcone(node["href"])
-        if data:
-            results[node["title"]] = data
+        data = details.get(node["href"])
         print(node["title"], data)
-    return results
+        if data:
+            found.add(node["title"])
+            yield node["title"], data
 
 
 def parse_lightcone(route):
     info = {}
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     basic_info = soup.find("table", class_="wikitable")
     info["基础信息"] = parse_table(basic_info)
     for h2 in soup.find_all("h2"):
@@ -231,26 +163,25 @@ def parse_lightcone(route):
 
 
 def parse_relic_list(route="/sr/%E9%81%97%E5%99%A8%E7%AD%9B%E9%80%89"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, scope="CardSelectTr")
+    found = set()
     table = soup.find("table", {"id": "CardSelectTr"})
     rows = table.find_all("tr")
+    details = dispatch_details(parse_relic, [(row.find("a")["href"],) for row in rows[1:]])
     for row in rows[1:]:
         node = row.find("a")
-        if node["title"] in results:
+        if node["title"] in found:
             continue
-        data = parse_relic(node["href"])
-        if data:
-            results[node["title"]] = data
+        data = details.get(node["href"])
         print(node["title"], data)
-    return results
+        if data:
+            found.add(node["title"])
+            yield node["title"], data
 
 
 def parse_relic(route):
     info = {}
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     basic_info = soup.find("table", class_="wikitable")
     info["基本信息"] = parse_table(basic_info)
     for h2 in soup.find_all("h2"):
@@ -275,31 +206,40 @@ def parse_relic(route):
 
 
 def parse_trailblaze_quest_list(route="/sr/%E5%BC%80%E6%8B%93%E4%BB%BB%E5%8A%A1"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route)
+    # [(chapter, [(mission, [(title, href), ...]), ...]), ...] in page order
+    chapters = []
     for h2 in soup.find_all("h2")[2:]:
         chapter = h2.text.strip()
-        results[chapter] = {}
+        missions = []
         for node in h2.next_siblings:
             if node.name == "div" and "drop-down-wrap" in node["class"]:
                 mission = node.find("div", class_="title").text.strip().replace("展开/折叠", "")
-                results[chapter][mission] = {}
-                for subnode in node.find("div", class_="wrap-content").find_all("a"):
-                    title = subnode["title"]
-                    data = parse_mission_page(subnode["href"])
-                    if data:
-                        results[chapter][mission][title] = data
-                        print(data)
+                links = [(subnode["title"], subnode["href"]) for subnode in node.find("div", class_="wrap-content").find_all("a")]
+                missions.append((mission, links))
             if node.name == "h2":
                 break
-    return results
+        chapters.append((chapter, missions))
+
+    details = dispatch_details(parse_mission_page, [(href,) for _, missions in chapters for _, links in missions for _, href in links])
+    # a chapter is written out once all of its missions are parsed, a chapter or mission met again replaces the
+    # earlier one
+    for chapter, missions in chapters:
+        chapter_results = {}
+        for mission, links in missions:
+            chapter_results[mission] = {}
+            for title, href in links:
+                data = details.get(href)
+                if data:
+                    chapter_results[mission][title] = data
+                    print(data)
+        yield chapter, chapter_results
 
 
 def parse_mission_page(route):
     info = {}
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    # irrelevant tags and signatures are decomposed below
+    soup = load_soup(route, mutable=True, scope=soup_memo.CONTENT)
     basic_info = soup.find("table", class_="wikitable")
     if basic_info:
         info["基本信息"] = parse_table(basic_info)
@@ -363,6 +303,10 @@ def parse_plot(node, is_mailFrame=False):
     return text
 
 
+# runs of non-breaking spaces become one space, single ones are dropped (see biligame/normalize.py)
+clean_quest_spaces = normalize.Normalizer(("\xa0+", lambda match: " " if match.end() - match.start() > 1 else ""))
+
+
 def parse_common_quest(node, mode="children"):
     if not node:
         return ""
@@ -430,57 +374,72 @@ def parse_common_quest(node, mode="children"):
             else:
                 text.append(f"{node.text.strip()}")
     text = "\n".join([l for l in text if "MediaWiki" not in l])
-    text = re.sub(" {2,}", " ", text)
-    text = text.replace(" ", "")
+    text = clean_quest_spaces(text)
     return text.strip()
 
 
 def parse_companion_quest_list(route="/sr/%E5%90%8C%E8%A1%8C%E4%BB%BB%E5%8A%A1"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route)
+    # [(chapter, [(mission, [(title, href), ...]), ...]), ...] in page order
+    chapters = []
     for h2 in soup.find_all("h2")[2:]:
         chapter = h2.text.strip()
-        results[chapter] = {}
+        missions = []
         unique_title = set()
         for node in h2.next_siblings:
             if node.name == "div" and "drop-down-wrap" in node["class"]:
                 mission = node.find("div", class_="title").text.strip().replace("展开/折叠", "")
-                results[chapter][mission] = {}
+                links = []
                 for subnode in node.find("div", class_="wrap-content").find_all("a"):
                     title = subnode["title"]
                     if title in unique_title:
                         continue
                     unique_title.add(title)
-                    data = parse_mission_page(subnode["href"])
-                    if data:
-                        results[chapter][mission][title] = data
-                        print(chapter, mission, data)
+                    links.append((title, subnode["href"]))
+                missions.append((mission, links))
             if node.name == "h2":
                 break
-    return results
+        chapters.append((chapter, missions))
+
+    details = dispatch_details(parse_mission_page, [(href,) for _, missions in chapters for _, links in missions for _, href in links])
+    for chapter, missions in chapters:
+        chapter_results = {}
+        for mission, links in missions:
+            chapter_results[mission] = {}
+            for title, href in links:
+                data = details.get(href)
+                if data:
+                    chapter_results[mission][title] = data
+                    print(chapter, mission, data)
+        yield chapter, chapter_results
 
 
 def parse_adventure_quest_list(route="/sr/%E5%86%92%E9%99%A9%E4%BB%BB%E5%8A%A1"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route)
+    # [(title, [(subtitle, [(name, href), ...]), ...]), ...] in page order
+    sections = []
     for h2 in soup.find_all("h2")[2:]:
         title = h2.text.strip()
-        results[title] = {}
+        subsections = []
         for h in h2.find_all_next(["h3", "h2"]):
             if h.name == "h2":
                 break
             subtitle = h.text.strip()
-            results[title][subtitle] = {}
-            for li in h.find_next("ul").find_all("li"):
-                node = li.find("a")
-                name = node["title"]
-                data = parse_mission_page(node["href"])
+            links = [(li.find("a")["title"], li.find("a")["href"]) for li in h.find_next("ul").find_all("li")]
+            subsections.append((subtitle, links))
+        sections.append((title, subsections))
+
+    details = dispatch_details(parse_mission_page, [(href,) for _, subsections in sections for _, links in subsections for _, href in links])
+    for title, subsections in sections:
+        title_results = {}
+        for subtitle, links in subsections:
+            title_results[subtitle] = {}
+            for name, href in links:
+                data = details.get(href)
                 if data:
-                    results[title][subtitle][name] = data
+                    title_results[subtitle][name] = data
                     print(title, subtitle, data)
-    return results
+        yield title, title_results
 
 
 def parse_daily_quest_list(route="/sr/%E6%97%A5%E5%B8%B8%E4%BB%BB%E5%8A%A1"):
@@ -496,132 +455,166 @@ def parse_interaction_event_list(route="/sr/%E4%BA%A4%E4%BA%92%E4%BA%8B%E4%BB%B6
 
 
 def parse_book_list(route="/sr/%E4%B9%A6%E6%9E%B6"):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
-    results = {}
+    soup = load_soup(route, scope="CardSelectTr")
     books = soup.find("div", {"id": "CardSelectTr"})
+    details = dispatch_details(parse_book, [(book.find("a")["href"],) for book in books.find_all("div", class_="book-image")])
     for book in tqdm(books.find_all("div", class_="book-image")):
         node = book.find("a")
         title = node["title"]
-        data = parse_book(node["href"])
+        data = details.get(node["href"])
         if data:
-            results[title] = data
-    return results
+            yield title, data
 
 
 def parse_book(route):
-    html = load_html_by_route(route)
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = load_soup(route, scope=soup_memo.CONTENT)
     info = {}
     quote = soup.find("blockquote")
     if quote:
         info["引用"] = quote.text.strip()
 
+    # the title of a row is left out of its text and of the rows read after it
+    titles = []
     for row in soup.find_all("div", class_="row"):
-        h2 = row.find("h2")
+        h2 = next((h2 for h2 in row.find_all("h2") if all(h2 is not title for title in titles)), None)
         if not h2:
             continue
         title = h2.text.strip()
-        h2.decompose()
-        info[title] = row.text.strip().replace(" ", "")
+        titles.append(h2)
+        info[title] = nodes.text_without(row, titles).strip().replace(" ", "")
     return info
 
 
+def open_messages(driver, url):
+    if getattr(driver, "messages_url", None) != url:
+        driver.get(url)
+        browser.wait_for(driver, "ul.resp-tabs-list li")
+        driver.messages_url = url
+
+
+def click_tab(driver, tab):
+    browser.click(driver, tab)
+    browser.wait_until(driver, lambda _: "active" in (tab.get_attribute("class") or ""))
+
+
+def read_message_organization(driver, url, k):
+    """(organization, [(character, [(title, CodeContainer html), ...]), ...]) of the k-th organization tab"""
+    from selenium.webdriver.common.by import By
+
+    open_messages(driver, url)
+    # choose org
+    org = driver.find_element(By.CSS_SELECTOR, "ul.resp-tabs-list").find_elements(By.CSS_SELECTOR, "li")[k]
+    organization_name = org.text.strip()
+    click_tab(driver, org)
+    # choose message character
+    character_section = driver.find_elements(By.CSS_SELECTOR, "ul.Messages-resp-tabs-list")[k]
+    characters = []
+    for c in character_section.find_elements(By.CSS_SELECTOR, "li"):
+        character = c.text.strip()
+        click_tab(driver, c)
+        title_section = browser.wait_for(driver, "div.title-content")
+        titles = []
+        for i in range(len(title_section.find_elements(By.CSS_SELECTOR, "li.bili-list-style"))):
+            title_section = driver.find_element(By.CSS_SELECTOR, "div.title-content")
+            t = title_section.find_elements(By.CSS_SELECTOR, "li.bili-list-style")[i]
+            browser.click(driver, t)
+            containers = browser.wait_until(driver, lambda d: d.find_elements(By.CSS_SELECTOR, "div.CodeContainer")[i:])
+            titles.append((t.text.strip(), containers[0].get_attribute("outerHTML")))
+        characters.append((character, titles))
+    return organization_name, characters
+
+
+def save_message_snapshots(cache, url, organizations):
+    """every CodeContainer as messages/<organization>/<character>/<title>, the names as the messages index"""
+    index = []
+    for k, (organization_name, characters) in enumerate(organizations):
+        index.append([organization_name, [[character, [title for title, _ in titles]] for character, titles in characters]])
+        for c, (character, titles) in enumerate(characters):
+            for i, (title, html) in enumerate(titles):
+                snapshots.put(cache, url, f"messages/{k}/{c}/{i}", html)
+    snapshots.put_index(cache, url, "messages", index)
+    print(f"snapshots of {url} saved.")
+
+
+def load_message_snapshots(cache, url):
+    """the organizations of read_message_organization, from the snapshots of the last browser run"""
+    return [
+        (organization_name, [
+            (character, [(title, snapshots.get(cache, url, f"messages/{k}/{c}/{i}")) for i, title in enumerate(titles)])
+            for c, (character, titles) in enumerate(characters)
+        ])
+        for k, (organization_name, characters) in enumerate(snapshots.get_index(cache, url, "messages"))
+    ]
+
+
 def parse_messages(
     url="https://wiki.biligame.com/sr/%E7%9F%AD%E4%BF%A1",
 ):
-    """message page uses javascript, so we apply selenium to crawl"""
-    try:
-        from selenium import webdriver
-        from selenium.webdriver.chrome.service import Service
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.common.action_chains import ActionChains
-
-        options = webdriver.ChromeOptions()
-        options.headless = True
-        service = Service(executable_path=chromedriver_path)
-        driver = webdriver.Chrome(service=service, options=options)
-        actions = ActionChains(driver)
-    except:
-        print(traceback.format_exc())
-        return {}
-
-    driver.get(url)
-    driver.implicitly_wait(10)
-    org_section = driver.find_element(By.CSS_SELECTOR, "ul.resp-tabs-list")
+    """message page uses javascript, so we apply selenium to crawl, one organization per browser session"""
+    cache = open_cache(cache_dir, cache_backend)
+    if browser_replay:
+        organizations = load_message_snapshots(cache, url)
+    else:
+        pool = browser.get_pool(chromedriver_path, browser_sessions)
+        try:
+            with pool.session() as driver:
+                from selenium.webdriver.common.by import By
+
+                open_messages(driver, url)
+                org_count = len(driver.find_element(By.CSS_SELECTOR, "ul.resp-tabs-list").find_elements(By.CSS_SELECTOR, "li"))
+        except browser.BrowserUnavailable as e:
+            print(e)
+            return {}
+        organizations = pool.map(lambda driver, k: read_message_organization(driver, url, k), range(org_count))
+        save_message_snapshots(cache, url, organizations)
+
     results = {}
-    for k, org in enumerate(org_section.find_elements(By.CSS_SELECTOR, "li")):
-        # choose org
-        organization_name = org.text.strip()
+    for organization_name, characters in organizations:
         results[organization_name] = {}
-        actions.move_to_element(org).perform()
-        # driver.execute_script("arguments[0].scrollIntoView(true);", org)
-        org.click()
-        time.sleep(1)
-        # choose message character
-        character_section = driver.find_elements(By.CSS_SELECTOR, "ul.Messages-resp-tabs-list")[k]
-        for c in character_section.find_elements(By.CSS_SELECTOR, "li"):
-            character = c.text.strip()
+        for character, titles in characters:
             results[organization_name][character] = {}
-            actions.move_to_element(c).perform()
-            c.click()
-            time.sleep(1)
-            title_section = driver.find_element(By.CSS_SELECTOR, "div.title-content")
-            titles = title_section.find_elements(By.CSS_SELECTOR, "li.bili-list-style")
-            for i in range(len(titles)):
-                title_section = driver.find_element(By.CSS_SELECTOR, "div.title-content")
-                t = title_section.find_elements(By.CSS_SELECTOR, "li.bili-list-style")[i]
-                actions.move_to_element(t).perform()
-                t.click()
-                time.sleep(0.1)
-                title = t.text.strip()
+            for title, html in titles:
                 results[organization_name][character][title] = {}
-                html = driver.find_elements(By.CSS_SELECTOR, "div.CodeContainer")[i].get_attribute('outerHTML')
-                soup = BeautifulSoup(html, 'html.parser')
+                soup = soup_memo.make_soup(html, parser_backend)
                 data = parse_common_quest(soup.find("div", class_="CodeContainer"))
                 if data:
                     results[organization_name][character][title] = data
                     print(organization_name, character, title, data)
-
-    driver.quit()
     return results
 
 
-if __name__ == '__main__':
-    output_dir = "data"
-    os.makedirs(output_dir, exist_ok=True)
-
-    output_config = {
-        "角色图鉴": {
-            "角色一览.json": parse_character_list,
-            "角色语音.json": parse_character_voice_list,
-        },
-        "装备图鉴": {
-            "光锥一览.json": parse_lightcone_list,
-            "装备一览.json": parse_relic_list,
-        },
-        "任务": {
-            "开拓任务.json": parse_trailblaze_quest_list,
-            "同行任务.json": parse_companion_quest_list,
-            "冒险任务.json": parse_adventure_quest_list,
-            "日常任务.json": parse_daily_quest_list,
-            "活动任务.json": parse_event_quest_list,
-            "交互事件.json": parse_interaction_event_list,
-        },
-        "书籍一览": {
-            "书籍.json": parse_book_list,
-        },
-        "短信一览": {
-            "短信.json": parse_messages
-        }
+output_config = {
+    "角色图鉴": {
+        "角色一览.json": parse_character_list,
+        "角色语音.json": parse_character_voice_list,
+    },
+    "装备图鉴": {
+        "光锥一览.json": parse_lightcone_list,
+        "装备一览.json": parse_relic_list,
+    },
+    "任务": {
+        "开拓任务.json": parse_trailblaze_quest_list,
+        "同行任务.json": parse_companion_quest_list,
+        "冒险任务.json": parse_adventure_quest_list,
+        "日常任务.json": parse_daily_quest_list,
+        "活动任务.json": parse_event_quest_list,
+        "交互事件.json": parse_interaction_event_list,
+    },
+    "书籍一览": {
+        "书籍.json": parse_book_list,
+    },
+    "短信一览": {
+        "短信.json": parse_messages
     }
+}
 
-    for dirname, parser_funcs in output_config.items():
-        dirpath = os.path.join(output_dir, dirname)
-        os.makedirs(dirpath, exist_ok=True)
 
-        for filename, parser_func in parser_funcs.items():
-            output = parser_func()
-            filepath = os.path.join(dirpath, filename)
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(output, f, ensure_ascii=False, indent=4)
+if __name__ == '__main__':
+    # python parse.py --help for selecting outputs, see biligame/runner.py
+    exit_code = runner.main(sys.modules[__name__])
+
+    pages.print_summary()
+    soup_memo.print_summary()
+    results.print_summary()
+    frontier.print_summary()
+    sys.exit(exit_code)
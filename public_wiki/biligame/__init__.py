@@ -0,0 +1 @@
+"""Shared crawling utilities for the wiki.biligame.com parsers (Genshin_Impact_zh, Honkail_Star_Rail_zh)."""
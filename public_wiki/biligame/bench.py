@@ -0,0 +1,271 @@
+"""
+Offline benchmark of the parse_* functions of the zh parsers over a frozen sample of cached pages.
+
+freeze runs the outputs of each page type (character, NPC, quest, food, monster, TCG card / mission, book) offline
+on a filled page cache, records the first calls of every parse_* function made with plain arguments (routes, levels,
+flags) in each output, stops the output there, and copies the pages those calls read into a fixture cache:
+
+    cd public_wiki
+    python -m biligame.bench freeze --cache-dir genshin=D:/data/biligame/genshin --cache-dir starrail=D:/data/biligame/starrail
+
+run replays the recorded calls on the fixture cache only (no network, no result store, one process) and reports
+pages/second (best of --repeat passes, the soup memo cleared before each) and the peak memory allocated by one call
+(tracemalloc). The results are saved under <fixtures>/results, --compare puts an earlier run next to them:
+
+    python -m biligame.bench run --save before
+    python -m biligame.bench run --save after --compare before
+
+The fixture folder holds the corpus (pages.sqlite and manifest.json), keep it for as long as runs are compared.
+"""
+import argparse
+import contextlib
+import functools
+import inspect
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from . import pages, runner, soup, stream
+from .cache import open_cache
+from .games import GAME_DIRS, PUBLIC_WIKI_DIR, load_game
+
+
+FIXTURES_DIR = os.path.join(PUBLIC_WIKI_DIR, "bench_fixtures")
+MANIFEST_FILE = "manifest.json"
+# outputs whose detail pages make up the corpus
+FREEZE_OUTPUTS = {
+    "genshin": ["角色一览.json", "NPC图鉴.json", "任务", "食物一览.json", "怪物一览.json", "卡牌一览.json"],
+    "starrail": ["任务", "书籍一览"],
+}
+# recorded calls per parse_* function and output
+CALLS_PER_OUTPUT = 10
+PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+class Enough(BaseException):
+    """stops an output once its detail function has its sample (BaseException: parsers catch Exception)"""
+
+
+class Recorder:
+    def __init__(self, limit):
+        self.limit = limit
+        # {name: [[args, kwargs], ...]}
+        self.calls = {}
+        # calls recorded for the running output
+        self.output_calls = Counter()
+        # {route: digest} of the pages read by the recorded calls
+        self.routes = {}
+        self.depth = 0
+
+    def wrap(self, name, func):
+        calls = self.calls.setdefault(name, [])
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            plain = all(isinstance(a, PLAIN_TYPES) for a in list(args) + list(kwargs.values()))
+            if not plain or self.limit <= self.output_calls[name]:
+                if plain and self.depth == 0:
+                    raise Enough(name)
+                return func(*args, **kwargs)
+            self.depth += 1
+            try:
+                with pages.track_loads() as loads:
+                    result = func(*args, **kwargs)
+                    if stream.is_stream(result):
+                        result = stream.collect(result)
+            finally:
+                self.depth -= 1
+            calls.append([list(args), kwargs])
+            self.output_calls[name] += 1
+            self.routes.update(loads)
+            return result
+        return wrapper
+
+
+@contextlib.contextmanager
+def recording(module, recorder):
+    originals = {}
+    for name, func in list(vars(module).items()):
+        if name.startswith("parse_") and inspect.isfunction(func) and func.__module__ == module.__name__:
+            originals[name] = func
+            setattr(module, name, recorder.wrap(name, func))
+    try:
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(module, name, func)
+
+
+def prepare(module):
+    # every call runs in this process, from the pages only
+    module.incremental = False
+    module.parse_workers = 1
+    soup.document_cache.clear()
+
+
+def load_manifest(fixtures_dir):
+    with open(os.path.join(fixtures_dir, MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def freeze(games, fixtures_dir, cache_dirs, limit=CALLS_PER_OUTPUT):
+    """record the corpus of games, the games frozen earlier are kept"""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    fixture_cache = open_cache(fixtures_dir)
+    manifest = {"games": {}}
+    if os.path.exists(os.path.join(fixtures_dir, MANIFEST_FILE)):
+        manifest = load_manifest(fixtures_dir)
+    manifest["frozen"] = time.strftime("%Y-%m-%d %H:%M")
+    pages.offline = True
+    for game in games:
+        module = load_game(game)
+        if game in cache_dirs:
+            module.cache_dir = cache_dirs[game]
+        prepare(module)
+        recorder = Recorder(limit)
+        with recording(module, recorder):
+            for dirname, filename in runner.select(module.output_config, FREEZE_OUTPUTS[game]):
+                parser_func = module.output_config[dirname][filename]
+                recorder.output_calls.clear()
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                        stream.collect(parser_func())
+                except Enough:
+                    pass
+                except pages.PageNotCached as e:
+                    print(f"{game} {dirname}/{filename}: stopped at uncached page {e}")
+                except Exception as e:
+                    print(f"{game} {dirname}/{filename}: {type(e).__name__}: {e}")
+        source = open_cache(module.cache_dir, module.cache_backend)
+        for route in recorder.routes:
+            key = pages.route_to_key(route)
+            fixture_cache.put(key, source.get(key))
+        manifest["games"][game] = {name: calls for name, calls in recorder.calls.items() if calls}
+        print(f"{game}: {len(recorder.routes)} pages, " + ", ".join(
+            f"{name} {len(calls)}" for name, calls in manifest["games"][game].items()
+        ))
+    with open(os.path.join(fixtures_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+
+def call_all(func, calls, devnull):
+    errors = 0
+    for args, kwargs in calls:
+        try:
+            with contextlib.redirect_stdout(devnull):
+                result = func(*args, **kwargs)
+                if stream.is_stream(result):
+                    stream.collect(result)
+        except Exception:
+            errors += 1
+    return errors
+
+
+def bench_function(func, calls, repeat, devnull):
+    best = None
+    for _ in range(repeat):
+        soup.document_cache.clear()
+        start = time.perf_counter()
+        errors = call_all(func, calls, devnull)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for call in calls:
+            soup.document_cache.clear()
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            call_all(func, [call], devnull)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "pages": len(calls),
+        "errors": errors,
+        "seconds": best,
+        "pages_per_second": len(calls) / best if best else 0,
+        "peak_memory": peak,
+    }
+
+
+def run(games, fixtures_dir, repeat, functions=None):
+    manifest = load_manifest(fixtures_dir)
+    pages.offline = True
+    stats = {}
+    settings = {}
+    with open(os.devnull, "w") as devnull:
+        for game in games:
+            module = load_game(game)
+            module.cache_dir = fixtures_dir
+            module.cache_backend = "sqlite"
+            prepare(module)
+            settings[game] = {setting: getattr(module, setting) for setting in ("parser_backend", "scoped_parsing")}
+            for name, calls in manifest["games"].get(game, {}).items():
+                if functions and name not in functions:
+                    continue
+                stats[f"{game}:{name}"] = bench_function(getattr(module, name), calls, repeat, devnull)
+    return {
+        "date": time.strftime("%Y-%m-%d %H:%M"),
+        "frozen": manifest["frozen"],
+        "python": platform.python_version(),
+        "settings": settings,
+        "functions": stats,
+    }
+
+
+def print_results(results, baseline=None):
+    baseline = baseline["functions"] if baseline else {}
+    print(f"{'function':45s} {'pages':>6s} {'pages/s':>9s} {'peak MB':>8s}" + ("   vs baseline" if baseline else ""))
+    for name, stats in results["functions"].items():
+        line = f"{name:45s} {stats['pages']:6d} {stats['pages_per_second']:9.1f} {stats['peak_memory'] / 1024 / 1024:8.2f}"
+        before = baseline.get(name)
+        if before and before["pages_per_second"]:
+            line += (
+                f"   x{stats['pages_per_second'] / before['pages_per_second']:.2f} pages/s, "
+                f"{(stats['peak_memory'] - before['peak_memory']) / 1024 / 1024:+.2f} MB"
+            )
+        if stats["errors"]:
+            line += f"   {stats['errors']} ERRORS"
+        print(line)
+
+
+def results_path(fixtures_dir, label):
+    return os.path.join(fixtures_dir, "results", f"{label}.json")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="offline benchmark of the zh parsers")
+    parser.add_argument("command", choices=["freeze", "run"])
+    parser.add_argument("--games", nargs="+", default=list(GAME_DIRS), choices=list(GAME_DIRS))
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="folder of the frozen corpus and the saved results")
+    parser.add_argument("--cache-dir", action="append", default=[], help="freeze: game=path, defaults to cache_dir of each parse.py")
+    parser.add_argument("--calls", type=int, default=CALLS_PER_OUTPUT, help="freeze: calls recorded per parse_* function and output")
+    parser.add_argument("--functions", nargs="+", help="run: only these parse_* functions")
+    parser.add_argument("--repeat", type=int, default=3, help="run: timing passes, the best one is reported")
+    parser.add_argument("--save", default=time.strftime("%Y%m%d-%H%M%S"), help="run: name of the saved results")
+    parser.add_argument("--compare", help="run: name (or json path) of earlier results to compare with")
+    args = parser.parse_args()
+
+    if args.command == "freeze":
+        freeze(args.games, args.fixtures, dict(item.split("=", 1) for item in args.cache_dir), args.calls)
+        sys.exit(0)
+    results = run(args.games, args.fixtures, args.repeat, args.functions)
+    baseline = None
+    if args.compare:
+        path = args.compare if args.compare.endswith(".json") else results_path(args.fixtures, args.compare)
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    path = results_path(args.fixtures, args.save)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=4)
+    print(f"results saved to {path}")
+    sys.exit(1 if any(stats["errors"] for stats in results["functions"].values()) else 0)
@@ -0,0 +1,159 @@
+"""
+Chrome sessions of the browser-driven parsers (任务道具 / 摆设一览 query grids, HSR 短信), shared by a process.
+
+Sessions are started on first use, up to the size of the pool, and reused by the following work units instead of
+starting a Chrome per parser. Independent units (the pages of a grid, the organizations of 短信) run on several
+sessions at once:
+
+    pool = browser.get_pool(chromedriver_path, browser_sessions)
+    for html in pool.map(read_page, range(page_count)):    # read_page(driver, i), results in item order
+        ...
+
+Parsers wait for DOM conditions (wait_for / wait_until) instead of sleeping a fixed time after each click: a step
+takes as long as the page needs, up to WAIT_TIMEOUT.
+"""
+import atexit
+import contextlib
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+# seconds a condition may take before TimeoutException
+WAIT_TIMEOUT = 30
+DEFAULT_SESSIONS = 3
+
+
+class BrowserUnavailable(Exception):
+    """selenium is not installed or chromedriver does not start"""
+
+
+def start_driver(chromedriver_path):
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless=new")
+        return webdriver.Chrome(service=Service(executable_path=chromedriver_path), options=options)
+    except Exception as e:
+        raise BrowserUnavailable(traceback.format_exc()) from e
+
+
+class DriverPool:
+    def __init__(self, chromedriver_path, size=DEFAULT_SESSIONS):
+        self.chromedriver_path = chromedriver_path
+        self.size = max(1, size)
+        self.idle = queue.LifoQueue()
+        self.started = 0
+        self.drivers = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            start = self.started < self.size
+            if start:
+                self.started += 1
+        if not start:
+            return self.idle.get()
+        try:
+            driver = start_driver(self.chromedriver_path)
+        except BrowserUnavailable:
+            with self.lock:
+                self.started -= 1
+            raise
+        with self.lock:
+            self.drivers.append(driver)
+        return driver
+
+    @contextlib.contextmanager
+    def session(self):
+        """lend a driver for one work unit, a driver that failed the unit is replaced"""
+        driver = self.acquire()
+        try:
+            yield driver
+        except BaseException:
+            self.discard(driver)
+            raise
+        self.idle.put(driver)
+
+    def discard(self, driver):
+        with self.lock:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+            self.started -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def map(self, func, items):
+        """[func(driver, item) for item in items], the items spread over the sessions of the pool"""
+        def run(item):
+            with self.session() as driver:
+                return func(driver, item)
+
+        items = list(items)
+        with ThreadPoolExecutor(max_workers=min(self.size, len(items)) or 1, thread_name_prefix="browser") as executor:
+            return list(executor.map(run, items))
+
+    def close(self):
+        with self.lock:
+            drivers, self.drivers = self.drivers, []
+            self.started = 0
+        self.idle = queue.LifoQueue()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(chromedriver_path, size=DEFAULT_SESSIONS):
+    """the pool of this chromedriver, shared by the parsers of the process; the first caller sets its size"""
+    with _pools_lock:
+        if chromedriver_path not in _pools:
+            _pools[chromedriver_path] = DriverPool(chromedriver_path, size)
+        return _pools[chromedriver_path]
+
+
+@atexit.register
+def shutdown():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def wait_until(driver, condition, timeout=WAIT_TIMEOUT):
+    """wait for an expected_conditions condition (or any function of the driver), return its value"""
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    return WebDriverWait(driver, timeout).until(condition)
+
+
+def wait_for(driver, css, timeout=WAIT_TIMEOUT, visible=False):
+    """the first element matching css once it is in the page (and displayed, with visible=True)"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    locator = (By.CSS_SELECTOR, css)
+    condition = EC.visibility_of_element_located(locator) if visible else EC.presence_of_element_located(locator)
+    return wait_until(driver, condition, timeout)
+
+
+def click(driver, element):
+    """scroll element into view and click it"""
+    from selenium.webdriver.common.action_chains import ActionChains
+
+    ActionChains(driver).move_to_element(element).perform()
+    element.click()
@@ -0,0 +1,351 @@
+"""
+Page cache backends.
+
+- "file":   the original layout, one uncompressed .html file per page under cache_dir
+- "sqlite": a single pages.sqlite file under cache_dir, pages compressed with zstd (zlib if zstandard is missing)
+
+Each page may carry its HTTP validators (ETag / Last-Modified) so that it can be revalidated with a conditional request.
+
+Keys are the legacy file stems (e.g. "wiki.biligame.com_ys_NPC%E5%9B%BE%E9%89%B4"), so an existing
+per-file cache can be imported as-is:
+
+    python -m biligame.cache migrate D:/data/biligame/genshin
+
+The sqlite backend also falls back to the legacy .html file on a miss and imports it on the fly.
+
+A page found under an alias (an older spelling of its route, see biligame/pages.py) is moved to its canonical key
+and add_alias(alias, key) records the old key: the sqlite backend keeps an alias index resolving it to the one
+stored entry, the file backend resolves the unquoted file name it falls back to when a quoted one cannot be written.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+import zlib
+
+from tqdm import tqdm
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+ZSTD_LEVEL = 10
+SQLITE_FILENAME = "pages.sqlite"
+# sqlite's default SQLITE_MAX_VARIABLE_NUMBER is 999
+BULK_CHUNK_SIZE = 900
+
+
+def compress(html):
+    data = html.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress(codec, blob):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("page was stored with zstd, please `pip install zstandard`")
+        data = zstandard.ZstdDecompressor().decompress(blob)
+    elif codec == "zlib":
+        data = zlib.decompress(blob)
+    else:
+        data = blob
+    return data.decode("utf-8")
+
+
+def content_digest(html):
+    return hashlib.sha1(html.encode("utf-8")).hexdigest()
+
+
+class FileCache:
+    """one html file per page (the original layout)"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key):
+        path = os.path.join(self.cache_dir, key + ".html")
+        # the unquoted name put() falls back to
+        fallback = os.path.join(self.cache_dir, urllib.parse.unquote(key) + ".html")
+        return fallback if not os.path.exists(path) and os.path.exists(fallback) else path
+
+    def get(self, key):
+        try:
+            with open(self.path(key), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get_many(self, keys):
+        pages = {}
+        for key in keys:
+            html = self.get(key)
+            if html is not None:
+                pages[key] = html
+        return pages
+
+    def get_digests(self, keys):
+        return {key: content_digest(html) for key, html in self.get_many(keys).items()}
+
+    def put(self, key, html, validators=None):
+        filename = key + ".html"
+        try:
+            with open(os.path.join(self.cache_dir, filename), "w", encoding="utf-8") as f:
+                f.write(html)
+        except OSError:
+            # filename too long or invalid on this file system, keep the old unquoted fallback
+            filename = urllib.parse.unquote(filename)
+            with open(os.path.join(self.cache_dir, filename), "w", encoding="utf-8") as f:
+                f.write(html)
+        self.set_validators(key, validators)
+        return filename
+
+    def put_many(self, items):
+        for key, html in items:
+            self.put(key, html)
+
+    def get_validators(self, key):
+        try:
+            with open(os.path.join(self.cache_dir, key + ".validators.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def set_validators(self, key, validators):
+        path = os.path.join(self.cache_dir, key + ".validators.json")
+        try:
+            if validators:
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(validators, f)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def add_alias(self, alias, key):
+        # the alias file is left in place, the canonical file written next to it is found first from now on
+        pass
+
+    def keys(self):
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".html"):
+                yield filename[:-len(".html")]
+
+    def close(self):
+        pass
+
+
+class SQLiteCache:
+    """all pages in one compressed sqlite file, with bulk lookup"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, SQLITE_FILENAME)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute('''
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    body BLOB NOT NULL,
+    digest TEXT NOT NULL,
+    updated REAL NOT NULL
+)
+''')
+        self.conn.execute('''
+CREATE TABLE IF NOT EXISTS validators (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT
+)
+''')
+        self.conn.execute('''
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+)
+''')
+        self.conn.commit()
+        self.legacy = None
+
+    def _legacy_get(self, key):
+        # read-through import of the old one-file-per-page layout
+        if self.legacy is None:
+            self.legacy = FileCache(self.cache_dir)
+        html = self.legacy.get(key)
+        if html is not None:
+            self.put(key, html)
+        return html
+
+    def resolve(self, key):
+        """the key an alias stands for, key itself otherwise"""
+        with self.lock:
+            row = self.conn.execute("SELECT key FROM aliases WHERE alias = ?", (key,)).fetchone()
+        return row[0] if row else key
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT codec, body FROM pages WHERE key = ?", (key,)).fetchone()
+        if row is None and self.resolve(key) != key:
+            return self.get(self.resolve(key))
+        if row is None:
+            return self._legacy_get(key)
+        return decompress(*row)
+
+    def add_alias(self, alias, key):
+        """drop the page stored under alias, it resolves to key from now on"""
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", (alias, key))
+            self.conn.execute("DELETE FROM pages WHERE key = ?", (alias,))
+            self.conn.execute("DELETE FROM validators WHERE key = ?", (alias,))
+            self.conn.commit()
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        pages = {}
+        for i in range(0, len(keys), BULK_CHUNK_SIZE):
+            chunk = keys[i:i + BULK_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT key, codec, body FROM pages WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+            for key, codec, body in rows:
+                pages[key] = decompress(codec, body)
+        for key in keys:
+            if key not in pages:
+                html = self._legacy_get(key)
+                if html is not None:
+                    pages[key] = html
+        return pages
+
+    def get_digests(self, keys):
+        """content digest of each cached page, without decompressing it"""
+        keys = list(dict.fromkeys(keys))
+        digests = {}
+        for i in range(0, len(keys), BULK_CHUNK_SIZE):
+            chunk = keys[i:i + BULK_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT key, digest FROM pages WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+            digests.update(rows)
+        for key in keys:
+            if key not in digests:
+                html = self._legacy_get(key)
+                if html is not None:
+                    digests[key] = content_digest(html)
+        return digests
+
+    def put(self, key, html, validators=None):
+        self.put_many([(key, html)])
+        self.set_validators(key, validators)
+        return key
+
+    def get_validators(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT etag, last_modified FROM validators WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return {}
+        return {k: v for k, v in zip(("etag", "last_modified"), row) if v}
+
+    def set_validators(self, key, validators):
+        # validators of an older version of the page must not survive a rewrite
+        with self.lock:
+            if validators:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO validators VALUES (?, ?, ?)",
+                    (key, validators.get("etag"), validators.get("last_modified")),
+                )
+            else:
+                self.conn.execute("DELETE FROM validators WHERE key = ?", (key,))
+            self.conn.commit()
+
+    def put_many(self, items):
+        rows = []
+        for key, html in items:
+            codec, blob = compress(html)
+            rows.append((key, codec, blob, content_digest(html), time.time()))
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("DELETE FROM validators WHERE key = ?", [(row[0],) for row in rows])
+            self.conn.commit()
+
+    def __contains__(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM pages WHERE key = ? OR key = (SELECT key FROM aliases WHERE alias = ?)", (key, key)
+            ).fetchone()
+        return row is not None or os.path.exists(os.path.join(self.cache_dir, key + ".html"))
+
+    def keys(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT key FROM pages").fetchall()
+        for (key,) in rows:
+            yield key
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+CACHE_BACKENDS = {
+    "file": FileCache,
+    "sqlite": SQLiteCache,
+}
+
+_open_caches = {}
+
+
+def open_cache(cache_dir, backend="sqlite"):
+    """return the shared cache instance of this directory (one per process)"""
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"unknown cache backend {backend}, choose from {list(CACHE_BACKENDS)}")
+    cache_id = (os.path.abspath(cache_dir), backend, os.getpid())
+    if cache_id not in _open_caches:
+        _open_caches[cache_id] = CACHE_BACKENDS[backend](cache_dir)
+    return _open_caches[cache_id]
+
+
+def migrate(cache_dir, src="file", dst="sqlite", batch_size=500):
+    source = CACHE_BACKENDS[src](cache_dir)
+    target = open_cache(cache_dir, dst)
+    keys = list(source.keys())
+    for i in tqdm(range(0, len(keys), batch_size)):
+        batch = keys[i:i + batch_size]
+        pages = source.get_many(batch)
+        target.put_many(pages.items())
+        for key in pages:
+            validators = source.get_validators(key)
+            if validators:
+                target.set_validators(key, validators)
+    print(f"{len(keys)} pages copied from {src} to {dst} cache in {cache_dir}")
+    return len(keys)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="copy every cached page from one backend to another")
+    migrate_parser.add_argument("cache_dir")
+    migrate_parser.add_argument("--from", dest="src", default="file", choices=list(CACHE_BACKENDS))
+    migrate_parser.add_argument("--to", dest="dst", default="sqlite", choices=list(CACHE_BACKENDS))
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate(args.cache_dir, args.src, args.dst)
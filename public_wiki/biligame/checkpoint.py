@@ -0,0 +1,162 @@
+"""
+Checkpoints and dead letters of the outputs built by biligame/runner.py.
+
+While an output is built, every finished detail call (parse_npc(route), ...) is appended to
+<output_dir>/.checkpoints/<category>/<file>.jsonl, flushed every CHECKPOINT_INTERVAL seconds. When the run is
+interrupted (crash, network stall, Ctrl-C), the next run of that output serves those calls from the checkpoint
+and only parses what is left.
+
+A detail call that raises is recorded with its traceback in <output_dir>/.dead_letters.json, also when the list
+parser swallows the exception and drops the entity. `python parse.py --retry` rebuilds the outputs that have
+dead letters and re-runs only the failed calls: the checkpoint of an output is kept as long as it has dead letters.
+Only an interrupted or failed output, or --retry, continues from a checkpoint: a finished output rebuilt because it
+is stale starts over, its pages may have changed since the checkpoint was written.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+from .results import call_key
+
+
+CHECKPOINT_DIR = ".checkpoints"
+DEAD_LETTERS_FILE = ".dead_letters.json"
+# seconds between two flushes of a checkpoint file
+CHECKPOINT_INTERVAL = 30
+
+_local = threading.local()
+
+
+class Checkpoint:
+    """finished detail calls of one output, as json lines; the first line holds the parser fingerprint"""
+
+    def __init__(self, path, fingerprint, resume=True):
+        self.path = path
+        self.lock = threading.Lock()
+        self.offsets = {}
+        self.reader = None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if resume and os.path.exists(path) and self._load(fingerprint):
+            self.file = open(path, "ab")
+            print(f"resuming from checkpoint {path} ({len(self.offsets)} calls done)")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(json.dumps({"fingerprint": fingerprint}).encode("utf-8") + b"\n")
+        self.last_flush = time.monotonic()
+
+    def _load(self, fingerprint):
+        self.reader = open(self.path, "rb")
+        header = self.reader.readline()
+        try:
+            if json.loads(header)["fingerprint"] != fingerprint:
+                raise ValueError("parser changed")
+        except (ValueError, KeyError):
+            self.reader.close()
+            self.reader = None
+            return False
+        while True:
+            offset = self.reader.tell()
+            line = self.reader.readline()
+            # a line cut by a crash ends the usable part of the file
+            if not line.endswith(b"\n"):
+                break
+            try:
+                self.offsets[json.loads(line)["call"]] = offset
+            except (ValueError, KeyError, TypeError):
+                # a damaged line costs its call, not the resume
+                print(f"checkpoint {self.path}: skipping the unreadable line at byte {offset}")
+        # later lines are appended after the last complete one
+        with open(self.path, "r+b") as f:
+            f.truncate(offset)
+        return True
+
+    def get(self, func, args):
+        """(True, result) if the call finished in an earlier, interrupted run"""
+        key = call_key(func, args)
+        with self.lock:
+            if key not in self.offsets:
+                return False, None
+            self.reader.seek(self.offsets[key])
+            return True, json.loads(self.reader.readline())["result"]
+
+    def add(self, func, args, result):
+        try:
+            line = json.dumps({"call": call_key(func, args), "result": result}, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+        with self.lock:
+            self.file.write(line.encode("utf-8") + b"\n")
+            if time.monotonic() - self.last_flush > CHECKPOINT_INTERVAL:
+                self.file.flush()
+                self.last_flush = time.monotonic()
+
+    def close(self, remove=False):
+        with self.lock:
+            self.file.close()
+            if self.reader is not None:
+                self.reader.close()
+            if remove:
+                os.remove(self.path)
+
+
+class DeadLetters:
+    """failed detail calls of every output, saved after each change"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.letters = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.letters = json.load(f)
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.letters, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def clear(self, output):
+        with self.lock:
+            if self.letters.pop(output, None) is not None:
+                self._save()
+
+    def add(self, output, func, args, error):
+        with self.lock:
+            self.letters.setdefault(output, []).append({
+                "call": func.__name__, "args": list(args), "traceback": error, "time": time.time(),
+            })
+            self._save()
+
+    def count(self, output):
+        return len(self.letters.get(output, []))
+
+    def outputs(self):
+        return [output for output, letters in self.letters.items() if letters]
+
+
+class OutputRun:
+    def __init__(self, name, checkpoint, dead_letters):
+        self.name = name
+        self.checkpoint = checkpoint
+        self.dead_letters = dead_letters
+
+    def failed(self, func, args, error):
+        print(f"dead letter: {func.__name__}{tuple(args)} in {self.name}")
+        self.dead_letters.add(self.name, func, args, error)
+
+
+@contextlib.contextmanager
+def output_run(name, checkpoint, dead_letters):
+    """detail calls dispatched by this thread inside the block are checkpointed for the output name"""
+    _local.run = OutputRun(name, checkpoint, dead_letters)
+    try:
+        yield _local.run
+    finally:
+        _local.run = None
+
+
+def current():
+    return getattr(_local, "run", None)
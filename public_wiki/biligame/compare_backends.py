@@ -0,0 +1,167 @@
+"""
+Output-equivalence harness for the tree builders of biligame/soup.py.
+
+Every output_config entry of the zh parsers is run offline (cache only, nothing is downloaded) once per backend.
+Each call of a parse_* function made with plain arguments (routes, levels, flags) is recorded, and the recorded
+outputs are diffed across backends, so a faster builder can be adopted without silently changing the dataset:
+
+    cd public_wiki
+    python -m biligame.compare_backends --backends html.parser lxml --cache-dir genshin=D:/data/biligame/genshin
+
+With --compare-scoping each backend also runs on whole pages (scoped_parsing = False), to check that the
+scope=... of the parsers (see biligame/soup.py) leaves out nothing they read:
+
+    python -m biligame.compare_backends --backends lxml --compare-scoping
+
+Browser-driven entries (parse_quest_item, parse_furniture, parse_messages) are skipped.
+Exit code is 1 when any output differs.
+"""
+import argparse
+import contextlib
+import difflib
+import functools
+import inspect
+import io
+import json
+import sys
+from collections import defaultdict
+
+from . import pages, soup, stream
+from .games import GAME_DIRS, load_game
+
+
+PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+def call_key(name, args, kwargs):
+    if not all(isinstance(a, PLAIN_TYPES) for a in list(args) + list(kwargs.values())):
+        return None
+    return name, json.dumps([args, kwargs], ensure_ascii=False, sort_keys=True)
+
+
+def recorder(name, func, records):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = call_key(name, args, kwargs)
+        try:
+            result = func(*args, **kwargs)
+            if stream.is_stream(result):
+                result = stream.collect(result)
+        except Exception as e:
+            if key is not None:
+                records[key] = f"raised {type(e).__name__}: {e}"
+            raise
+        if key is not None:
+            records[key] = json.dumps(result, ensure_ascii=False, indent=1, default=str)
+        return result
+    return wrapper
+
+
+@contextlib.contextmanager
+def recording(module, records):
+    originals = {}
+    for name, func in list(vars(module).items()):
+        if name.startswith("parse_") and inspect.isfunction(func) and func.__module__ == module.__name__:
+            originals[name] = func
+            setattr(module, name, recorder(name, func, records))
+    try:
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(module, name, func)
+
+
+def entry_points(module):
+    for dirname, parser_funcs in module.output_config.items():
+        for filename, parser_func in parser_funcs.items():
+            if "url" in inspect.signature(parser_func).parameters:
+                continue
+            yield f"{dirname}/{filename}", parser_func.__name__
+
+
+def run_backend(module, backend, verbose=False, scoped=True):
+    records = {}
+    label = backend if scoped else f"{backend} unscoped"
+    soup.document_cache.clear()
+    module.parser_backend = backend
+    module.scoped_parsing = scoped
+    # every call has to run (and be recorded), stored detail results would skip them
+    module.incremental = False
+    with recording(module, records):
+        for output_name, func_name in entry_points(module):
+            out = sys.stdout if verbose else io.StringIO()
+            try:
+                with contextlib.redirect_stdout(out):
+                    getattr(module, func_name)()
+            except pages.PageNotCached as e:
+                print(f"[{label}] {output_name}: stopped at uncached page {e}")
+            except Exception as e:
+                print(f"[{label}] {output_name}: {type(e).__name__}: {e}")
+    return records
+
+
+def compare(records_by_backend, max_diffs=20):
+    backends = list(records_by_backend)
+    base, others = backends[0], backends[1:]
+    stats = defaultdict(lambda: defaultdict(int))
+    diffs = []
+    for other in others:
+        keys = set(records_by_backend[base]) | set(records_by_backend[other])
+        for key in sorted(keys):
+            name = key[0]
+            a = records_by_backend[base].get(key)
+            b = records_by_backend[other].get(key)
+            if a is None or b is None:
+                stats[name]["only one backend"] += 1
+            elif a == b:
+                stats[name]["identical"] += 1
+            else:
+                stats[name]["different"] += 1
+                if len(diffs) < max_diffs:
+                    diff = difflib.unified_diff(
+                        a.splitlines(), b.splitlines(), fromfile=f"{base} {key}", tofile=f"{other} {key}", lineterm="", n=1
+                    )
+                    diffs.append("\n".join(diff))
+    return stats, diffs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", nargs="+", default=list(GAME_DIRS), choices=list(GAME_DIRS))
+    parser.add_argument("--backends", nargs="+", default=["html.parser", "lxml"])
+    parser.add_argument("--cache-dir", action="append", default=[], help="game=path, defaults to cache_dir of each parse.py")
+    parser.add_argument("--compare-scoping", action="store_true", help="also run each backend on whole pages")
+    parser.add_argument("--max-diffs", type=int, default=20)
+    parser.add_argument("--report", help="write the per-function statistics to this json file")
+    parser.add_argument("--verbose", action="store_true", help="keep the parsers' own prints")
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        soup.check_backend(backend)
+    cache_dirs = dict(item.split("=", 1) for item in args.cache_dir)
+    pages.offline = True
+
+    report = {}
+    different = 0
+    for game in args.games:
+        module = load_game(game)
+        if game in cache_dirs:
+            module.cache_dir = cache_dirs[game]
+        records_by_backend = {}
+        for backend in args.backends:
+            records_by_backend[backend] = run_backend(module, backend, args.verbose)
+            if args.compare_scoping:
+                records_by_backend[f"{backend} unscoped"] = run_backend(module, backend, args.verbose, scoped=False)
+        stats, diffs = compare(records_by_backend, args.max_diffs)
+        print(f"===== {game}")
+        for name, counts in sorted(stats.items()):
+            print(f"{name:40s} " + ", ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+            different += counts["different"]
+        for diff in diffs:
+            print(diff)
+        report[game] = {name: dict(counts) for name, counts in stats.items()}
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+    sys.exit(1 if different else 0)
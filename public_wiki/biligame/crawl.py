@@ -0,0 +1,120 @@
+"""
+Build the outputs of several games in one process:
+
+    cd public_wiki
+    python -m biligame.crawl                                   # every game, into <game folder>/data
+    python -m biligame.crawl --cache-dir D:/data/biligame --jobs 8
+    python -m biligame.crawl --only 任务 starrail:书籍一览        # game: limits a selector to one game
+
+The outputs of all games run on one pool of --jobs threads, taking the games in turn, and every page goes through
+the fetcher of biligame/fetch.py: one connection pool and one request rate per host for the whole process, instead of
+one crawler per game each spending the full budget of wiki.biligame.com. Browser-driven outputs of all games share
+one chain. With --cache-dir the games also share one page cache and result store (their routes start with /ys/ and
+/sr/ and do not collide); without it each game keeps the cache_dir of its parse.py.
+
+The other options are those of parse.py (biligame/runner.py).
+"""
+import argparse
+import os
+import sys
+
+from . import frontier, pages, profiling, results, runner, soup
+from .games import GAME_DIRS, PUBLIC_WIKI_DIR, load_game
+from .stream import OUTPUT_FORMATS
+
+
+def split_selectors(selectors, games):
+    """{game: selectors}, a selector without a game: prefix goes to every game"""
+    per_game = {game: [] for game in games}
+    for selector in selectors or []:
+        game, sep, rest = selector.partition(":")
+        if sep and game in GAME_DIRS:
+            if game not in per_game:
+                raise ValueError(f"{selector}: {game} is not in --games")
+            per_game[game].append(rest)
+        else:
+            for selected in per_game.values():
+                selected.append(selector)
+    return per_game
+
+
+def check_selectors(modules, selectors):
+    """raise ValueError for a selector matching no output of its game, or of any game when it has no prefix"""
+    for selector in selectors or []:
+        game, sep, rest = selector.partition(":")
+        candidates = [modules[game]] if sep and game in modules else list(modules.values())
+        selector = rest if sep and game in modules else selector
+        if all(runner.unknown_selectors(module.output_config, [selector]) for module in candidates):
+            raise ValueError(f"{selector} matches no output, see --list")
+
+
+def output_dir_of(game, output_dir=None):
+    if output_dir is None:
+        return os.path.join(PUBLIC_WIKI_DIR, GAME_DIRS[game], "data")
+    return os.path.join(output_dir, GAME_DIRS[game])
+
+
+def crawl(games, output_dir=None, cache_dir=None, only=None, skip=None, jobs=runner.MAX_JOBS, force=False,
+          max_age=None, fmt="json", retry=False, profile=False):
+    """run the selected outputs of every game, returns {game: names of the failed outputs}"""
+    modules = {game: load_game(game) for game in games}
+    if profile:
+        profiling.enable(*modules.values())
+    if cache_dir is not None:
+        for module in modules.values():
+            module.cache_dir = cache_dir
+    only_by_game = split_selectors(only, games)
+    skip_by_game = split_selectors(skip, games)
+    check_selectors(modules, (only or []) + (skip or []))
+
+    todo_by_build = []
+    for game, module in modules.items():
+        if only and not only_by_game[game]:
+            # --only names outputs of the other games only
+            continue
+        game_output_dir = output_dir_of(game, output_dir)
+        os.makedirs(game_output_dir, exist_ok=True)
+        build = runner.Build(module, game_output_dir, fmt, resume=not force, retry=retry)
+        build.label = f"{game}:"
+        todo = runner.schedule(build, only_by_game[game], skip_by_game[game], force, max_age, retry, check=False)
+        todo_by_build.append((build, todo))
+
+    runner.execute(runner.make_chains(todo_by_build), jobs)
+    return {build.label[:-1]: runner.report(build, todo) for build, todo in todo_by_build}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="build the json outputs of several games in one process")
+    parser.add_argument("--games", nargs="+", default=list(GAME_DIRS), choices=list(GAME_DIRS))
+    parser.add_argument("--only", nargs="+", help="categories / files to run, game:selector for one game only")
+    parser.add_argument("--skip", nargs="+", help="categories / files not to run, game:selector for one game only")
+    parser.add_argument("--jobs", type=int, default=runner.MAX_JOBS, help="outputs built at the same time, all games")
+    parser.add_argument("--force", action="store_true", help="rebuild the selected outputs from scratch, even if up to date")
+    parser.add_argument("--retry", action="store_true", help="rebuild only the outputs with dead letters, re-running the failed calls")
+    parser.add_argument("--max-age", type=float, help="hours after which a finished output is rebuilt")
+    parser.add_argument("--output-dir", help="one sub folder per game, defaults to the data folder of each game")
+    parser.add_argument("--cache-dir", help="page cache shared by all games, defaults to cache_dir of each parse.py")
+    parser.add_argument("--format", default="json", choices=OUTPUT_FORMATS, help="json documents or json lines")
+    parser.add_argument("--list", action="store_true", help="print the state of every output and exit")
+    parser.add_argument("--profile", nargs="?", const=runner.PROFILE_FILE, help=f"time every route and parse_* function, report written to PROFILE (default <output-dir>/{runner.PROFILE_FILE})")
+    args = parser.parse_args()
+
+    if args.list:
+        for game in args.games:
+            print(f"===== {game}")
+            runner.print_status(load_game(game), output_dir_of(game, args.output_dir), args.max_age, args.format)
+        sys.exit(0)
+    try:
+        failed = crawl(
+            args.games, args.output_dir, args.cache_dir, args.only, args.skip, args.jobs, args.force, args.max_age,
+            args.format, args.retry, args.profile is not None,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if args.profile:
+        profiling.report(runner.profile_path(args.profile, args.output_dir or "."))
+    pages.print_summary()
+    soup.print_summary()
+    results.print_summary()
+    frontier.print_summary()
+    sys.exit(1 if any(failed.values()) else 0)
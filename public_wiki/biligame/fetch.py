@@ -0,0 +1,198 @@
+"""
+Fetch engine shared by all parsers of a process: one keep-alive connection pool,
+a bounded thread pool and a requests-per-second limit per host.
+
+Every request has a connect and a read timeout. Connection errors, timeouts, 429 and 5xx answers are retried
+with jittered exponential backoff (Retry-After is honoured). A circuit breaker per host counts consecutive failed
+requests: after BREAKER_THRESHOLD of them the host is paused for BREAKER_COOLDOWN seconds, every request to it
+waits, then a single trial request decides whether the crawl resumes or pauses again.
+"""
+import os
+import random
+import threading
+import time
+import traceback
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+MAX_WORKERS = 8
+# requests per second, per host
+HOST_RATE_LIMITS = {
+    "wiki.biligame.com": 4.0,
+}
+DEFAULT_RATE_LIMIT = 4.0
+# seconds, (connect, read)
+TIMEOUT = (10, 30)
+# attempts after the first one, and the backoff before attempt n: random(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** n))
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# consecutive failed requests to a host before it is paused, and the pause in seconds
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60.0
+
+
+class FetchError(Exception):
+    """the answer is not a page: non-200 status, or the retries ran out"""
+
+
+class RateLimiter:
+    """hands out evenly spaced request slots, thread-safe"""
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CircuitBreaker:
+    """pauses the requests to a host after consecutive failures, thread-safe"""
+
+    def __init__(self, threshold=None, cooldown=None):
+        self.threshold = BREAKER_THRESHOLD if threshold is None else threshold
+        self.cooldown = BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial = False
+        self.condition = threading.Condition()
+
+    def wait(self):
+        """block while the host is paused; after a pause, one request at a time goes through until one succeeds"""
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if now < self.open_until:
+                    self.condition.wait(self.open_until - now)
+                elif self.failures >= self.threshold and self.trial:
+                    # another thread is making the trial request
+                    self.condition.wait(1.0)
+                else:
+                    if self.failures >= self.threshold:
+                        self.trial = True
+                    return
+
+    def record(self, success, host):
+        with self.condition:
+            self.trial = False
+            if success:
+                if self.failures >= self.threshold:
+                    print(f"[fetch] {host} answers again, crawl resumed")
+                self.failures = 0
+            else:
+                self.failures += 1
+                if self.failures >= self.threshold:
+                    self.open_until = time.monotonic() + self.cooldown
+                    print(f"[fetch] {self.failures} failed requests in a row to {host}, pausing it for {self.cooldown:.0f}s")
+            self.condition.notify_all()
+
+
+def backoff(attempt, response=None):
+    """seconds to wait before retry number attempt (0-based)"""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class Fetcher:
+    def __init__(self, max_workers=MAX_WORKERS, rate_limits=None, default_rate_limit=DEFAULT_RATE_LIMIT):
+        self.max_workers = max_workers
+        self.rate_limits = dict(HOST_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.default_rate_limit = default_rate_limit
+        self.limiters = {}
+        self.breakers = {}
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self.pid = os.getpid()
+
+    def limiter(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            if host not in self.limiters:
+                self.limiters[host] = RateLimiter(self.rate_limits.get(host, self.default_rate_limit))
+            return self.limiters[host]
+
+    def breaker(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker()
+            return self.breakers[host]
+
+    def get(self, url, **kwargs):
+        """response of url, retrying transient failures; raises FetchError once the retries run out"""
+        kwargs.setdefault("timeout", TIMEOUT)
+        host = urllib.parse.urlsplit(url).netloc
+        breaker = self.breaker(url)
+        for attempt in range(MAX_RETRIES + 1):
+            breaker.wait()
+            self.limiter(url).wait()
+            response = None
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record(True, host)
+                    return response
+                error = f"HTTP {response.status_code}"
+            breaker.record(False, host)
+            if attempt == MAX_RETRIES:
+                raise FetchError(f"{url}: {error}, gave up after {attempt + 1} attempts")
+            delay = backoff(attempt, response)
+            print(f"[fetch] {url}: {error}, retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def map(self, func, items):
+        """run func(item) on the worker pool, yield (item, result) as they finish; errors are printed and skipped"""
+        futures = {self.executor.submit(func, item): item for item in items}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception:
+                print(traceback.format_exc())
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+
+_fetcher = None
+
+
+def get_fetcher():
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = Fetcher()
+    elif _fetcher.pid != os.getpid():
+        # threads and sockets do not survive a fork, parse worker processes get their own
+        _fetcher = Fetcher(_fetcher.max_workers, _fetcher.rate_limits, _fetcher.default_rate_limit)
+    return _fetcher
+
+
+def configure_fetcher(max_workers=MAX_WORKERS, rate_limits=None, default_rate_limit=DEFAULT_RATE_LIMIT):
+    global _fetcher
+    if _fetcher is not None:
+        _fetcher.close()
+    _fetcher = Fetcher(max_workers, rate_limits, default_rate_limit)
+    return _fetcher
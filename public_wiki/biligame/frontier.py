@@ -0,0 +1,199 @@
+"""
+Run-wide frontier of the detail calls: the same detail page is reached from several list parsers (parse_food from
+食物一览, 材料一览, 道具一览 and 摆设套装一览, HSR missions listed under several chapters), the outputs of a run
+share one visit of it.
+
+While a run is open (runner.execute), every dispatch registers as a reader of its calls (expect). The first reader
+to need the result of parse_food("/ys/...") owns the visit and makes the call, the other readers wait for it instead
+of loading and parsing the page again. Calls are keyed by the parser function and its arguments, routes in their
+canonical spelling (biligame/pages.py). Failures are fanned out as well: every output asking for a failed call
+records its own dead letter.
+
+Settled results are kept for the whole run, so an output running after the others (--jobs 1, the browser chain)
+does not visit their pages again. In memory only while a reader waits for them: once all of its readers read a
+visit, its result is spilled to the visits table of the result store (biligame/results.py, keyed like the stored
+results), and the next dispatch asking for the call reads it back from there. The table is emptied when the run
+ends. A result that does not survive json (sets, tuples, int keys) and a failure stay in memory instead.
+
+A result is only copied for a call that is shared: a reader gets the result itself when nothing else can read it
+any more, the others a copy of it.
+"""
+import contextlib
+import copy
+import json
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+from . import pages, results
+
+
+# visits: detail calls made / duplicates: calls answered by the visit of another dispatch
+stats = Counter()
+_lock = threading.Lock()
+# {call key: Visit} while a run is open, None otherwise
+_visits = None
+# {call key: (result store, stored call)} of the visits spilled during the run
+_spilled = {}
+_depth = 0
+
+
+class Visit:
+    def __init__(self, key):
+        self.key = key
+        self.future = Future()
+        # dispatches that asked for the call and did not read it yet
+        self.readers = 0
+        self.owned = False
+        # (result store, stored call) of a result read back from the store
+        self.spilled = None
+
+
+def visit_key(func, args):
+    return (func.__module__, func.__name__) + tuple(
+        pages.canonical_route(arg) if isinstance(arg, str) and "/" in arg else arg for arg in args
+    )
+
+
+def store_of(func, args):
+    """(result store, stored call) to spill the result of func(*args) to, None for a module without a cache_dir"""
+    cache_dir = getattr(sys.modules[func.__module__], "cache_dir", None)
+    if cache_dir is None:
+        return None
+    return results.open_store(cache_dir), results.call_key(func, args)
+
+
+@contextlib.contextmanager
+def run():
+    """share the detail calls of everything run inside, nested runs join the outer one"""
+    global _visits, _depth
+    with _lock:
+        if _depth == 0:
+            _visits = {}
+        _depth += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _depth -= 1
+            if _depth == 0:
+                _visits = None
+                for store in {store for store, _ in _spilled.values()}:
+                    store.clear_visits()
+                _spilled.clear()
+
+
+def expect(func, calls):
+    """register a dispatch as a reader of func(*args) for every args of calls, {args: Visit} ({} outside of a run)"""
+    visits = {}
+    with _lock:
+        if _visits is None:
+            return visits
+        for args in calls:
+            key = visit_key(func, args)
+            if key not in _visits:
+                _visits[key] = Visit(key)
+                if key in _spilled:
+                    # settled earlier in the run, read back instead of made again
+                    _visits[key].owned = True
+                    _visits[key].spilled = _spilled[key]
+            _visits[key].readers += 1
+            visits[args] = _visits[key]
+    return visits
+
+
+def own(visit):
+    """True for the first reader of the visit, which makes the call and settles it"""
+    with _lock:
+        first = not visit.owned
+        visit.owned = True
+        stats["visits" if first else "duplicates"] += 1
+    return first
+
+
+def settle(visit, compute):
+    """compute() as the owner of visit, hand its outcome to the other readers and read it"""
+    try:
+        visit.future.set_result(compute())
+    except BaseException as e:
+        visit.future.set_exception(e)
+    return read(visit)
+
+
+def follow(visit, source):
+    """settle visit with the outcome of a concurrent.futures future once it is done"""
+    def done(source):
+        if source.cancelled():
+            visit.future.cancel()
+        elif source.exception() is not None:
+            visit.future.set_exception(source.exception())
+        else:
+            visit.future.set_result(source.result())
+    source.add_done_callback(done)
+
+
+def spill(visit, result):
+    """store the result of a visit read by all of its readers, False when it has to stay in memory"""
+    if visit.spilled is not None:
+        return True
+    target = store_of(*call_of(visit.key))
+    if target is None:
+        return False
+    try:
+        result_json = json.dumps(result, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return False
+    if json.loads(result_json) != result:
+        return False
+    store, call = target
+    store.put_visit(call, result_json)
+    _spilled[visit.key] = target
+    return True
+
+
+def call_of(key):
+    """(func, args) of a call key"""
+    module_name, func_name = key[:2]
+    return getattr(sys.modules[module_name], func_name), key[2:]
+
+
+def read(visit):
+    """the result of visit (a copy unless nothing else can read it), raises its exception"""
+    try:
+        if visit.spilled is not None:
+            store, call = visit.spilled
+            result = json.loads(store.get_visit(call))
+        else:
+            result = visit.future.result()
+    except BaseException:
+        with _lock:
+            visit.readers -= 1
+        raise
+    with _lock:
+        visit.readers -= 1
+        current = _visits is not None and _visits.get(visit.key) is visit
+        if visit.spilled is not None:
+            # loaded for this reader alone
+            own = True
+            if visit.readers <= 0 and current:
+                del _visits[visit.key]
+        elif visit.readers > 0:
+            own = False
+        elif not current:
+            # the run is over, nobody else reads it
+            own = True
+        elif spill(visit, result):
+            del _visits[visit.key]
+            own = True
+        else:
+            # kept in memory for the rest of the run, later readers copy it
+            own = False
+    # the readers may change their result while they assemble their output
+    return result if own else copy.deepcopy(result)
+
+
+def print_summary():
+    if not stats["duplicates"]:
+        return
+    print(f"frontier: {stats['visits']} detail pages visited, {stats['duplicates']} duplicate visits avoided")
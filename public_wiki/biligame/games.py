@@ -0,0 +1,28 @@
+"""
+Import the parse.py of each game folder as a regular module (the folders are not packages).
+"""
+import importlib.util
+import os
+import sys
+
+
+PUBLIC_WIKI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GAME_DIRS = {
+    "genshin": "Genshin_Impact_zh",
+    "starrail": "Honkail_Star_Rail_zh",
+}
+
+
+def load_game(game):
+    """return the parse module of a game, e.g. load_game("genshin").parse_npc"""
+    module_name = f"{GAME_DIRS[game]}_parse"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    path = os.path.join(PUBLIC_WIKI_DIR, GAME_DIRS[game], "parse.py")
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    # registered before executing, so that its functions can be pickled by name
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
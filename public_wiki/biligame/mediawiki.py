@@ -0,0 +1,122 @@
+"""
+Batched fetch mode through the MediaWiki api.php of wiki.biligame.com.
+
+Up to API_BATCH_SIZE pages are rendered by one query
+(action=query&prop=revisions&rvprop=content&rvparse=1&titles=A|B|...), the api renders one of them per request and
+asks for the rest with a continue block, which is followed until the batch is complete. The pages are wrapped into a minimal page with
+the same div#mw-content-text the parsers look for, and stored under the cache key of their route,
+so load_html_by_route serves them as if the full page had been downloaded.
+
+Set API_BASE_URL to point at a local stand-in (e.g. biligame/mediawiki_stub.py) for offline testing.
+"""
+import traceback
+import urllib.parse
+
+from .fetch import get_fetcher
+
+
+API_BASE_URL = "https://wiki.biligame.com"
+API_BATCH_SIZE = 50
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>{title}</title></head>
+<body><h1 id="firstHeading" class="firstHeading">{title}</h1>
+<div id="mw-content-text" class="mw-body-content">{content}</div>
+</body></html>"""
+
+
+def route_to_title(route):
+    """'/ys/%E8%A7%92%E8%89%B2' -> ('ys', '角色'), None if the route is not a plain article"""
+    path = route.split("#")[0].lstrip("/")
+    if "?" in path or "index.php" in path or "/" not in path:
+        return None
+    wiki, title = path.split("/", 1)
+    title = urllib.parse.unquote(title).replace("_", " ").strip()
+    if not title:
+        return None
+    return wiki, title
+
+
+def api_url(wiki):
+    return f"{API_BASE_URL}/{wiki}/api.php"
+
+
+def revision_content(page):
+    revision = page["revisions"][0]
+    if "slots" in revision:
+        revision = revision["slots"]["main"]
+    return revision.get("content", revision.get("*"))
+
+
+def fetch_rendered(wiki, titles):
+    """return {requested title: rendered html} for the titles that exist"""
+    params = {
+        "action": "query",
+        "prop": "revisions",
+        "rvprop": "content",
+        "rvparse": 1,
+        "rvslots": "main",
+        "redirects": 1,
+        "titles": "|".join(titles),
+        "format": "json",
+        "formatversion": 2,
+    }
+    renames = {"normalized": {}, "redirects": {}}
+    contents = {}
+    continuation = {}
+    # rvparse renders one revision per request, the others come back without content and a continue block
+    while True:
+        response = get_fetcher().get(api_url(wiki), params={**params, **continuation})
+        response.raise_for_status()
+        data = response.json()
+        query = data.get("query", {})
+        for step in renames:
+            renames[step].update((r["from"], r["to"]) for r in query.get(step, []))
+        for page in query.get("pages", []):
+            if page.get("missing") or page.get("invalid") or not page.get("revisions"):
+                continue
+            content = revision_content(page)
+            if content is not None:
+                contents[page["title"]] = PAGE_TEMPLATE.format(title=page["title"], content=content)
+        if "continue" not in data or data["continue"] == continuation:
+            break
+        continuation = data["continue"]
+
+    # follow the normalization / redirect chain back to the requested titles
+    resolved = {title: title for title in titles}
+    for step in ("normalized", "redirects"):
+        resolved = {title: renames[step].get(target, target) for title, target in resolved.items()}
+    return {title: contents[target] for title, target in resolved.items() if target in contents}
+
+
+def prefetch(cache, routes, route_to_key):
+    """fill the cache for routes in api batches, return the routes that still have to be fetched page by page"""
+    batches = {}
+    leftovers = []
+    for route in routes:
+        wiki_title = route_to_title(route)
+        if wiki_title is None:
+            leftovers.append(route)
+            continue
+        wiki, title = wiki_title
+        batches.setdefault(wiki, []).append((title, route))
+
+    jobs = []
+    for wiki, items in batches.items():
+        for i in range(0, len(items), API_BATCH_SIZE):
+            jobs.append((wiki, items[i:i + API_BATCH_SIZE]))
+
+    def fetch_batch(job):
+        wiki, items = job
+        try:
+            pages = fetch_rendered(wiki, list(dict.fromkeys(title for title, _ in items)))
+        except Exception:
+            print(traceback.format_exc())
+            pages = {}
+        cache.put_many([(route_to_key(route), pages[title]) for title, route in items if title in pages])
+        print(f"api batch: {len(pages)}/{len(items)} pages from {wiki}")
+        return [route for title, route in items if title not in pages]
+
+    for _, missing in get_fetcher().map(fetch_batch, jobs):
+        leftovers.extend(missing)
+    return leftovers
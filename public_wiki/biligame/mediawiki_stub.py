@@ -0,0 +1,103 @@
+"""
+Local stand-in for wiki.biligame.com: the batched render query of mediawiki.py on api.php (one page rendered per
+request with a continue block for the rest, as the api does with rvparse), and plain page requests.
+
+Rendered page bodies are read from <root>/<wiki>/<title>.html, e.g. stub/ys/NPC图鉴.html:
+
+    python -m biligame.mediawiki_stub stub --port 8000
+
+then set biligame.mediawiki.API_BASE_URL = "http://localhost:8000" before running a parser.
+
+Other requests are answered with the whole file of the page, a query string is part of the file name
+(/ys/摆设一览?offset=50 reads stub/ys/摆设一览__offset=50.html). Set biligame.pages.BASE_URL = "http://localhost:8000"
+to download pages from it, e.g. the query grid pages of biligame/querygrid.py.
+"""
+import argparse
+import json
+import os
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def render_query(root, wiki, titles, rvcontinue=None):
+    """answer of the render query, one page rendered per request as with rvparse, the next one asked by rvcontinue"""
+    normalized = []
+    pages = []
+    rendered = 0
+    start = int(rvcontinue or 0)
+    for title in titles:
+        canonical = title.replace("_", " ").strip()
+        if canonical != title:
+            normalized.append({"from": title, "to": canonical})
+        path = os.path.join(root, wiki, canonical + ".html")
+        if not os.path.exists(path):
+            pages.append({"title": canonical, "missing": True})
+            continue
+        if rendered == start:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+            pages.append({"title": canonical, "revisions": [{"slots": {"main": {"content": content}}}]})
+        else:
+            pages.append({"title": canonical})
+        rendered += 1
+    query = {"pages": pages}
+    if normalized:
+        query["normalized"] = normalized
+    if start + 1 < rendered:
+        return {"continue": {"rvcontinue": str(start + 1), "continue": "||"}, "query": query}
+    return {"batchcomplete": True, "query": query}
+
+
+def page_path(root, url):
+    name = urllib.parse.unquote(url.path).strip("/")
+    if url.query:
+        name += "__" + urllib.parse.unquote(url.query)
+    return os.path.join(root, *name.split("/")) + ".html"
+
+
+def make_handler(root):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            wiki = url.path.strip("/").split("/")[0]
+            params = urllib.parse.parse_qs(url.query)
+            if not url.path.endswith("/api.php"):
+                self.send_page(page_path(root, url))
+                return
+            if params.get("action") != ["query"]:
+                self.send_error(404)
+                return
+            titles = params.get("titles", [""])[0].split("|")
+            rvcontinue = params.get("rvcontinue", [None])[0]
+            body = json.dumps(render_query(root, wiki, titles, rvcontinue), ensure_ascii=False).encode("utf-8")
+            self.send(body, "application/json")
+
+        def send_page(self, path):
+            if not os.path.exists(path):
+                self.send_error(404)
+                return
+            with open(path, "rb") as f:
+                self.send(f.read(), "text/html")
+
+        def send(self, body, content_type):
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return StubHandler
+
+
+def serve(root, port=8000):
+    server = ThreadingHTTPServer(("localhost", port), make_handler(root))
+    print(f"serving {root} as http://localhost:{port}/<wiki>/api.php and http://localhost:{port}/<wiki>/<title>")
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("root", help="directory of <wiki>/<title>.html rendered page bodies")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    serve(args.root, args.port).serve_forever()
@@ -0,0 +1,92 @@
+"""
+Classification of parsed nodes without serializing them.
+
+The quest and voice parsers used to decide from the markup of a node: `"color:#b18300" in node.prettify()`,
+`re.search("plotBox", str(node["class"]))`, regexes over `cell.prettify()`. Serializing rebuilds the whole subtree as
+a string for every node, the checks below read the same information from the tree (class lists, attribute values,
+strings) and stop at the first hit, with the same answers.
+"""
+from bs4.element import NavigableString, Tag
+
+
+def classes(node):
+    """class list of a tag, [] without a class attribute"""
+    value = node.get("class") if isinstance(node, Tag) else None
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else value
+
+
+def class_contains(node, *names):
+    """a class of node contains one of names, as re.search("(a|b)", str(node["class"])) does"""
+    return any(name in value for value in classes(node) for name in names)
+
+
+def _attribute_values(tag):
+    for value in tag.attrs.values():
+        yield " ".join(value) if isinstance(value, (list, tuple)) else str(value)
+
+
+def _tag_contains(tag, needle):
+    return needle in tag.name or any(needle in name for name in tag.attrs) or any(
+        needle in value for value in _attribute_values(tag)
+    )
+
+
+def markup_contains(node, needle):
+    """needle (without & < > or quotes, which are escaped) would be in node.prettify(): in a tag name, an attribute
+    or a string of the subtree"""
+    if not isinstance(node, Tag):
+        return needle in node
+    if _tag_contains(node, needle):
+        return True
+    for element in node.descendants:
+        if isinstance(element, Tag):
+            if _tag_contains(element, needle):
+                return True
+        elif needle in element:
+            return True
+    return False
+
+
+def text_without(node, skipped):
+    """node.text with the subtrees of the skipped tags left out, as it reads after decomposing them (the shared tree
+    of biligame/soup.py is not changed)"""
+    skipped = {id(tag) for tag in skipped}
+    text = []
+    for string in node.strings:
+        for parent in string.parents:
+            if parent is node or id(parent) in skipped:
+                break
+        if parent is node:
+            text.append(string)
+    return "".join(text)
+
+
+BR = "<br/>"
+
+
+def line_text(cell):
+    """
+    text of a cell holding only strings and <br/>, as the voice parser computed it from cell.prettify(): the
+    div / font tag lines dropped with the whitespace around them, then " <br/>" dropped.
+    None for any other cell (child tags, comments, attribute values spanning lines), the caller serializes those.
+    """
+    # the regex reads the tag line up to its end
+    if cell.name != "div" or any("\n" in value for value in _attribute_values(cell)):
+        return None
+    lines = []
+    for child in cell.children:
+        if type(child) is NavigableString:
+            text = child.output_ready("minimal").strip()
+            if text:
+                lines.append(text)
+        elif isinstance(child, Tag) and child.name == "br" and not child.attrs and not child.contents:
+            lines.append(BR)
+        else:
+            return None
+    # prettify puts each child on its own line indented by one space, a <br/> line loses " <br/>"
+    text = lines[0] if lines else ""
+    for line in lines[1:]:
+        text += "\n" if line == BR else "\n " + line
+    return text
@@ -0,0 +1,92 @@
+"""
+Precompiled text cleanup shared by the parsers.
+
+A chain of re.sub / str.replace calls walks the whole string once per rule. A Normalizer compiles the rules of
+such a chain into one alternation and applies all of them in a single re.sub pass:
+
+    clean_quest_text = normalize.Normalizer(
+        ("分支对话|动画剧情", ""),
+        ("\xa0", ""),
+    )
+    quest[title] = clean_quest_text(quest[title])
+
+At each position the rules are tried in the given order and the first match is replaced. A chain can depend on
+its order (a rule matching what an earlier rule produced, e.g. newlines made adjacent by a removal): write such
+cases as rules of their own.
+
+When the rules have different replacements every match costs a python call, so a Normalizer pays off on text where
+matches are sparse (dialogue with a few markers), less on text that is mostly matches. biligame/normalize_bench.py
+checks a Normalizer against the chain it replaces on the cached pages and times both.
+"""
+import re
+
+
+# runs of whitespace in a table cell, and a leading "图" (image placeholder) before them
+CELL_SPACES = re.compile(r"(^图)*\s+")
+
+
+def alternatives(pattern):
+    """split a pattern at its top-level |"""
+    parts = []
+    depth = 0
+    start = 0
+    i = 0
+    in_class = False
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 1
+        elif in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+            # a ] right after [ or [^ is a literal
+            if pattern[i + 1:i + 2] == "]":
+                i += 1
+            elif pattern[i + 1:i + 3] == "^]":
+                i += 2
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            parts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    parts.append(pattern[start:])
+    return parts
+
+
+class Normalizer:
+    def __init__(self, *rules):
+        """rules: (pattern, replacement) pairs, a replacement is a literal string or a function of the match"""
+        self.rules = rules
+        # every alternative ends with an empty group telling which rule matched. The alternatives are not wrapped in
+        # groups: re only skips ahead to the possible first characters of a top-level alternation
+        branches = []
+        self.replacements = [None]
+        for pattern, replacement in rules:
+            for branch in alternatives(pattern):
+                branches.append(f"{branch}()")
+                self.replacements.extend([None] * re.compile(branch).groups + [replacement])
+        self.pattern = re.compile("|".join(branches))
+        unique = list(dict.fromkeys(r for r in self.replacements if r is not None))
+        if len(unique) == 1:
+            # re.sub does a single literal replacement without calling back into python, a function is called directly
+            self.repl = unique[0].replace("\\", "\\\\") if isinstance(unique[0], str) else unique[0]
+        elif all(isinstance(r, str) for r in unique):
+            self.repl = lambda match, replacements=self.replacements: replacements[match.lastindex]
+        else:
+            self.repl = self._replace
+
+    def _replace(self, match):
+        replacement = self.replacements[match.lastindex]
+        return replacement(match) if callable(replacement) else replacement
+
+    def __call__(self, text):
+        return self.pattern.sub(self.repl, text)
+
+
+def clean_cell(text):
+    """text of a table cell on one line"""
+    return CELL_SPACES.sub(" ", text).strip()
@@ -0,0 +1,149 @@
+"""
+Microbenchmark of the single-pass normalizers (biligame/normalize.py) against the re.sub chains they replaced.
+
+The quest outputs are run offline (cache only) once, recording every string handed to a normalizer. The recorded
+corpus is then cleaned by the old chain and by the normalizer, outputs are compared and both are timed:
+
+    cd public_wiki
+    python -m biligame.normalize_bench --cache-dir genshin=D:/data/biligame/genshin
+    python -m biligame.normalize_bench --games starrail --only 任务 书籍一览
+
+Exit code is 1 when a normalizer disagrees with its chain on any string.
+"""
+import argparse
+import contextlib
+import functools
+import io
+import re
+import sys
+import time
+
+from . import normalize, pages, runner
+from .games import GAME_DIRS, load_game
+
+
+def legacy_quest_text(text):
+    text = re.sub("(分支对话|动画剧情)", "", text)
+    text = re.sub("\n+", "\n", text)
+    text = re.sub("\xa0", "", text)
+    text = text.replace("\xa0", "")
+    return re.sub("请上传文件.+", "", text)
+
+
+def legacy_quest_spaces(text):
+    text = re.sub("\xa0{2,}", " ", text)
+    return text.replace("\xa0", "")
+
+
+def legacy_cell(text):
+    return re.sub(r"(^图)*\s+", " ", text).strip()
+
+
+# normalizer (attribute of the parse module, or of biligame.normalize) -> the chain it replaced
+LEGACY = {
+    "clean_quest_text": legacy_quest_text,
+    "clean_quest_spaces": legacy_quest_spaces,
+    "clean_cell": legacy_cell,
+}
+
+
+def recorder(func, corpus):
+    @functools.wraps(func)
+    def wrapper(text):
+        corpus.append(text)
+        return func(text)
+    return wrapper
+
+
+@contextlib.contextmanager
+def recording(module, corpora):
+    patched = []
+    for name in LEGACY:
+        for owner in (module, normalize):
+            if hasattr(owner, name):
+                func = getattr(owner, name)
+                patched.append((owner, name, func))
+                setattr(owner, name, recorder(func, corpora.setdefault(name, [])))
+                break
+    try:
+        yield
+    finally:
+        for owner, name, func in patched:
+            setattr(owner, name, func)
+
+
+def record_corpus(module, only):
+    corpora = {}
+    # every call has to run in this process to be recorded
+    module.incremental = False
+    module.parse_workers = 1
+    with recording(module, corpora):
+        for dirname, filename in runner.select(module.output_config, only):
+            parser_func = module.output_config[dirname][filename]
+            if runner.uses_browser(parser_func):
+                continue
+            try:
+                with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                    output = parser_func()
+                    # streamed outputs only parse while they are consumed
+                    if not isinstance(output, (dict, list)):
+                        for _ in output:
+                            pass
+            except pages.PageNotCached as e:
+                print(f"{dirname}/{filename}: stopped at uncached page {e}")
+            except Exception as e:
+                print(f"{dirname}/{filename}: {type(e).__name__}: {e}")
+    return corpora
+
+
+def best_time(func, corpus, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench(name, func, corpus, repeat):
+    legacy = LEGACY[name]
+    mismatches = [text for text in corpus if func(text) != legacy(text)]
+    old = best_time(legacy, corpus, repeat)
+    new = best_time(func, corpus, repeat)
+    print(
+        f"{name:20s} {len(corpus):7d} strings {sum(map(len, corpus)):10d} chars   "
+        f"chain {old * 1000:8.1f} ms   one pass {new * 1000:8.1f} ms   x{old / new if new else 0:.1f}"
+        + (f"   {len(mismatches)} MISMATCHES" if mismatches else "")
+    )
+    for text in mismatches[:3]:
+        print(f"    {text!r}\n    chain:    {legacy(text)!r}\n    one pass: {func(text)!r}")
+    return len(mismatches)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", nargs="+", default=list(GAME_DIRS), choices=list(GAME_DIRS))
+    parser.add_argument("--cache-dir", action="append", default=[], help="game=path, defaults to cache_dir of each parse.py")
+    parser.add_argument("--only", nargs="+", default=["任务"], help="outputs recorded, as in parse.py --only")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs, the best one is reported")
+    args = parser.parse_args()
+
+    cache_dirs = dict(item.split("=", 1) for item in args.cache_dir)
+    pages.offline = True
+    mismatches = 0
+    for game in args.games:
+        module = load_game(game)
+        if game in cache_dirs:
+            module.cache_dir = cache_dirs[game]
+        print(f"===== {game}")
+        corpora = record_corpus(module, args.only)
+        for name, corpus in corpora.items():
+            if not corpus:
+                continue
+            func = getattr(module, name, None) or getattr(normalize, name)
+            mismatches += bench(name, func, corpus, args.repeat)
+        if not any(corpora.values()):
+            print("nothing recorded, is the cache of the selected outputs filled?")
+    sys.exit(1 if mismatches else 0)
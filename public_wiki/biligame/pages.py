@@ -0,0 +1,249 @@
+"""
+Page loading on top of the cache and the fetch engine: routes such as "/ys/NPC%E5%9B%BE%E9%89%B4" are
+looked up in the cache and downloaded from https://wiki.biligame.com on a miss.
+
+Links spell the same page in several ways ("/ys/摆设套装一览", percent-encoded, "sr/..." without the leading slash,
+with a #fragment). Every route is reduced to one canonical spelling (canonical_route) before it becomes a cache key
+or a url, so a page is cached and downloaded once. A page stored by an older version under another spelling is
+found through alias_keys, moved to its canonical key and its old key kept as an alias of it (see biligame/cache.py).
+
+force_update does not re-download blindly: when the cached page has an ETag / Last-Modified, a conditional
+request is sent and a 304 answer is served from the cache.
+"""
+import contextlib
+import threading
+import traceback
+import urllib.parse
+from collections import Counter
+
+from . import mediawiki, profiling
+from .cache import content_digest
+from .fetch import FetchError, get_fetcher
+
+
+WIKI_HOST = "wiki.biligame.com"
+# characters MediaWiki leaves unescaped in page urls (wfUrlencode)
+URL_SAFE = "/;:@$!*(),~"
+# where pages are downloaded from, point it at a local stand-in (biligame/mediawiki_stub.py) for offline testing,
+# cache keys keep WIKI_HOST
+BASE_URL = f"https://{WIKI_HOST}"
+
+# offline mode never touches the network, a page missing from the cache raises PageNotCached
+offline = False
+# True during a dry run (biligame/plan.py): only list pages are loaded, detail pages are not prefetched
+planning = False
+
+# not_modified: 304, served from cache / modified: validators sent but page changed /
+# unconditional: force_update without stored validators / bytes_saved: size of the pages served on 304 /
+# aliases: pages found under an older spelling of their route and moved to the canonical key
+revalidation_stats = Counter()
+_stats_lock = threading.Lock()
+_tracking = threading.local()
+
+
+class PageNotCached(Exception):
+    pass
+
+
+def canonical_route(route):
+    """the one spelling of a page: leading slash, no fragment, path percent-encoded the way MediaWiki links are"""
+    parts = urllib.parse.urlsplit(route)
+    path = parts.path if parts.path.startswith("/") else "/" + parts.path
+    path = urllib.parse.quote(urllib.parse.unquote(path).replace(" ", "_"), safe=URL_SAFE)
+    return path + (f"?{parts.query}" if parts.query else "")
+
+
+def route_to_key(route):
+    return WIKI_HOST + canonical_route(route).replace("/", "_")
+
+
+def alias_keys(route):
+    """keys older versions may have stored the page of route under: its spelling as given, and unquoted"""
+    keys = []
+    canonical = canonical_route(route)
+    for spelling in (route, urllib.parse.unquote(route), urllib.parse.unquote(canonical)):
+        # the old route_to_key, "sr/..." became "wiki.biligame.comsr_..."
+        key = WIKI_HOST + spelling.replace("/", "_")
+        if key not in keys and key != route_to_key(canonical):
+            keys.append(key)
+    return keys
+
+
+def route_to_url(route):
+    return f"{BASE_URL}{canonical_route(route)}"
+
+
+def url_to_route(page_url):
+    """route of a wiki url, e.g. https://wiki.biligame.com/ys/%E9%A6%96%E9%A1%B5 -> /ys/%E9%A6%96%E9%A1%B5"""
+    return canonical_route(page_url)
+
+
+def url_to_key(page_url):
+    # convert URL into a cache key (the legacy filename without .html)
+    return route_to_key(url_to_route(page_url))
+
+
+def count(stat, n=1):
+    with _stats_lock:
+        revalidation_stats[stat] += n
+
+
+def response_validators(response):
+    validators = {}
+    if response.headers.get("ETag"):
+        validators["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validators["last_modified"] = response.headers["Last-Modified"]
+    return validators
+
+
+def download(page_url, validators=None):
+    """return (html, validators), html is None when the server answers 304 Not Modified, FetchError unless 200"""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    response = get_fetcher().get(page_url, headers=headers)
+    if response.status_code == 304:
+        return None, validators
+    if response.status_code != 200:
+        # error and throttling pages are not content, they must not reach the cache
+        raise FetchError(f"{page_url}: HTTP {response.status_code}")
+    return response.text, response_validators(response)
+
+
+def save_html(cache, page_url, html_content, force_update=False, validators=None):
+    key = url_to_key(page_url)
+    if force_update or key not in cache:
+        try:
+            filename = cache.put(key, html_content, validators)
+            print(filename, " saved.")
+        except Exception:
+            print(traceback.format_exc())
+
+
+def revalidate(cache, route):
+    """conditional re-download of a cached page, return None if there is nothing to revalidate"""
+    key = route_to_key(route)
+    cached = cache.get(key)
+    if cached is None:
+        cached = adopt_alias(cache, route)
+    if cached is None:
+        return None
+    validators = cache.get_validators(key)
+    if not validators:
+        count("unconditional")
+        return None
+    url = route_to_url(route)
+    html, new_validators = download(url, validators)
+    if html is None:
+        count("not_modified")
+        count("bytes_saved", len(cached.encode("utf-8")))
+        if new_validators != validators:
+            cache.set_validators(key, new_validators)
+        return cached
+    count("modified")
+    save_html(cache, url, html, force_update=True, validators=new_validators)
+    return html
+
+
+@contextlib.contextmanager
+def track_loads():
+    """collect {route: content digest} of every page loaded by this thread inside the block"""
+    loads = {}
+    if not hasattr(_tracking, "stack"):
+        _tracking.stack = []
+    _tracking.stack.append(loads)
+    try:
+        yield loads
+    finally:
+        _tracking.stack.pop()
+
+
+def adopt_alias(cache, route):
+    """page of route stored under an older spelling, moved to the canonical key; None if there is none"""
+    key = route_to_key(route)
+    for alias in alias_keys(route):
+        html = cache.get(alias)
+        if html is not None:
+            cache.put(key, html, cache.get_validators(alias))
+            cache.add_alias(alias, key)
+            count("aliases")
+            return html
+    return None
+
+
+def load_html(cache, route, force_update=False):
+    if force_update and not offline:
+        with profiling.timed("fetch", route):
+            html = revalidate(cache, route)
+    else:
+        with profiling.timed("cache", route):
+            html = cache.get(route_to_key(route))
+            if html is None:
+                html = adopt_alias(cache, route)
+    if html is None:
+        if offline:
+            raise PageNotCached(route)
+        print("filename not found", route)
+        profiling.count(route, "cache_misses")
+        url = route_to_url(route)
+        with profiling.timed("fetch", route):
+            html, validators = download(url)
+            save_html(cache, url, html, force_update, validators)
+    else:
+        profiling.count(route, "cache_hits")
+    if getattr(_tracking, "stack", None):
+        digest = content_digest(html)
+        for loads in _tracking.stack:
+            loads[route] = digest
+    return html
+
+
+def prefetch(cache, routes, mode="page"):
+    """
+    download every uncached route concurrently, so that the following load_html calls are cache hits
+    mode "page" downloads each page, mode "api" renders them in batches through api.php (see mediawiki.py)
+    """
+    if offline or planning:
+        return 0
+    missing = []
+    # links spelling the same page differently are downloaded once
+    for route in dict.fromkeys(canonical_route(route) for route in routes if route):
+        # red links point to edit pages, parsers skip them
+        if "index.php" not in route and route_to_key(route) not in cache and adopt_alias(cache, route) is None:
+            missing.append(route)
+    if missing and mode == "api":
+        with profiling.timed("fetch", None):
+            missing = mediawiki.prefetch(cache, missing, route_to_key)
+    if not missing:
+        return 0
+    print(f"prefetching {len(missing)} pages")
+
+    def fetch_and_save(route):
+        url = route_to_url(route)
+        # on a fetcher thread: the time of the route only, the prefetching function gets the wait below
+        with profiling.timed("fetch", route):
+            html, validators = download(url)
+            save_html(cache, url, html, validators=validators)
+
+    done = 0
+    with profiling.timed("fetch", None):
+        for _ in get_fetcher().map(fetch_and_save, missing):
+            done += 1
+    return done
+
+
+def print_summary():
+    stats = revalidation_stats
+    if stats["aliases"]:
+        print(f"aliases: {stats['aliases']} cached pages moved to the canonical key of their route")
+    if not stats["not_modified"] and not stats["modified"] and not stats["unconditional"]:
+        return
+    print(
+        f"revalidation: {stats['not_modified']} not modified (304), {stats['modified']} modified, "
+        f"{stats['unconditional']} re-downloaded without validators, "
+        f"{stats['bytes_saved'] / 1024 / 1024:.1f} MB served from cache"
+    )
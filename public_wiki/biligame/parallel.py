@@ -0,0 +1,161 @@
+"""
+Process-pool dispatch of detail-page parsers.
+
+A list parser hands all its detail calls up front and reads the results back in its own loop order:
+
+    details = dispatch(parse_npc, [(href,) for href in hrefs], workers=32)
+    for href in hrefs:
+        results[name] = details.get(href)    # raises here if parse_npc(href) raised in the worker
+
+so the assembled output (and the written json) is identical to a serial run. With workers <= 1 the calls
+are made lazily in the current process, exactly like before.
+
+Calls go through the result store of biligame/results.py: unchanged pages are not parsed (nor sent to a worker) again.
+Within a run, a call dispatched by several list parsers is made once (biligame/frontier.py).
+Under the runner, finished calls are checkpointed and failed ones become dead letters (biligame/checkpoint.py).
+"""
+import atexit
+import importlib.util
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from . import checkpoint, frontier, pages, results
+
+
+# module globals of parse.py copied into the workers (they may have been changed after import)
+WORKER_SETTINGS = ("cache_dir", "cache_backend", "fetch_mode", "parser_backend", "incremental", "scoped_parsing")
+
+_pools = {}
+_pools_lock = threading.Lock()
+_in_worker = False
+# the Plan of a dry run (biligame/plan.py): calls are recorded, not made
+plan = None
+
+
+def _get_pool(workers):
+    # list parsers of several outputs may dispatch at the same time (biligame/runner.py)
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        return _pools[workers]
+
+
+@atexit.register
+def shutdown():
+    for pool in _pools.values():
+        pool.shutdown(wait=False)
+    _pools.clear()
+
+
+def _worker_module(module_name, module_path):
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    # spawned worker: modules loaded from a file path (biligame/games.py) have to be loaded again
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run(module_name, module_path, settings, offline, func_name, args):
+    global _in_worker
+    _in_worker = True
+    pages.offline = offline
+    module = _worker_module(module_name, module_path)
+    for name, value in settings.items():
+        setattr(module, name, value)
+    # the parent process already looked the call up in the result store
+    return results.call(getattr(module, func_name), args, check=False)
+
+
+class Details:
+    def __init__(self, func, calls, workers):
+        self.func = func
+        self.futures = {}
+        self.stored = {}
+        # calls made by another dispatch
+        self.waiting = set()
+        self.run = checkpoint.current()
+        self.plan = plan
+        if self.plan is not None:
+            self.plan.record(func, calls)
+            return
+        # the calls as seen by the run-wide frontier, this dispatch is one of their readers (biligame/frontier.py)
+        self.visits = frontier.expect(func, dict.fromkeys(calls))
+        if workers <= 1 or _in_worker or len(calls) < 2:
+            return
+        module = sys.modules[func.__module__]
+        settings = {name: getattr(module, name) for name in WORKER_SETTINGS if hasattr(module, name)}
+        pool = _get_pool(workers)
+        for args in dict.fromkeys(calls):
+            visit = self.visits.get(args)
+            if visit is not None and not frontier.own(visit):
+                self.waiting.add(args)
+                continue
+            found, result = self.lookup(args)
+            if found:
+                if visit is not None:
+                    visit.future.set_result(result)
+                self.stored[args] = result
+                continue
+            self.futures[args] = pool.submit(
+                _run, func.__module__, os.path.abspath(module.__file__), settings, pages.offline, func.__name__, args
+            )
+            if visit is not None:
+                frontier.follow(visit, self.futures[args])
+
+    def lookup(self, args):
+        # finished before an interruption, or parsed from the same pages by an earlier run
+        if self.run is not None:
+            found, result = self.run.checkpoint.get(self.func, args)
+            if found:
+                return found, result
+        return results.lookup(self.func, args)
+
+    def visit(self, args):
+        """(func(*args), False when it comes from a checkpoint or the result store)"""
+        visit = self.visits.pop(args, None)
+        if args in self.stored:
+            result = self.stored.pop(args)
+            return (frontier.read(visit) if visit else result), False
+        if args in self.futures:
+            future = self.futures.pop(args)
+            return (frontier.read(visit) if visit else future.result()), True
+        if args in self.waiting:
+            self.waiting.discard(args)
+            return frontier.read(visit), True
+        if visit is None:
+            # asked twice: the visit of the first time may be gone
+            visit = frontier.expect(self.func, [args]).get(args)
+        if visit is not None and not frontier.own(visit):
+            return frontier.read(visit), True
+        found = False
+
+        def parse():
+            nonlocal found
+            found, result = self.lookup(args)
+            return result if found else results.call(self.func, args, check=False)
+
+        result = frontier.settle(visit, parse) if visit else parse()
+        return result, not found
+
+    def get(self, *args):
+        if self.plan is not None:
+            return self.plan.placeholder()
+        try:
+            result, new = self.visit(args)
+        except Exception:
+            if self.run is not None:
+                self.run.failed(self.func, args, traceback.format_exc())
+            raise
+        if new and self.run is not None:
+            self.run.checkpoint.add(self.func, args, result)
+        return result
+
+def dispatch(func, calls, workers=1):
+    """start func(*args) for every args tuple of calls, results are read back with .get(*args)"""
+    return Details(func, [tuple(args) for args in calls], workers)
@@ -0,0 +1,130 @@
+"""
+Dry run of a build (python parse.py --plan): what a crawl would download, before it is started.
+
+Every selected output runs its list parser with the detail calls left out: the list pages are loaded (and downloaded
+when they are not cached), each dispatch records the routes of its calls and hands back placeholders instead of
+parsing them (biligame/parallel.py), prefetch does nothing. The detail routes are then looked up in the cache and
+reported per category: pages to fetch, cache hit ratio, and the download time at the request rate of the fetch engine
+(biligame/fetch.py; the MediaWiki api batches of fetch_mode = "api" render one page per request as well). A route shared by several outputs is counted once
+in the total, as the run visits it once (biligame/frontier.py).
+
+Pages a detail parser loads itself (the hint pages of 传说任务, ...) are not counted. Outputs driven by Chrome are
+skipped, unless they read stored snapshots (browser_replay) or plain http grids (grid_mode = "http").
+"""
+import contextlib
+import io
+from datetime import timedelta
+
+from . import pages, parallel, runner, stream
+from .cache import open_cache
+from .fetch import get_fetcher
+
+
+class Placeholder(dict):
+    """stands for the result of a planned detail call, any key reads another placeholder"""
+
+    def __missing__(self, key):
+        return Placeholder()
+
+    def __bool__(self):
+        # list parsers falling back to a direct parse on an empty result would load the detail page
+        return True
+
+
+class Plan:
+    def __init__(self):
+        # {output name: {route: None}}
+        self.routes = {}
+        self.output = None
+
+    def record(self, func, calls):
+        for args in calls:
+            # red links point to edit pages, parsers skip them
+            if args and isinstance(args[0], str) and "index.php" not in args[0]:
+                self.routes[self.output][pages.canonical_route(args[0])] = None
+
+    def placeholder(self):
+        return Placeholder()
+
+
+def needs_chrome(module, parser_func):
+    if not runner.uses_browser(parser_func) or getattr(module, "browser_replay", False):
+        return False
+    return getattr(module, "grid_mode", "browser") == "browser"
+
+
+def is_cached(cache, route):
+    return pages.route_to_key(route) in cache or any(alias in cache for alias in pages.alias_keys(route))
+
+
+def make_plan(module, outputs):
+    """stats per category and in total of the (dirname, filename) outputs of module, detail pages are not loaded"""
+    plan = Plan()
+    skipped = {}
+    failed = {}
+    list_pages = {}
+    parallel.plan = plan
+    pages.planning = True
+    try:
+        for dirname, filename in outputs:
+            name = runner.output_name(dirname, filename)
+            parser_func = module.output_config[dirname][filename]
+            if needs_chrome(module, parser_func):
+                skipped[name] = "browser-driven"
+                continue
+            plan.output = name
+            plan.routes[name] = {}
+            print(f"[plan] {name}")
+            try:
+                with pages.track_loads() as loads, contextlib.redirect_stdout(io.StringIO()), \
+                        contextlib.redirect_stderr(io.StringIO()):
+                    stream.collect(parser_func())
+            except Exception as e:
+                # the routes recorded up to the error are still planned
+                failed[name] = f"{type(e).__name__}: {e}"
+                print(f"[plan] {name}: {failed[name]}")
+            list_pages[name] = len(loads)
+    finally:
+        parallel.plan = None
+        pages.planning = False
+
+    cache = open_cache(module.cache_dir, module.cache_backend)
+    fetcher = get_fetcher()
+    rate = fetcher.rate_limits.get(pages.WIKI_HOST, fetcher.default_rate_limit)
+
+    def stats(names):
+        routes = dict.fromkeys(route for name in names for route in plan.routes[name])
+        missing = sum(1 for route in routes if not is_cached(cache, route))
+        requests = missing
+        return {
+            "outputs": len(names),
+            "list_pages": sum(list_pages[name] for name in names),
+            "detail_pages": len(routes),
+            "to_fetch": missing,
+            "hit_ratio": (len(routes) - missing) / len(routes) if routes else 1.0,
+            "requests": requests,
+            "seconds": requests / rate if rate else 0.0,
+            "incomplete": [name for name in names if name in failed],
+        }
+
+    categories = {}
+    for name in plan.routes:
+        categories.setdefault(name.split("/", 1)[0], []).append(name)
+    report = {category: stats(names) for category, names in categories.items()}
+    report["total"] = stats(list(plan.routes))
+    return {"categories": report, "skipped": skipped, "failed": failed, "rate": rate}
+
+
+def print_plan(plan):
+    print(f"{'category':24s} {'outputs':>7s} {'list':>5s} {'details':>8s} {'to fetch':>8s} {'hit ratio':>9s} {'time':>9s}")
+    for category, stats in plan["categories"].items():
+        print(
+            f"{category:24s} {stats['outputs']:7d} {stats['list_pages']:5d} {stats['detail_pages']:8d} "
+            f"{stats['to_fetch']:8d} {stats['hit_ratio']:9.1%} {str(timedelta(seconds=round(stats['seconds']))):>9s}"
+            + (" (incomplete)" if stats["incomplete"] else "")
+        )
+    print(f"time: {plan['categories']['total']['requests']} requests at {plan['rate']:g} requests/s, detail pages shared by several outputs counted once in total")
+    for name, reason in plan["skipped"].items():
+        print(f"skipped {name}: {reason}")
+    for name, error in plan["failed"].items():
+        print(f"incomplete {name}: the list parser raised {error}, only the detail pages dispatched before are counted")
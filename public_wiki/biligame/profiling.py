@@ -0,0 +1,208 @@
+"""
+Where a run spends its time: `python parse.py --profile` (or python -m biligame.crawl --profile).
+
+Every parse_* function of the parse module is wrapped, and pages.py / soup.py report the time they take, so each
+second is put in one of four phases, per route and per parse_* function:
+
+- fetch:   network (downloads, conditional requests, prefetching)
+- cache:   reading the page cache
+- parse:   building BeautifulSoup trees (and copying memoized ones)
+- extract: the parse_* function itself, without the above and without the parse_* functions it calls
+
+plus the cache hits / misses and soup memo hits of each route. A parse_* call is attributed to its route argument
+(the default route of a list parser). Generators (list parsers) are timed while they run, not while the runner
+writes what they yielded. Prefetched pages are downloaded concurrently: each route gets its download time, the
+prefetching function the time it waited. At the end of the run the report is written as json and the slowest pages
+are printed.
+
+Detail calls are timed in this process only, --profile parses them one by one (parse_workers = 1). Calls answered
+by the result store (biligame/results.py) do not run and are not in the report, set incremental = False to time all.
+"""
+import contextlib
+import functools
+import inspect
+import json
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict
+
+
+PHASES = ("fetch", "cache", "parse", "extract")
+SLOWEST_PAGES = 20
+
+enabled = False
+started = None
+routes = defaultdict(Counter)
+functions = defaultdict(Counter)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Frame:
+    def __init__(self, function, route):
+        self.function = function
+        self.route = route
+        self.elapsed = 0.0
+        # time of the phases and parse_* calls inside this one
+        self.inner = 0.0
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def count(route, stat, n=1):
+    if not enabled or route is None:
+        return
+    with _lock:
+        routes[route][stat] += n
+
+
+def _add(phase, route, elapsed, function):
+    with _lock:
+        if route is not None:
+            routes[route][phase] += elapsed
+        if function is not None:
+            functions[function][phase] += elapsed
+
+
+@contextlib.contextmanager
+def timed(phase, route):
+    """time the block as phase of route (None: of no route), and of the running parse_* function"""
+    if not enabled:
+        yield
+        return
+    stack = _stack()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        function = None
+        if stack:
+            stack[-1].inner += elapsed
+            function = stack[-1].function
+        _add(phase, route, elapsed, function)
+
+
+def _finish(frame):
+    extract = frame.elapsed - frame.inner
+    with _lock:
+        stats = functions[frame.function]
+        stats["calls"] += 1
+        stats["total"] += frame.elapsed
+        stats["extract"] += extract
+        if frame.route is not None:
+            routes[frame.route]["extract"] += extract
+
+
+def _route_of(signature, args, kwargs):
+    try:
+        bound = signature.bind(*args, **kwargs)
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    route = bound.arguments.get("route")
+    return route if isinstance(route, str) else None
+
+
+def _wrap(func):
+    signature = inspect.signature(func)
+
+    def run(frame, step, *args):
+        stack = _stack()
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            return step(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            frame.elapsed += elapsed
+            if stack:
+                stack[-1].inner += elapsed
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            frame = Frame(func.__name__, _route_of(signature, args, kwargs))
+            generator = func(*args, **kwargs)
+            try:
+                while True:
+                    try:
+                        item = run(frame, next, generator)
+                    except StopIteration:
+                        return
+                    yield item
+            finally:
+                generator.close()
+                _finish(frame)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            frame = Frame(func.__name__, _route_of(signature, args, kwargs))
+            try:
+                return run(frame, lambda: func(*args, **kwargs))
+            finally:
+                _finish(frame)
+    wrapper.profiled = True
+    return wrapper
+
+
+def enable(*modules):
+    """profile the rest of the run of these parse modules"""
+    global enabled, started
+    for module in modules:
+        wrapped = {}
+        for name, func in list(vars(module).items()):
+            if name.startswith("parse_") and inspect.isfunction(func) and not getattr(func, "profiled", False):
+                wrapped[func] = _wrap(func)
+                setattr(module, name, wrapped[func])
+        # output_config holds the list parsers themselves, not their names
+        for parser_funcs in module.output_config.values():
+            for filename, func in parser_funcs.items():
+                parser_funcs[filename] = wrapped.get(func, func)
+        if getattr(module, "parse_workers", 1) > 1:
+            print(f"[profile] parsing detail pages in this process (parse_workers = 1 instead of {module.parse_workers})")
+            module.parse_workers = 1
+    enabled = True
+    started = time.perf_counter()
+
+
+def route_total(stats):
+    return sum(stats[phase] for phase in PHASES)
+
+
+def report(path):
+    """write the json report to path and print the slowest pages and functions"""
+    wall = time.perf_counter() - started
+    with _lock:
+        data = {
+            "wall": wall,
+            "phases": {phase: sum(stats[phase] for stats in routes.values()) for phase in PHASES},
+            "functions": {name: dict(stats) for name, stats in functions.items()},
+            "routes": {route: dict(stats, total=route_total(stats)) for route, stats in routes.items()},
+        }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+    print(f"[profile] {wall:.1f}s wall, " + ", ".join(f"{phase} {t:.1f}s" for phase, t in data["phases"].items()))
+    slowest = sorted(data["routes"].items(), key=lambda item: item[1]["total"], reverse=True)[:SLOWEST_PAGES]
+    print(f"{'route':50s} {'total':>8s} " + " ".join(f"{phase:>8s}" for phase in PHASES) + "  cache hit/miss  memo hits")
+    for route, stats in slowest:
+        print(
+            f"{urllib.parse.unquote(route)[:50]:50s} {stats['total']:8.3f} "
+            + " ".join(f"{stats.get(phase, 0):8.3f}" for phase in PHASES)
+            + f"  {stats.get('cache_hits', 0):>5d}/{stats.get('cache_misses', 0):<5d}    {stats.get('memo_hits', 0):>5d}"
+        )
+    print(f"{'function':50s} {'total':>8s} " + " ".join(f"{phase:>8s}" for phase in PHASES) + "  calls")
+    for name, stats in sorted(data["functions"].items(), key=lambda item: item[1].get("total", 0), reverse=True):
+        print(
+            f"{name:50s} {stats.get('total', 0):8.3f} "
+            + " ".join(f"{stats.get(phase, 0):8.3f}" for phase in PHASES)
+            + f"  {stats.get('calls', 0):5d}"
+        )
+    print(f"[profile] report written to {path}")
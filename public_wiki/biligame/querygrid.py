@@ -0,0 +1,115 @@
+"""
+Rows of a query grid (div#queryDataGrid, the paginated item tables of 任务道具一览 / 摆设一览).
+
+The browser mode opens the page in Chrome sessions of biligame/browser.py, clicks the ul.pagination buttons and reads
+the grid after each click; the pages of a grid are read on several sessions at once (browser_pages).
+
+The http mode reads the same markup from the page source instead: the rows of the grid table in the list page, then
+the rows of every page its pagination links to (links with a real href, such as ?offset=50; "#" and javascript: links
+are script-driven and cannot be followed). Pages are loaded through the page cache like any other list page, so the
+row-to-detail logic of the parsers is unchanged. A page whose grid is only filled by script has no rows in its
+source: GridNotRendered is raised, use the browser mode (grid_mode = "browser" in parse.py) for it.
+"""
+import urllib.parse
+
+from . import browser
+from .pages import canonical_route
+
+
+QUERY_GRID = "queryDataGrid"
+PAGINATION = "ul.pagination"
+QUERY_BUTTON = "span#queryDataBtn"
+
+
+class GridNotRendered(Exception):
+    pass
+
+
+def grid_rows(soup):
+    """data rows (without the header row) of the grid table of a parsed page"""
+    grid = soup.find("div", id=QUERY_GRID)
+    table = grid.find("table") if grid else None
+    return table.find_all("tr")[1:] if table else []
+
+
+def page_links(soup, route):
+    """routes of the grid pages linked by ul.pagination, resolved against route"""
+    links = []
+    for pagination in soup.find_all("ul", class_="pagination"):
+        for a in pagination.find_all("a", href=True):
+            href = a["href"].strip()
+            if not href or href.startswith("#") or href.startswith("javascript:"):
+                continue
+            links.append(canonical_route(urllib.parse.urljoin(route, href)))
+    return links
+
+
+def collect_rows(route, load_soup):
+    """rows of every page of the grid of route, in page order, load_soup(route, force_update) loads a page"""
+    rows = []
+    route = canonical_route(route)
+    seen = {route}
+    todo = [route]
+    while todo:
+        current = todo.pop(0)
+        # the grids list items added to the wiki, revalidate like the other list pages
+        soup = load_soup(current, force_update=True)
+        found_rows = grid_rows(soup)
+        print(f"found {len(found_rows)} items")
+        rows.extend(found_rows)
+        for link in page_links(soup, current):
+            if link not in seen:
+                seen.add(link)
+                todo.append(link)
+    if not rows:
+        raise GridNotRendered(f"{route}: no {QUERY_GRID} rows in the page source, the grid is filled by script")
+    return rows
+
+
+def open_grid(driver, url, query_button=False):
+    """load the list page in driver (unless it shows it already) and wait for the grid pagination"""
+    if getattr(driver, "grid_url", None) == url:
+        return
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver.get(url)
+    if query_button:
+        browser.click(driver, browser.wait_until(driver, EC.element_to_be_clickable((By.CSS_SELECTOR, QUERY_BUTTON))))
+    browser.wait_for(driver, f"{PAGINATION} li a")
+    browser.wait_for(driver, f"div#{QUERY_GRID} table")
+    driver.grid_url = url
+    driver.grid_page = 0
+
+
+def page_buttons(driver):
+    from selenium.webdriver.common.by import By
+
+    # the first and last items are the previous / next arrows
+    return driver.find_element(By.CSS_SELECTOR, PAGINATION).find_elements(By.CSS_SELECTOR, "li")[1:-1]
+
+
+def read_grid_page(driver, url, page, query_button=False):
+    """outerHTML of the grid showing page (0-based)"""
+    from selenium.webdriver.common.by import By
+
+    open_grid(driver, url, query_button)
+
+    def grid():
+        return driver.find_element(By.CSS_SELECTOR, f"div#{QUERY_GRID}").get_attribute("innerHTML")
+
+    if driver.grid_page != page:
+        before = grid()
+        browser.click(driver, page_buttons(driver)[page].find_element(By.CSS_SELECTOR, "a"))
+        # the grid is rebuilt for the clicked page
+        browser.wait_until(driver, lambda _: grid() != before)
+        driver.grid_page = page
+    return driver.find_element(By.CSS_SELECTOR, f"div#{QUERY_GRID}").get_attribute("outerHTML")
+
+
+def browser_pages(pool, url, query_button=False):
+    """outerHTML of the grid on each of its pages, the pages spread over the sessions of pool"""
+    with pool.session() as driver:
+        open_grid(driver, url, query_button)
+        page_count = len(page_buttons(driver))
+    return pool.map(lambda driver, page: read_grid_page(driver, url, page, query_button), range(page_count))
@@ -0,0 +1,188 @@
+"""
+Incremental rebuilds: the result of every detail parse dispatched by a list parser (parse_npc(route), ...) is stored
+in <cache_dir>/results.sqlite with the content digest of each page it read and a fingerprint of the parser code.
+When none of those pages changed and the parser code is the same, the stored result is returned instead of
+parsing again, so a daily refresh only re-parses the pages that were edited on the wiki.
+
+Enabled by `incremental = True` in parse.py. Results that are not plain json (sets, ...) are never stored.
+"""
+import hashlib
+import importlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import Counter
+
+from . import pages
+from .cache import compress, decompress, open_cache
+
+
+RESULTS_FILENAME = "results.sqlite"
+# shared modules whose code shapes the parse results, part of the parser fingerprint
+PARSER_MODULES = ("soup", "normalize", "tables", "nodes")
+
+# reused: stored result returned / new: never parsed before / changed: a page or the parser code changed
+stats = Counter()
+_stats_lock = threading.Lock()
+
+
+class ResultStore:
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, RESULTS_FILENAME)
+        self.lock = threading.RLock()
+        # parse worker processes write to the same file
+        self.conn = sqlite3.connect(self.db_path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute('''
+CREATE TABLE IF NOT EXISTS results (
+    call TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    pages TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    body BLOB NOT NULL
+)
+''')
+        # results of the detail calls settled during the current run (biligame/frontier.py), emptied when it ends
+        self.conn.execute('''
+CREATE TABLE IF NOT EXISTS visits (
+    call TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    body BLOB NOT NULL
+)
+''')
+        self.conn.commit()
+
+    def get(self, call):
+        """(fingerprint, {route: digest}, result json) or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fingerprint, pages, codec, body FROM results WHERE call = ?", (call,)
+            ).fetchone()
+        if row is None:
+            return None
+        fingerprint, page_digests, codec, body = row
+        return fingerprint, json.loads(page_digests), decompress(codec, body)
+
+    def put(self, call, fingerprint, page_digests, result_json):
+        codec, blob = compress(result_json)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (call, fingerprint, json.dumps(page_digests), codec, blob),
+            )
+            self.conn.commit()
+
+    def put_visit(self, call, result_json):
+        codec, blob = compress(result_json)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO visits VALUES (?, ?, ?)", (call, codec, blob))
+            self.conn.commit()
+
+    def get_visit(self, call):
+        """result json of a call settled in this run, or None"""
+        with self.lock:
+            row = self.conn.execute("SELECT codec, body FROM visits WHERE call = ?", (call,)).fetchone()
+        return None if row is None else decompress(*row)
+
+    def clear_visits(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM visits")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_open_stores = {}
+_fingerprints = {}
+
+
+def open_store(cache_dir):
+    """return the shared result store of this cache directory (one per process)"""
+    store_id = (os.path.abspath(cache_dir), os.getpid())
+    if store_id not in _open_stores:
+        _open_stores[store_id] = ResultStore(cache_dir)
+    return _open_stores[store_id]
+
+
+def parser_fingerprint(module):
+    """sha1 of the parse.py source, the shared parsing code and the tree builder in use"""
+    backend = getattr(module, "parser_backend", "")
+    fingerprint_id = (module.__file__, backend)
+    if fingerprint_id not in _fingerprints:
+        sha1 = hashlib.sha1(backend.encode("utf-8"))
+        paths = [module.__file__] + [importlib.import_module(f".{name}", __package__).__file__ for name in PARSER_MODULES]
+        for path in paths:
+            with open(path, "rb") as f:
+                sha1.update(f.read())
+        _fingerprints[fingerprint_id] = sha1.hexdigest()
+    return _fingerprints[fingerprint_id]
+
+
+def count(stat, n=1):
+    with _stats_lock:
+        stats[stat] += n
+
+
+def call_key(func, args):
+    return func.__name__ + json.dumps(list(args), ensure_ascii=False)
+
+
+def _enabled(module):
+    return getattr(module, "incremental", False)
+
+
+def lookup(func, args):
+    """(True, stored result) when func(*args) would read the same pages with the same code, else (False, None)"""
+    module = sys.modules[func.__module__]
+    if not _enabled(module):
+        return False, None
+    stored = open_store(module.cache_dir).get(call_key(func, args))
+    if stored is None:
+        count("new")
+        return False, None
+    fingerprint, page_digests, result_json = stored
+    if fingerprint != parser_fingerprint(module):
+        count("changed")
+        return False, None
+    cache = open_cache(module.cache_dir, module.cache_backend)
+    keys = {route: pages.route_to_key(route) for route in page_digests}
+    current = cache.get_digests(keys.values())
+    if any(current.get(keys[route]) != digest for route, digest in page_digests.items()):
+        count("changed")
+        return False, None
+    count("reused")
+    return True, json.loads(result_json)
+
+
+def call(func, args, check=True):
+    """func(*args) through the store; check=False when lookup() was already done by the caller"""
+    module = sys.modules[func.__module__]
+    if not _enabled(module):
+        return func(*args)
+    if check:
+        found, result = lookup(func, args)
+        if found:
+            return result
+    with pages.track_loads() as page_digests:
+        result = func(*args)
+    try:
+        result_json = json.dumps(result, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return result
+    open_store(module.cache_dir).put(call_key(func, args), parser_fingerprint(module), page_digests, result_json)
+    return result
+
+
+def print_summary():
+    if not stats:
+        return
+    print(
+        f"detail results: {stats['reused']} reused, "
+        f"{stats['new'] + stats['changed']} parsed ({stats['new']} new, {stats['changed']} changed)"
+    )
@@ -0,0 +1,299 @@
+"""
+Selective, resumable runner for the output_config of a parse.py:
+
+    python parse.py                          # (re)build every output that is missing, failed or stale
+    python parse.py --only 任务 书籍一览/书籍一览.json
+    python parse.py --skip 任务道具.json --jobs 8
+    python parse.py --list                   # show the state of every output and exit
+    python parse.py --format jsonl           # one line per entity instead of one json document per file
+    python parse.py --retry                  # re-run only the detail calls that failed (dead letters)
+    python parse.py --plan                   # dry run: detail pages to fetch and the time it takes (biligame/plan.py)
+
+Outputs have no data dependencies on each other and run concurrently on --jobs threads (pages, parsed trees and
+the fetch rate limit are shared). Browser-driven parsers (the ones taking a url) share one chromedriver budget
+and run one after another.
+
+The state of each output file is kept in <output_dir>/.run_state.json. An output is redone when its file is
+missing, its last run failed or was interrupted, the parser code changed since it was written, or it is older than
+--max-age hours. Interrupted and failed outputs resume from their checkpoint (see biligame/checkpoint.py).
+"""
+import argparse
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from . import frontier, plan, profiling
+from .checkpoint import CHECKPOINT_DIR, DEAD_LETTERS_FILE, Checkpoint, DeadLetters, output_run
+from .results import parser_fingerprint
+from .stream import OUTPUT_FORMATS, is_list_output, output_path, write_output
+
+
+MAX_JOBS = 4
+STATE_FILE = ".run_state.json"
+PROFILE_FILE = "profile.json"
+
+
+def output_name(dirname, filename):
+    return f"{dirname}/{filename}"
+
+
+def uses_browser(parser_func):
+    return "url" in inspect.signature(parser_func).parameters
+
+
+class RunState:
+    """per-output completion records, saved after every change so an interrupted run keeps what it finished"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.records = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.records = json.load(f)
+
+    def get(self, name):
+        return self.records.get(name, {})
+
+    def update(self, name, **record):
+        with self.lock:
+            self.records[name] = record
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.records, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, self.path)
+
+
+def matches(selector, dirname, filename):
+    """a selector is a category, a file name (with or without .json) or category/file"""
+    return selector in (dirname, filename, os.path.splitext(filename)[0], output_name(dirname, filename))
+
+
+def unknown_selectors(output_config, selectors):
+    return [s for s in selectors or [] if not any(matches(s, d, f) for d, funcs in output_config.items() for f in funcs)]
+
+
+def select(output_config, only=None, skip=None, check=True):
+    """names of the selected outputs, check: raise ValueError for a selector matching no output"""
+    unknown = unknown_selectors(output_config, (only or []) + (skip or []))
+    if check and unknown:
+        raise ValueError(f"{unknown[0]} matches no output, see --list")
+    selected = []
+    for dirname, parser_funcs in output_config.items():
+        for filename in parser_funcs:
+            if only and not any(matches(s, dirname, filename) for s in only):
+                continue
+            if skip and any(matches(s, dirname, filename) for s in skip):
+                continue
+            selected.append((dirname, filename))
+    return selected
+
+
+def stale_reason(record, filepath, fingerprint, max_age=None):
+    if not record:
+        return "never run"
+    if record.get("status") == "running":
+        return "interrupted"
+    if record.get("status") != "done":
+        return record.get("status", "unknown")
+    if not os.path.exists(filepath):
+        return "output missing"
+    if record.get("fingerprint") != fingerprint:
+        return "parser changed"
+    if max_age is not None and time.time() - record.get("finished", 0) > max_age * 3600:
+        return "older than max age"
+    return None
+
+
+class Build:
+    """what the outputs of one run share"""
+
+    def __init__(self, module, output_dir, fmt="json", resume=True, retry=False):
+        self.module = module
+        self.output_dir = output_dir
+        self.fmt = fmt
+        # False: start over instead of continuing from the checkpoints of interrupted runs
+        self.resume = resume
+        # --retry: the outputs with dead letters continue from their checkpoint, only the failed calls are made again
+        self.retry = retry
+        self.state = RunState(os.path.join(output_dir, STATE_FILE))
+        self.dead_letters = DeadLetters(os.path.join(output_dir, DEAD_LETTERS_FILE))
+        self.fingerprint = parser_fingerprint(module)
+        # prefix of the output names in the log, when several games are built at once (biligame/crawl.py)
+        self.label = ""
+
+    def checkpoint_path(self, dirname, filename):
+        return os.path.join(self.output_dir, CHECKPOINT_DIR, dirname, os.path.splitext(filename)[0] + ".jsonl")
+
+
+def run_output(build, dirname, filename):
+    name = output_name(dirname, filename)
+    parser_func = build.module.output_config[dirname][filename]
+    dirpath = os.path.join(build.output_dir, dirname)
+    os.makedirs(dirpath, exist_ok=True)
+    started = time.time()
+    record = dict(parser=parser_func.__name__, fingerprint=build.fingerprint, started=started)
+    # the checkpoint of a finished output is only there for --retry, a refresh parses its pages again
+    resume = build.resume and (build.retry or build.state.get(name).get("status") in ("running", "failed"))
+    print(f"[runner] start {build.label}{name}")
+    # left as "running" if the process dies, the next run resumes from the checkpoint
+    build.state.update(name, status="running", **record)
+    build.dead_letters.clear(name)
+    checkpoint = Checkpoint(build.checkpoint_path(dirname, filename), build.fingerprint, resume)
+    done = False
+    try:
+        with output_run(name, checkpoint, build.dead_letters):
+            # list parsers are generators, their entities are written while they are parsed (biligame/stream.py)
+            write_output(os.path.join(dirpath, filename), parser_func(), build.fmt, is_list_output(parser_func))
+        done = True
+    except Exception as e:
+        print(traceback.format_exc())
+        build.state.update(name, status="failed", finished=time.time(), error=f"{type(e).__name__}: {e}", **record)
+        print(f"[runner] failed {build.label}{name}: {type(e).__name__}: {e}")
+        return False
+    finally:
+        # kept while there is something to resume or retry
+        checkpoint.close(remove=done and not build.dead_letters.count(name))
+    dead_letters = build.dead_letters.count(name)
+    build.state.update(name, status="done", finished=time.time(), dead_letters=dead_letters, **record)
+    print(f"[runner] done {build.label}{name} in {time.time() - started:.0f}s" + (f", {dead_letters} dead letters" if dead_letters else ""))
+    return True
+
+
+def run_chain(chain):
+    return [run_output(build, dirname, filename) for build, dirname, filename in chain]
+
+
+def schedule(build, only=None, skip=None, force=False, max_age=None, retry=False, check=True):
+    """(dirname, filename) of the selected outputs that have to be (re)built"""
+    output_dir = build.output_dir
+    retry_outputs = build.dead_letters.outputs()
+    todo = []
+    for dirname, filename in select(build.module.output_config, only, skip, check):
+        name = output_name(dirname, filename)
+        if retry:
+            reason = f"{build.dead_letters.count(name)} dead letters" if name in retry_outputs else None
+        elif force:
+            reason = "forced"
+        else:
+            filepath = output_path(os.path.join(output_dir, dirname, filename), build.fmt)
+            reason = stale_reason(build.state.get(name), filepath, build.fingerprint, max_age)
+        if reason is None:
+            if not retry:
+                print(f"[runner] up to date {build.label}{name}")
+            continue
+        print(f"[runner] scheduled {build.label}{name} ({reason})")
+        todo.append((dirname, filename))
+    return todo
+
+
+def make_chains(todo_by_build):
+    """one chain per independent output, taking the builds in turn; the browser-driven outputs of every build
+    share a single chain, started first"""
+    browser_chain = []
+    queues = []
+    for build, todo in todo_by_build:
+        queue = []
+        for dirname, filename in todo:
+            if uses_browser(build.module.output_config[dirname][filename]):
+                browser_chain.append((build, dirname, filename))
+            else:
+                queue.append([(build, dirname, filename)])
+        queues.append(queue)
+    chains = [chain for turn in itertools.zip_longest(*queues) for chain in turn if chain]
+    if browser_chain:
+        chains.insert(0, browser_chain)
+    return chains
+
+
+def execute(chains, jobs=MAX_JOBS):
+    # outputs running at the same time visit a detail page they share once (biligame/frontier.py)
+    with frontier.run():
+        if jobs <= 1:
+            for chain in chains:
+                run_chain(chain)
+        else:
+            with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="output") as executor:
+                for chain in chains:
+                    executor.submit(run_chain, chain)
+
+
+def report(build, todo):
+    """print how the scheduled outputs went, returns the names of the failed ones"""
+    failed = [output_name(d, f) for d, f in todo if build.state.get(output_name(d, f)).get("status") != "done"]
+    print(f"[runner] {build.label}{len(todo) - len(failed)} outputs written, {len(failed)} failed" + (f": {failed}" if failed else ""))
+    dead = {name: build.dead_letters.count(name) for name in build.dead_letters.outputs()}
+    if dead:
+        print(f"[runner] dead letters in {build.dead_letters.path}: {dead}, rerun them with --retry")
+    return failed
+
+
+def run(module, output_dir="data", only=None, skip=None, jobs=MAX_JOBS, force=False, max_age=None, fmt="json", retry=False):
+    """run the selected outputs of module.output_config, returns the names of the failed ones"""
+    os.makedirs(output_dir, exist_ok=True)
+    build = Build(module, output_dir, fmt, resume=not force, retry=retry)
+    todo = schedule(build, only, skip, force, max_age, retry)
+    execute(make_chains([(build, todo)]), jobs)
+    return report(build, todo)
+
+
+def print_status(module, output_dir="data", max_age=None, fmt="json"):
+    state = RunState(os.path.join(output_dir, STATE_FILE))
+    fingerprint = parser_fingerprint(module)
+    for dirname, parser_funcs in module.output_config.items():
+        for filename in parser_funcs:
+            name = output_name(dirname, filename)
+            record = state.get(name)
+            reason = stale_reason(record, output_path(os.path.join(output_dir, dirname, filename), fmt), fingerprint, max_age)
+            finished = time.strftime("%Y-%m-%d %H:%M", time.localtime(record["finished"])) if record else "-"
+            dead_letters = f", {record['dead_letters']} dead letters" if record.get("dead_letters") else ""
+            print(f"{name:40s} {finished:16s} {reason or 'up to date'}{dead_letters}")
+
+
+def profile_path(profile, output_dir):
+    """--profile without a path writes into the output folder"""
+    return os.path.join(output_dir, PROFILE_FILE) if profile == PROFILE_FILE else profile
+
+
+def main(module, argv=None):
+    """command line of a parse.py, returns the process exit code"""
+    parser = argparse.ArgumentParser(description=f"build the json outputs of {os.path.basename(os.path.dirname(module.__file__))}")
+    parser.add_argument("--only", nargs="+", help="categories / files to run (e.g. 任务 or 任务/魔神任务.json)")
+    parser.add_argument("--skip", nargs="+", help="categories / files not to run")
+    parser.add_argument("--jobs", type=int, default=MAX_JOBS, help="outputs built at the same time")
+    parser.add_argument("--force", action="store_true", help="rebuild the selected outputs from scratch, even if up to date")
+    parser.add_argument("--retry", action="store_true", help="rebuild only the outputs with dead letters, re-running the failed calls")
+    parser.add_argument("--max-age", type=float, help="hours after which a finished output is rebuilt")
+    parser.add_argument("--output-dir", default="data")
+    parser.add_argument("--format", default="json", choices=OUTPUT_FORMATS, help="json documents or json lines")
+    parser.add_argument("--list", action="store_true", help="print the state of every output and exit")
+    parser.add_argument("--plan", action="store_true", help="dry run: load the list pages only and report the detail pages to fetch per category")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_FILE, help=f"time every route and parse_* function, report written to PROFILE (default <output-dir>/{PROFILE_FILE})")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print_status(module, args.output_dir, args.max_age, args.format)
+        return 0
+    if args.plan:
+        try:
+            outputs = select(module.output_config, args.only, args.skip)
+        except ValueError as e:
+            parser.error(str(e))
+        plan.print_plan(plan.make_plan(module, outputs))
+        return 0
+    if args.profile:
+        profiling.enable(module)
+    try:
+        failed = run(
+            module, args.output_dir, args.only, args.skip, args.jobs, args.force, args.max_age, args.format, args.retry
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if args.profile:
+        profiling.report(profile_path(args.profile, args.output_dir))
+    return 1 if failed else 0
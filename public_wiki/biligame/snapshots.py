@@ -0,0 +1,60 @@
+"""
+Rendered DOM of the browser-driven parsers, kept in the page cache so that their extraction can be re-run without
+Chrome.
+
+Every html read from a browser session (each page of a query grid, each CodeContainer of 短信) is stored under a
+stable key derived from the page url and the snapshot name, next to an index (json) of what the run read:
+
+    wiki.biligame.com_ys_%E6%91%86%E8%AE%BE%E4%B8%80%E8%A7%88#grid         {"pages": 12}
+    wiki.biligame.com_ys_%E6%91%86%E8%AE%BE%E4%B8%80%E8%A7%88#grid_0       <div id="queryDataGrid">...
+    wiki.biligame.com_sr_%E7%9F%AD%E4%BF%A1#messages_2_0_5                 <div class="CodeContainer">...
+
+The "/" of a snapshot name is written as "_" in its key, as in the route keys, so that the file backend stores it
+as one file.
+
+With browser_replay = True in parse.py the parsers read the snapshots of the last browser run instead of starting
+Chrome; a missing snapshot raises SnapshotMissing (a PageNotCached).
+"""
+import json
+
+from .pages import PageNotCached, url_to_key
+
+
+class SnapshotMissing(PageNotCached):
+    pass
+
+
+def snapshot_key(url, name):
+    return f"{url_to_key(url)}#{name.replace('/', '_')}"
+
+
+def put(cache, url, name, html):
+    cache.put(snapshot_key(url, name), html)
+
+
+def get(cache, url, name):
+    html = cache.get(snapshot_key(url, name))
+    if html is None:
+        raise SnapshotMissing(snapshot_key(url, name))
+    return html
+
+
+def put_index(cache, url, name, index):
+    put(cache, url, name, json.dumps(index, ensure_ascii=False))
+
+
+def get_index(cache, url, name):
+    return json.loads(get(cache, url, name))
+
+
+def save_pages(cache, url, name, htmls):
+    """store a list of snapshots (the pages of a grid) as name/0, name/1, ... and their count as name"""
+    for i, html in enumerate(htmls):
+        put(cache, url, f"{name}/{i}", html)
+    put_index(cache, url, name, {"pages": len(htmls)})
+    print(f"{len(htmls)} snapshots of {url} saved.")
+
+
+def load_pages(cache, url, name):
+    count = get_index(cache, url, name)["pages"]
+    return [get(cache, url, f"{name}/{i}") for i in range(count)]
@@ -0,0 +1,130 @@
+"""
+Per-run memo of parsed pages: a bounded LRU of BeautifulSoup trees keyed by (route, tree builder, sha1 of the html),
+so that parse functions sharing a page (parse_world_quest -> parse_common_quest, parse_achievement h2 -> h3, ...)
+build its tree only once.
+
+Trees handed out by the memo are shared. Callers that modify the tree (decompose, ...) ask for mutable=True and get
+a copy of the memoized tree, which is cheaper than parsing the page again; readers that only leave tags out of a
+text use nodes.text_without instead of decomposing them.
+
+Parsers may scope a page to the element they read (scope="mw-content-text", an element id, or a dict of attributes):
+only that subtree is built (bs4's SoupStrainer), navigation, sidebars and footers never become tree nodes.
+html5lib does not support this and always builds the whole page. The scope is not part of the memo key: every
+parser of a page reads it at the same scope (detail pages at mw-content-text, the parsers skipping elements by
+position whole), a page asked for at another scope is parsed again and replaces the memoized tree (counted as
+rescoped in the summary).
+
+The tree builder is switchable: "html.parser" (default, pure python), "lxml" (much faster, `pip install lxml`)
+or "html5lib". Run biligame/compare_backends.py before switching, builders do not repair broken html the same way.
+"""
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+from . import profiling
+
+
+# a parsed tree takes roughly this many times the size of its html in memory
+TREE_SIZE_FACTOR = 8
+MAX_MEMORY = 512 * 1024 * 1024
+PARSER_BACKENDS = ("html.parser", "lxml", "html5lib")
+# the article of a MediaWiki page, everything the detail parsers read is inside it
+CONTENT = "mw-content-text"
+
+
+class DocumentCache:
+    def __init__(self, max_memory=MAX_MEMORY):
+        self.max_memory = max_memory
+        self.memory = 0
+        self.docs = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rescoped = 0
+
+    def get(self, key, scope_key=None):
+        with self.lock:
+            if key not in self.docs:
+                self.misses += 1
+                return None
+            soup, _, stored_scope = self.docs[key]
+            if stored_scope != scope_key:
+                self.misses += 1
+                self.rescoped += 1
+                return None
+            self.hits += 1
+            self.docs.move_to_end(key)
+            return soup
+
+    def put(self, key, soup, size, scope_key=None):
+        if size > self.max_memory:
+            return
+        with self.lock:
+            if key in self.docs:
+                self.memory -= self.docs.pop(key)[1]
+            self.docs[key] = (soup, size, scope_key)
+            self.memory += size
+            while self.memory > self.max_memory:
+                _, (_, evicted_size, _) = self.docs.popitem(last=False)
+                self.memory -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.docs.clear()
+            self.memory = 0
+
+
+document_cache = DocumentCache()
+
+
+def check_backend(backend):
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"unknown parser backend {backend}, choose from {PARSER_BACKENDS}")
+    try:
+        BeautifulSoup("", backend)
+    except FeatureNotFound:
+        raise ValueError(f"parser backend {backend} is not installed, try `pip install {backend}`")
+    return backend
+
+
+def scope_attrs(scope):
+    return {"id": scope} if isinstance(scope, str) else dict(scope)
+
+
+def make_soup(html, backend="html.parser", scope=None):
+    if scope is None or backend == "html5lib":
+        return BeautifulSoup(html, backend)
+    return BeautifulSoup(html, backend, parse_only=SoupStrainer(attrs=scope_attrs(scope)))
+
+
+def parse_document(route, html, mutable=False, backend="html.parser", scope=None):
+    with profiling.timed("parse", route):
+        return _parse_document(route, html, mutable, backend, scope)
+
+
+def _parse_document(route, html, mutable, backend, scope):
+    scope_key = None if scope is None else tuple(sorted(scope_attrs(scope).items()))
+    key = (route, backend, hashlib.sha1(html.encode("utf-8")).hexdigest())
+    soup = document_cache.get(key, scope_key)
+    if soup is not None:
+        profiling.count(route, "memo_hits")
+    else:
+        soup = make_soup(html, backend, scope)
+        document_cache.put(key, soup, len(html) * TREE_SIZE_FACTOR, scope_key)
+    # the caller is going to modify it, the memoized tree stays shared
+    return copy.copy(soup) if mutable else soup
+
+
+def print_summary():
+    cache = document_cache
+    if not cache.hits and not cache.misses:
+        return
+    print(
+        f"parsed documents: {cache.hits} hits, {cache.misses} misses ({cache.rescoped} rescoped), {cache.evictions} evicted, "
+        f"{len(cache.docs)} kept (~{cache.memory / 1024 / 1024:.0f} MB)"
+    )
@@ -0,0 +1,155 @@
+"""
+Streaming output of the list parsers.
+
+A list parser is a generator of (key, entity) pairs, key None for the entries of a list output:
+
+    def parse_npc_list(route=...):
+        ...
+        for s in npcs:
+            yield name, details.get(href)
+
+Every pair is appended to <file>.partial.jsonl as soon as it is yielded, so memory does not grow with the list and
+the entries parsed so far can be read while the parser runs (or after it crashed). When the parser is done:
+
+- format "json":  <file> is assembled from the partial file, identical to json.dump(dict(pairs), indent=4)
+                  (a key yielded again keeps its first position and takes the last entity, like a dict)
+- format "jsonl": the partial file becomes <file>l, one {"key": ..., "value": ...} (or bare entity) per line
+
+The first pair decides between a dict and a list. A list parser marked with @list_output is written as [] when it
+yields nothing, other empty streams as {}.
+"""
+import inspect
+import json
+import os
+
+
+OUTPUT_FORMATS = ("json", "jsonl")
+PARTIAL_SUFFIX = ".partial.jsonl"
+
+
+def is_stream(output):
+    return inspect.isgenerator(output)
+
+
+def list_output(func):
+    """mark a list parser whose entries are a list (key None), so that an empty stream is written as []"""
+    func.list_output = True
+    return func
+
+
+def is_list_output(func):
+    return getattr(func, "list_output", False)
+
+
+def last_rows(keys):
+    """[True where a key is met for the last time, else False] for the keys of the rows of a list page: a parser
+    merging the rows of a key into one entity yields it at every row and only keeps it until its last row"""
+    remaining = {}
+    for key in keys:
+        remaining[key] = remaining.get(key, 0) + 1
+    last = []
+    for key in keys:
+        remaining[key] -= 1
+        last.append(not remaining[key])
+    return last
+
+
+def iter_pairs(output):
+    """(key, entity) pairs of a parser output, whether it was streamed or returned as a dict / list"""
+    if isinstance(output, dict):
+        return iter(output.items())
+    if isinstance(output, list):
+        return ((None, entity) for entity in output)
+    return output
+
+
+def collect(pairs):
+    """build the dict (or list) a streamed output stands for"""
+    results = None
+    for key, entity in pairs:
+        if results is None:
+            results = [] if key is None else {}
+        if key is None:
+            results.append(entity)
+        else:
+            results[key] = entity
+    return {} if results is None else results
+
+
+def output_path(filepath, fmt="json"):
+    if fmt == "jsonl":
+        return os.path.splitext(filepath)[0] + ".jsonl"
+    return filepath
+
+
+def _line(key, entity):
+    if key is None:
+        return json.dumps(entity, ensure_ascii=False)
+    return json.dumps({"key": key, "value": entity}, ensure_ascii=False)
+
+
+def _assemble(partial_path, offsets, is_list, target):
+    """write the indent=4 json of the partial file, reading one entity at a time"""
+    if offsets is None:
+        target.write("[]" if is_list else "{}")
+        return
+    opening, closing = ("[", "]") if is_list else ("{", "}")
+    target.write(opening)
+    with open(partial_path, "rb") as partial:
+        for i, offset in enumerate(offsets.values() if not is_list else offsets):
+            partial.seek(offset)
+            line = json.loads(partial.readline().decode("utf-8"))
+            wrapped = [line] if is_list else {line["key"]: line["value"]}
+            # strip the wrapping brackets, the entity keeps the indentation of a top-level member
+            text = json.dumps(wrapped, ensure_ascii=False, indent=4)[1:-2]
+            target.write(("," if i else "") + text)
+    target.write("\n" + closing)
+
+
+def write_stream(filepath, pairs, fmt="json", is_list=False):
+    """stream the (key, entity) pairs to filepath, returns the number of pairs written; is_list: shape of an empty
+    stream"""
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"unknown output format {fmt}, choose from {OUTPUT_FORMATS}")
+    partial_path = filepath + PARTIAL_SUFFIX
+    # offsets of the last line of each key in first-seen order, or of every line of a list output
+    offsets = None
+    n = 0
+    with open(partial_path, "wb") as partial:
+        for key, entity in pairs:
+            if offsets is None:
+                is_list = key is None
+                offsets = [] if is_list else {}
+            elif is_list != (key is None):
+                raise ValueError(f"{filepath}: a stream yields either keyed entities or list entries (key None)")
+            offset = partial.tell()
+            partial.write(_line(key, entity).encode("utf-8") + b"\n")
+            # readers tailing the partial file see whole lines
+            partial.flush()
+            if is_list:
+                offsets.append(offset)
+            else:
+                offsets[json.dumps(key)] = offset
+            n += 1
+
+    target_path = output_path(filepath, fmt)
+    if fmt == "jsonl":
+        os.replace(partial_path, target_path)
+        return n
+    tmp_path = target_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as target:
+        _assemble(partial_path, offsets, is_list, target)
+    os.replace(tmp_path, target_path)
+    os.remove(partial_path)
+    return n
+
+
+def write_output(filepath, output, fmt="json", is_list=False):
+    """write a parser output (stream, dict or list) in the given format; is_list: the shape of an empty stream"""
+    if fmt == "json" and not is_stream(output):
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, filepath)
+        return
+    write_stream(filepath, iter_pairs(output), fmt, is_list or isinstance(output, list))
@@ -0,0 +1,179 @@
+"""
+Wiki tables (<table class="wikitable">) as dicts and lists, shared by the zh parsers.
+
+A table is read once into a grid: its rows (also inside thead / tbody / tfoot) and their th / td cells, every cell
+placed at its column with rowspan and colspan expanded, so a cell spanning rows belongs to each of them. Nested
+tables are content of the cell they are in. The table type and the extracted data are derived from that model:
+
+- header_top:        a first row of headers only:     [{column header: cell}, ...] per row below it
+- header_cell_equal: as many headers as cells:        {header: cell} in document order
+- header_left:       the last row has headers and cells: {row headers joined by " - ": first cell of the row}
+- no_header:         cells only:                      [cell, ...]
+- freeform:          anything else:                   ["header: cell cell", ...] one line per row
+"""
+import re
+from functools import cached_property
+
+from .normalize import clean_cell
+
+
+FILE_LINK = re.compile(r"文件:.+\.(jpg|gif|png)")
+
+
+def _span(tag, attr):
+    try:
+        return max(1, int(tag.get(attr, 1)))
+    except ValueError:
+        return 1
+
+
+def _rows(table):
+    for child in table.children:
+        if child.name == "tr":
+            yield child
+        elif child.name in ("thead", "tbody", "tfoot"):
+            yield from (tr for tr in child.children if tr.name == "tr")
+
+
+class Cell:
+    def __init__(self, tag):
+        self.tag = tag
+        self.header = tag.name == "th"
+
+    @cached_property
+    def text(self):
+        return self.tag.get_text()
+
+    @property
+    def hidden(self):
+        return "display:none" in self.tag.get("style", "")
+
+
+class Table:
+    def __init__(self, table):
+        trs = list(_rows(table))
+        # the cells of each tr in document order
+        self.rows = []
+        # {column: cell} of each row, with the cells spanning into it from the rows above
+        self.grid = [{} for _ in trs]
+        for r, tr in enumerate(trs):
+            row = [Cell(tag) for tag in tr.children if tag.name in ("th", "td")]
+            self.rows.append(row)
+            col = 0
+            for cell in row:
+                while col in self.grid[r]:
+                    col += 1
+                colspan = _span(cell.tag, "colspan")
+                for covered in self.grid[r:r + _span(cell.tag, "rowspan")]:
+                    for c in range(col, col + colspan):
+                        covered[c] = cell
+                col += colspan
+        self.headers = [cell for row in self.rows for cell in row if cell.header]
+        self.cells = [cell for row in self.rows for cell in row if not cell.header]
+
+    def row_cells(self, r):
+        """cells covering row r from left to right, a cell spanning several columns once"""
+        return list(dict.fromkeys(self.grid[r][c] for c in sorted(self.grid[r])))
+
+    @cached_property
+    def kind(self):
+        first = self.rows[0] if self.rows else []
+        last = self.rows[-1] if self.rows else []
+        if sum(cell.header for cell in first) > 1 and all(cell.header for cell in first):
+            return "header_top"
+        if len(self.headers) == len(self.cells):
+            return "header_cell_equal"
+        if any(cell.header for cell in last) and not all(cell.header for cell in last):
+            return "header_left"
+        if not self.headers and self.cells:
+            return "no_header"
+        return "freeform"
+
+    def header_top(self):
+        columns = {c: cell for c, cell in self.grid[0].items() if cell.header}
+        info = []
+        for r in range(1, len(self.rows)):
+            # the cells below each header, a header spanning several columns takes all of them
+            below = {}
+            for c in sorted(self.grid[r]):
+                cell, header_cell = self.grid[r][c], columns.get(c)
+                if cell.header or header_cell is None:
+                    continue
+                cells = below.setdefault(header_cell, [])
+                if cell not in cells:
+                    cells.append(cell)
+            row_info = {}
+            for header_cell, cells in below.items():
+                header = header_cell.text.strip()
+                if not header:
+                    continue
+                if header == "稀有度":
+                    row_info[header] = cells[0].tag.find('img')["alt"].split(".")[0]
+                else:
+                    row_info[header] = " ".join([value for value in map(clean_cell, (cell.text for cell in cells)) if value])
+            info.append({k: v for k, v in row_info.items() if k and v})
+        return info
+
+    def header_cell_equal(self):
+        info = {}
+        for header_cell, cell in zip(self.headers, self.cells):
+            header = header_cell.text.strip()
+            if header == "稀有度":
+                info[header] = cell.tag.find('img')["alt"].split(".")[0]
+            else:
+                info[header] = clean_cell(cell.text)
+        return info
+
+    def header_left(self):
+        info = {}
+        for r in range(len(self.rows)):
+            cells = self.row_cells(r)
+            values = [cell for cell in cells if not cell.header]
+            if not values:
+                continue
+            headers = [cell.text.split("Media")[0].strip() for cell in cells if cell.header and not cell.hidden]
+            if not headers:
+                continue
+            header = " - ".join([h for h in headers if h])
+
+            if header == "稀有度":
+                img = next((img for img in (cell.tag.find('img') for cell in cells) if img), None)
+                content = img["alt"].split(".")[0]
+            else:
+                content = values[0].text.strip().replace("\xa0", " ")
+            if not content or "文件:" in content or content == "'":
+                continue
+            info[header] = content
+        return info
+
+    def no_header(self):
+        return [cell.text.strip() for cell in self.cells]
+
+    def freeform(self):
+        info = []
+        for row in self.rows:
+            line = ""
+            for k, cell in enumerate(row):
+                if k and not cell.header and row[k - 1].header:
+                    line += ": "
+                content = FILE_LINK.sub("", cell.text.replace('\xa0', ''))
+                line += f"{content.strip()} "
+            info.append(line.strip())
+        return info
+
+    def extract(self):
+        return getattr(self, self.kind)()
+
+
+def parse_table(table, keys_to_delete=None, values_to_delete=None):
+    """dict or list of a wikitable, see the table types above"""
+    info = Table(table).extract()
+    if isinstance(info, dict):
+        info = {k: v for k, v in info.items() if k and v}
+        if keys_to_delete:
+            info = {k: v for k, v in info.items() if k not in keys_to_delete}
+        if values_to_delete:
+            info = {k: v for k, v in info.items() if v not in values_to_delete}
+    elif isinstance(info, list):
+        info = [l for l in info if l]
+    return info
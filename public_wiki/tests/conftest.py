@@ -0,0 +1,24 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biligame import fetch, mediawiki_stub  # noqa: E402
+
+
+@pytest.fixture
+def stub_server(tmp_path):
+    """(root, base url) of a biligame/mediawiki_stub.py server over tmp_path/stub, without rate limit"""
+    root = tmp_path / "stub"
+    root.mkdir()
+    server = mediawiki_stub.serve(str(root), 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    fetch.configure_fetcher(default_rate_limit=0)
+    yield root, f"http://localhost:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    fetch.configure_fetcher()
@@ -0,0 +1,36 @@
+from biligame.checkpoint import Checkpoint
+
+
+def parse_npc(route):
+    return {"route": route}
+
+
+def test_resume_skips_damaged_lines(tmp_path, capsys):
+    path = str(tmp_path / "npc.jsonl")
+    checkpoint = Checkpoint(path, "f1")
+    checkpoint.add(parse_npc, ("/ys/A",), {"route": "/ys/A"})
+    checkpoint.add(parse_npc, ("/ys/B",), {"route": "/ys/B"})
+    checkpoint.close()
+    with open(path, "ab") as f:
+        f.write(b'{"call": "parse_npc[\\"/ys/C\\"]", "res\n')
+        f.write(b'{"result": 1}\n')
+        f.write(b'[1, 2]\n')
+    with open(path, "ab") as f:
+        f.write(b'{"call": "parse_npc[\\"/ys/D\\"]", "result": {"route": "/ys/D"}}\n{"call": "cut')
+
+    resumed = Checkpoint(path, "f1")
+    assert resumed.get(parse_npc, ("/ys/A",)) == (True, {"route": "/ys/A"})
+    assert resumed.get(parse_npc, ("/ys/D",)) == (True, {"route": "/ys/D"})
+    assert resumed.get(parse_npc, ("/ys/C",)) == (False, None)
+    assert capsys.readouterr().out.count("skipping the unreadable line") == 3
+    resumed.add(parse_npc, ("/ys/E",), {"route": "/ys/E"})
+    resumed.close()
+    assert Checkpoint(path, "f1").get(parse_npc, ("/ys/E",)) == (True, {"route": "/ys/E"})
+
+
+def test_other_fingerprint_starts_over(tmp_path):
+    path = str(tmp_path / "npc.jsonl")
+    checkpoint = Checkpoint(path, "f1")
+    checkpoint.add(parse_npc, ("/ys/A",), {"route": "/ys/A"})
+    checkpoint.close()
+    assert Checkpoint(path, "f2").get(parse_npc, ("/ys/A",)) == (False, None)
@@ -0,0 +1,33 @@
+from biligame import mediawiki, pages
+from biligame.cache import open_cache
+
+
+def write_pages(root, wiki, bodies):
+    (root / wiki).mkdir()
+    for title, body in bodies.items():
+        (root / wiki / f"{title}.html").write_text(body, encoding="utf-8")
+
+
+def test_fetch_rendered_follows_continue(stub_server, monkeypatch):
+    root, base_url = stub_server
+    monkeypatch.setattr(mediawiki, "API_BASE_URL", base_url)
+    bodies = {"北斗": "<p>北斗</p>", "凝光": "<p>凝光</p>", "香菱 料理": "<p>香菱</p>"}
+    write_pages(root, "ys", bodies)
+
+    rendered = mediawiki.fetch_rendered("ys", ["北斗", "不存在", "凝光", "香菱_料理"])
+
+    assert set(rendered) == {"北斗", "凝光", "香菱_料理"}
+    assert "<p>凝光</p>" in rendered["凝光"]
+    assert "<p>香菱</p>" in rendered["香菱_料理"]
+
+
+def test_prefetch_fills_the_cache(stub_server, monkeypatch, tmp_path):
+    root, base_url = stub_server
+    monkeypatch.setattr(mediawiki, "API_BASE_URL", base_url)
+    write_pages(root, "ys", {"北斗": "<p>北斗</p>", "凝光": "<p>凝光</p>"})
+    cache = open_cache(str(tmp_path / "cache"), "sqlite")
+
+    leftovers = mediawiki.prefetch(cache, ["/ys/北斗", "/ys/凝光", "/ys/不存在", "/ys/index.php?x"], pages.route_to_key)
+
+    assert leftovers == ["/ys/index.php?x", "/ys/不存在"]
+    assert "<p>凝光</p>" in cache.get(pages.route_to_key("/ys/凝光"))
@@ -0,0 +1,43 @@
+import pytest
+
+from biligame import normalize
+from biligame.games import load_game
+from biligame.normalize_bench import legacy_cell, legacy_quest_spaces, legacy_quest_text
+
+NBSP = "\xa0"
+TEXTS = [
+    "",
+    "plain text",
+    "分支对话\n\n旅行者：你好\n动画剧情",
+    "a\n\n\nb\n",
+    f"a{NBSP}b{NBSP}{NBSP}c{NBSP}{NBSP}{NBSP}\n",
+    f"请上传文件 x.png\n后面\n请上传文件",
+    f"分{NBSP}支对话\n{NBSP}\n动画剧情请上传文件\n",
+    f"分支对话{NBSP}\n\n请上传文件{NBSP}图\n\n结束",
+    f"图 图片{NBSP}\t 说明\n\n",
+    f"图\n图{NBSP}",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_genshin_quest_text(text):
+    assert load_game("genshin").clean_quest_text(text) == legacy_quest_text(text)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_starrail_quest_spaces(text):
+    assert load_game("starrail").clean_quest_spaces(text) == legacy_quest_spaces(text)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_clean_cell(text):
+    assert normalize.clean_cell(text) == legacy_cell(text)
+
+
+def test_alternatives_split_at_top_level_only():
+    assert normalize.alternatives(r"a|(b|c)|[|]|\||[]|]") == ["a", "(b|c)", "[|]", r"\|", "[]|]"]
+
+
+def test_rules_apply_in_order_in_one_pass():
+    normalizer = normalize.Normalizer(("ab", "1"), ("a|b", "2"), ("c+", lambda match: str(len(match.group()))))
+    assert normalizer("abacccb") == "12" + "3" + "2"
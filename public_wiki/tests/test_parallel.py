@@ -0,0 +1,49 @@
+import pytest
+
+from biligame import pages, stream
+from biligame.games import load_game
+
+WEAPONS = ["天空之刃", "西风剑", "祭礼剑", "笛剑", "黑剑"]
+
+
+def weapon_page(name):
+    return f"""<html><body><div id="mw-content-text">
+<div class="YS-WeaponBrief">{name}
+  /// 单手剑</div>
+<span id="实装版本">实装版本</span><div>1.0</div>
+<span id="故事">故事</span><div> {name}的故事 </div>
+<div class="YSCard recommended">推荐说明 适合{name}的角色 推荐说明 其他</div>
+</div></body></html>"""
+
+
+@pytest.fixture
+def weapon_site(stub_server, monkeypatch):
+    root, base_url = stub_server
+    (root / "ys").mkdir()
+    cards = "".join(
+        f'<div class="g"><a href="/ys/{name}"><img/></a><a href="/ys/{name}" title="{name}">{name}</a></div>'
+        for name in WEAPONS + [WEAPONS[0]]
+    )
+    (root / "ys" / "武器一览.html").write_text(f"<html><body>{cards}</body></html>", encoding="utf-8")
+    for name in WEAPONS:
+        (root / "ys" / f"{name}.html").write_text(weapon_page(name), encoding="utf-8")
+    monkeypatch.setattr(pages, "BASE_URL", base_url)
+    return load_game("genshin")
+
+
+def build(module, monkeypatch, tmp_path, workers):
+    monkeypatch.setattr(module, "cache_dir", str(tmp_path / f"cache{workers}"))
+    monkeypatch.setattr(module, "incremental", False)
+    monkeypatch.setattr(module, "parse_workers", workers)
+    path = str(tmp_path / f"武器一览{workers}.json")
+    stream.write_output(path, module.parse_weapon_list("/ys/武器一览"))
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_weapon_list_serial_and_pool_agree(weapon_site, monkeypatch, tmp_path):
+    serial = build(weapon_site, monkeypatch, tmp_path, 1)
+    pooled = build(weapon_site, monkeypatch, tmp_path, 2)
+    assert pooled == serial
+    assert list(stream.collect(weapon_site.parse_weapon_list("/ys/武器一览"))) == WEAPONS
+    assert "适合西风剑的角色" in serial.decode("utf-8")
@@ -0,0 +1,22 @@
+import pytest
+
+from biligame import snapshots
+from biligame.cache import CACHE_BACKENDS
+
+URL = "https://wiki.biligame.com/sr/短信"
+
+
+@pytest.mark.parametrize("backend", list(CACHE_BACKENDS))
+def test_save_and_replay(tmp_path, backend):
+    cache = CACHE_BACKENDS[backend](str(tmp_path))
+    htmls = ["<div id=\"queryDataGrid\">0</div>", "<div id=\"queryDataGrid\">1</div>"]
+    snapshots.save_pages(cache, URL, "grid", htmls)
+    snapshots.put(cache, URL, "messages/2/0/5", "<div class=\"CodeContainer\">5</div>")
+    snapshots.put_index(cache, URL, "messages", [["组织", [["角色", ["标题"]]]]])
+
+    replay = CACHE_BACKENDS[backend](str(tmp_path))
+    assert snapshots.load_pages(replay, URL, "grid") == htmls
+    assert snapshots.get(replay, URL, "messages/2/0/5") == "<div class=\"CodeContainer\">5</div>"
+    assert snapshots.get_index(replay, URL, "messages") == [["组织", [["角色", ["标题"]]]]]
+    with pytest.raises(snapshots.SnapshotMissing):
+        snapshots.get(replay, URL, "grid/2")
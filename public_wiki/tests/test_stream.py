@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from biligame import stream
+
+PAIRS = [
+    ("北斗", {"basic": {"稀有度": "4", "说明": "line\nbreak \"quoted\""}, "detail": {}}),
+    ("凝光", {"list": [1, 2.5, None, True], "empty": {}, "nested": {"a": []}}),
+    ("北斗", {"basic": {"稀有度": "5"}, "detail": {"故事": "\\ \t  "}}),
+    ("1", "scalar"),
+]
+
+
+def written(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def expected(output):
+    return json.dumps(output, ensure_ascii=False, indent=4).encode("utf-8")
+
+
+def test_keyed_stream_matches_json_dump(tmp_path):
+    path = str(tmp_path / "out.json")
+    assert stream.write_stream(path, iter(PAIRS)) == len(PAIRS)
+    # a repeated key keeps its first position and takes the last entity
+    assert written(path) == expected(dict(PAIRS))
+    assert not (tmp_path / ("out.json" + stream.PARTIAL_SUFFIX)).exists()
+
+
+def test_list_stream_matches_json_dump(tmp_path):
+    path = str(tmp_path / "out.json")
+    entities = [entity for _, entity in PAIRS]
+    stream.write_stream(path, ((None, entity) for entity in entities))
+    assert written(path) == expected(entities)
+
+
+@pytest.mark.parametrize("is_list, text", [(False, b"{}"), (True, b"[]")])
+def test_empty_stream(tmp_path, is_list, text):
+    path = str(tmp_path / "out.json")
+    stream.write_stream(path, iter([]), is_list=is_list)
+    assert written(path) == text == expected([] if is_list else {})
+
+
+def test_write_output_of_a_generator(tmp_path):
+    path = str(tmp_path / "out.json")
+    stream.write_output(path, (pair for pair in PAIRS))
+    assert written(path) == expected(stream.collect(iter(PAIRS)))
+
+
+def test_jsonl_keeps_every_pair(tmp_path):
+    path = str(tmp_path / "out.json")
+    stream.write_stream(path, iter(PAIRS), fmt="jsonl")
+    with open(tmp_path / "out.jsonl", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines == [{"key": key, "value": entity} for key, entity in PAIRS]
+
+
+def test_mixed_stream_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        stream.write_stream(str(tmp_path / "out.json"), iter([("a", 1), (None, 2)]))
+
+
+def test_last_rows():
+    assert stream.last_rows(["a", "b", "a", "c", "b"]) == [False, False, True, True, True]
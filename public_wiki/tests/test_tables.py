@@ -0,0 +1,45 @@
+from bs4 import BeautifulSoup
+
+from biligame.tables import Table, parse_table
+
+
+def table_of(html):
+    return BeautifulSoup(html, "html.parser").find("table")
+
+
+def test_rowspan_and_colspan_fill_the_grid():
+    table = Table(table_of(
+        "<table><tr><th>名称</th><th colspan='2'>属性</th></tr>"
+        "<tr><td rowspan='2'>A</td><td>x</td><td>y</td></tr>"
+        "<tr><td>z</td><td>w</td></tr></table>"
+    ))
+    assert [[cell.text for cell in row] for row in table.rows] == [["名称", "属性"], ["A", "x", "y"], ["z", "w"]]
+    assert {c: cell.text for c, cell in table.grid[0].items()} == {0: "名称", 1: "属性", 2: "属性"}
+    assert {c: cell.text for c, cell in table.grid[2].items()} == {0: "A", 1: "z", 2: "w"}
+    assert [cell.text for cell in table.row_cells(0)] == ["名称", "属性"]
+    assert table.kind == "header_top"
+    assert table.extract() == [{"名称": "A", "属性": "x y"}, {"名称": "A", "属性": "z w"}]
+
+
+def test_header_spanning_rows_prefixes_each_row():
+    table = table_of(
+        "<table><tbody><tr><th rowspan='2'>基础</th><th>攻击</th><td>10</td></tr>"
+        "<tr><th>防御</th><td>5</td></tr>"
+        "<tr><th>稀有度</th><td><img alt='4星.png'/></td></tr></tbody></table>"
+    )
+    assert Table(table).kind == "header_left"
+    assert parse_table(table) == {"基础 - 攻击": "10", "基础 - 防御": "5", "稀有度": "4星"}
+
+
+def test_invalid_spans_count_as_one():
+    table = Table(table_of("<table><tr><td colspan='x'>a</td><td rowspan='0'>b</td></tr><tr><td>c</td></tr></table>"))
+    assert {c: cell.text for c, cell in table.grid[1].items()} == {0: "c"}
+    assert table.extract() == ["a", "b", "c"]
+
+
+def test_nested_table_is_cell_content():
+    table = table_of(
+        "<table><tr><th>a</th><th>b</th></tr>"
+        "<tr><td><table><tr><th>inner</th></tr></table></td><td>2</td></tr></table>"
+    )
+    assert parse_table(table) == [{"a": "inner", "b": "2"}]